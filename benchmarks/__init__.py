@@ -0,0 +1 @@
+"""Benchmarks for the DXF to XML conversion pipeline."""
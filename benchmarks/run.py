@@ -0,0 +1,111 @@
+"""
+Times each stage of ConverterSession.convert on synthetic drawings of
+increasing size and writes the results as JSON.
+
+    python -m benchmarks.run --panels 10 50 200 --holes 30 --output benchmark.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import ezdxf
+import numpy as np
+
+from src.core.session import ConverterSession
+from src.core.stats import ConversionStats
+from src.utils.config import DXF_LAYER_CONFIG
+from .synthetic import build_nesting_drawing
+
+# The stages ConversionStats reports for a conversion, in pipeline order
+STAGES = ('readfile', 'splitting', 'mirroring', 'grouping', 'indexing', 'coordinate_conversion',
+          'xml_build', 'xml_serialize', 'xml_save')
+
+def time_pipeline(dxf_path, output_dir, config=DXF_LAYER_CONFIG, panel_thickness=16.0):
+    """
+    Converts one file with a ConverterSession, exactly as the command line
+    does, writing the XML files below output_dir.
+    Returns (timings, counts): seconds per stage in STAGES, from the
+    conversion's ConversionStats, and the panels, operations and bytes written.
+    """
+    stats = ConversionStats()
+    session = ConverterSession(config, panel_thickness=panel_thickness, output_dir=output_dir)
+    if session.convert(dxf_path, stats=stats) is None:
+        raise RuntimeError(f"conversion of '{dxf_path}' failed")
+
+    timings = {stage: stats.stages.get(stage, 0.0) for stage in STAGES}
+    counts = {
+        'panels': len(stats.output_files),
+        'operations': sum(stats.operations.values()),
+        'skipped': sum(stats.skipped.values()),
+        'bytes_written': stats.bytes_written
+    }
+    return timings, counts
+
+def run_benchmark(panel_counts, holes_per_panel=20, repeat=3, seed=0):
+    """
+    Generates one drawing per panel count and times the pipeline on it.
+    Each stage reports the fastest of repeat runs. Returns one result dict per size.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for panels in panel_counts:
+            dxf_path = os.path.join(work_dir, f"synthetic_{panels}.dxf")
+            build_nesting_drawing(panels, holes_per_panel, seed).saveas(dxf_path)
+
+            best = {}
+            for run in range(repeat):
+                output_dir = os.path.join(work_dir, f"out_{panels}_{run}")
+                os.makedirs(output_dir)
+                timings, counts = time_pipeline(dxf_path, output_dir)
+                for stage in STAGES:
+                    best[stage] = min(best.get(stage, float('inf')), timings[stage])
+
+            results.append({
+                'panels_per_sheet': panels,
+                'holes_per_panel': holes_per_panel,
+                'file_bytes': os.path.getsize(dxf_path),
+                'counts': counts,
+                'seconds': {stage: round(best[stage], 6) for stage in STAGES},
+                'total_seconds': round(sum(best.values()), 6)
+            })
+    return results
+
+def _environment():
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ezdxf': ezdxf.__version__,
+        'numpy': np.__version__
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DXF to XML pipeline on synthetic sheets")
+    parser.add_argument('--panels', type=int, nargs='+', default=[10, 50, 200],
+                        help="panels per sheet, one benchmark per value (default: 10 50 200)")
+    parser.add_argument('--holes', type=int, default=20, help="drills per panel side (default: 20)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per size; the fastest counts (default: 3)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the drawing generator")
+    parser.add_argument('--output', metavar='JSON', help="write the results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        'environment': _environment(),
+        'results': run_benchmark(args.panels, args.holes, args.repeat, args.seed)
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        for result in report['results']:
+            print(f"{result['panels_per_sheet']:>6} panels: {result['total_seconds']:.3f}s")
+    else:
+        print(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
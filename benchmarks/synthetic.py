@@ -0,0 +1,70 @@
+"""Synthetic nesting-sheet drawings of a chosen size for benchmarking."""
+import random
+import ezdxf
+
+SHEET_GAP = 200.0       # Distance between the front and back sheet
+CELL_SIZE = 1000.0      # Grid cell reserved for each panel on a sheet
+MARGIN = 50.0           # Sheet border margin around the panel grid
+DRILL_DEPTHS = (5, 8, 10, 15)
+GROOVE_DEPTHS = (5, 8)
+
+def build_nesting_drawing(panels_per_sheet=12, holes_per_panel=20, seed=0, sheet_pairs=1):
+    """
+    Builds a two-sheet nesting drawing like the ones exported for the converter.
+    The left (front) sheet holds panels_per_sheet panels on _ABF_CUTTING_LINES
+    and the right (back) sheet their mirrored _ABF_PART_BORDER counterparts.
+    Each side of each panel gets holes_per_panel ABF_D* drills, one ABF_DSIDE_8
+    pocket and a horizontal and a vertical ABF_GROOVE* groove.
+    Machining is assigned to the panel whose front and back outlines' combined
+    box contains it, so panels are stacked in a single column to keep those
+    boxes apart. sheet_pairs such front/back pairs are laid out side by side.
+    Returns the ezdxf Drawing; the same arguments always give the same drawing.
+    """
+    rng = random.Random(seed)
+    doc = ezdxf.new('R2010')
+    msp = doc.modelspace()
+
+    sheet_width = CELL_SIZE + 2 * MARGIN
+    sheet_height = max(panels_per_sheet, 1) * CELL_SIZE + 2 * MARGIN
+
+    for pair in range(sheet_pairs):
+        front_x = pair * 2 * (sheet_width + SHEET_GAP)
+        back_x = front_x + sheet_width + SHEET_GAP
+
+        for sheet_x in (front_x, back_x):
+            _add_rectangle(msp, sheet_x, 0.0, sheet_width, sheet_height, '_ABF_SHEET_BORDER')
+
+        for index in range(panels_per_sheet):
+            # Panels lie with their long side along Y, as the converter expects
+            width, height = sorted((rng.randrange(300, 900, 10), rng.randrange(300, 900, 10)))
+            x0 = front_x + MARGIN + 20.0
+            y0 = MARGIN + index * CELL_SIZE + 20.0
+            # The back sheet holds the same panel mirrored about its own centre
+            back_x0 = back_x + sheet_width - (x0 - front_x) - width
+
+            _add_rectangle(msp, x0, y0, width, height, '_ABF_CUTTING_LINES')
+            _add_rectangle(msp, back_x0, y0, width, height, '_ABF_PART_BORDER')
+            for panel_x in (x0, back_x0):
+                _add_machining(msp, rng, panel_x, y0, width, height, holes_per_panel)
+
+    return doc
+
+def _add_machining(msp, rng, x0, y0, width, height, holes):
+    """Adds drills, a pocket and two grooves inside one panel rectangle."""
+    for _ in range(holes):
+        depth = rng.choice(DRILL_DEPTHS)
+        center = (x0 + 30 + rng.random() * (width - 60), y0 + 30 + rng.random() * (height - 60))
+        msp.add_circle(center, depth / 2, dxfattribs={'layer': f'ABF_D{depth}'})
+
+    # Pocket on the left edge
+    _add_rectangle(msp, x0, y0 + height / 2 - 4, 12, 8, 'ABF_DSIDE_8')
+
+    # One horizontal and one vertical groove
+    _add_rectangle(msp, x0 + 10, y0 + height * 0.3, width - 20, 8,
+                   f'ABF_GROOVE{rng.choice(GROOVE_DEPTHS)}')
+    _add_rectangle(msp, x0 + width * 0.7, y0 + 10, 6, height - 20,
+                   f'ABF_GROOVE{rng.choice(GROOVE_DEPTHS)}')
+
+def _add_rectangle(msp, x, y, width, height, layer):
+    msp.add_lwpolyline([(x, y), (x + width, y), (x + width, y + height), (x, y + height)],
+                       close=True, dxfattribs={'layer': layer})
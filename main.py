@@ -2,74 +2,130 @@
 """Main entry point for DXF to XML converter."""
 import sys
 import os
-import importlib.util
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
-# Dynamically import panel_mirroring
-panel_mirroring_path = os.path.join(os.path.dirname(__file__), 'src', 'core', 'panel_mirroring.py')
-spec = importlib.util.spec_from_file_location("panel_mirroring", panel_mirroring_path)
-panel_mirroring = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(panel_mirroring)
-find_right_sheet_border = panel_mirroring.find_right_sheet_border
-get_entities_within_border = panel_mirroring.get_entities_within_border
-mirror_entities = panel_mirroring.mirror_entities
-add_entities_to_doc = panel_mirroring.add_entities_to_doc
-
 from src.utils.config import DXF_LAYER_CONFIG
 from src.ui.terminal import TerminalUI
-from src.core.converter import dxf_to_custom_xml
-import ezdxf
-import tempfile
-import shutil
+from src.core.session import ConverterSession
+from src.core.stats import ConversionStats
+from src.core.panel_cache import PanelCache
+from src.core.output_sink import ARCHIVE_FORMATS
+from src.core.batch import find_dxf_files, run_batch
+from src.utils.log import configure_logging
+from src.service.server import serve, DEFAULT_PORT
+import argparse
+import json
+import time
 
 def main():
     """Main entry point."""
+    args = _parse_args()
+    configure_logging(verbose=args.verbose)
     config = DXF_LAYER_CONFIG
     ui = TerminalUI(config)
+    cache = PanelCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache_dir else None
+    session_options = {
+        'cache': cache,
+        'fast_read': args.fast_read,
+        'streaming': args.stream,
+        'memory_limit': args.memory_limit * 1024 * 1024 if args.memory_limit else None,
+        'archive': args.archive,
+        'panel_workers': args.panel_workers
+    }
+
+    if args.invalidate_cache:
+        if cache is None:
+            print("❌ --invalidate-cache needs --cache-dir.")
+            sys.exit(1)
+        print(f"Removed {cache.invalidate()} cached panel(s) from '{args.cache_dir}'.")
+        return
+    if args.batch:
+        sys.exit(run_batch_mode(ui, args, config, session_options))
+    if args.serve:
+        session_options.pop('archive')  # The service returns the files in its responses
+        try:
+            serve(config, panel_thickness=args.thickness, workers=args.workers, queue_size=args.queue_size,
+                  host=args.host, port=args.port, socket_path=args.socket, **session_options)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        return
+
     selected_file = ui.run()
     
     if selected_file:
         print("\nProcessing...")
-        temp_dir = None
+        stats = ConversionStats() if args.stats else None
         try:
-            # Create a temporary directory
-            temp_dir = tempfile.mkdtemp(prefix='dxf_processing_')
-            
-            # --- MIRRORING LOGIC ---
-            doc = ezdxf.readfile(selected_file)
-            sheet_border_layer = config['sheet_border']
-            right_border = find_right_sheet_border(doc, sheet_border_layer)
-            entities_in_right = get_entities_within_border(doc, right_border)
-            
-            # Get bounding box and axis for mirroring
-            points = list(right_border.get_points())
-            min_x = min(p[0] for p in points)
-            max_x = max(p[0] for p in points)
-            axis_x = (min_x + max_x) / 2
-            mirrored_entities = mirror_entities([right_border] + entities_in_right, (min_x, max_x), axis_x)
-            add_entities_to_doc(doc, mirrored_entities)
-            
-            # Save to a temp file in our temp directory
-            temp_dxf_path = os.path.join(temp_dir, 'mirrored.dxf')
-            doc.saveas(temp_dxf_path)
-            
-            # Process the mirrored DXF
-            panel_thickness_value = 16.0
-            dxf_to_custom_xml(temp_dxf_path, config, panel_thickness=panel_thickness_value)
-            
+            session = ConverterSession(config, panel_thickness=args.thickness, **session_options)
+            session.convert(selected_file, stats=stats)
+            if stats:
+                stats.dump_json(args.stats)
         except Exception as e:
             print(f"\nError during processing: {str(e)}")
-        finally:
-            # Clean up all temporary files
-            if temp_dir and os.path.exists(temp_dir):
-                for root, dirs, files in os.walk(temp_dir, topdown=False):
-                    for name in files:
-                        os.remove(os.path.join(root, name))
-                    for name in dirs:
-                        os.rmdir(os.path.join(root, name))
-                os.rmdir(temp_dir)
             
         input("\nPress Enter to exit...")
 
+def run_batch_mode(ui, args, config, session_options):
+    """Converts every DXF matched by --batch without prompting. Returns the exit code."""
+    files = find_dxf_files(args.batch)
+    if not files:
+        print(f"❌ No DXF files found for '{args.batch}'.")
+        return 1
+
+    print(f"Converting {len(files)} DXF file(s)...")
+    start = time.perf_counter()
+    try:
+        results = run_batch(files, config, panel_thickness=args.thickness,
+                            max_workers=args.workers, on_result=ui.show_batch_result,
+                            collect_stats=bool(args.stats), **session_options)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    ui.show_batch_summary(results, time.perf_counter() - start)
+    if args.stats:
+        with open(args.stats, 'w', encoding='utf-8') as f:
+            json.dump({r['file']: r['stats'] for r in results}, f, indent=2, ensure_ascii=False)
+    return 0 if all(r['success'] for r in results) else 1
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="DXF to XML converter for wood panels")
+    parser.add_argument('--batch', metavar='PATH',
+                        help="convert all DXF files in a directory or matching a glob pattern, without prompting")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes for --batch and --serve (default: number of cores)")
+    parser.add_argument('--panel-workers', type=int, default=None,
+                        help="process the panels of a drawing, across all its sheet pairs, in this many "
+                             "worker processes (not with --batch or --serve, which convert in worker processes)")
+    parser.add_argument('--thickness', type=float, default=16.0,
+                        help="panel thickness in mm (default: 16)")
+    parser.add_argument('--serve', action='store_true',
+                        help="run as a resident conversion service with an HTTP API")
+    parser.add_argument('--host', default='127.0.0.1', help="address for --serve (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f"port for --serve (default: {DEFAULT_PORT})")
+    parser.add_argument('--socket', metavar='PATH', help="serve on this Unix socket instead of a port")
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help="requests --serve accepts beyond busy workers before answering 503 (default: 16)")
+    parser.add_argument('--fast-read', action='store_true',
+                        help="read only the panel and machining entities of each DXF (much faster on large files)")
+    parser.add_argument('--stream', action='store_true',
+                        help="convert one sheet pair at a time, for drawings with many sheet pairs")
+    parser.add_argument('--memory-limit', type=int, metavar='MB',
+                        help="fail a drawing whose peak memory exceeds this; reported with --stats")
+    parser.add_argument('--archive', choices=ARCHIVE_FORMATS,
+                        help="write the XML files of each DXF into one archive instead of a directory")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="reuse the machining of unchanged panels from this cache directory")
+    parser.add_argument('--cache-size', type=int, default=256, metavar='MB',
+                        help="size limit of --cache-dir; least recently used panels are evicted (default: 256)")
+    parser.add_argument('--invalidate-cache', action='store_true',
+                        help="empty --cache-dir and exit")
+    parser.add_argument('--stats', metavar='JSON',
+                        help="write stage timings and operation counts to this JSON file")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="print the full DEBUG trace of every panel and machining entity")
+    return parser.parse_args()
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
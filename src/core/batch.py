@@ -0,0 +1,141 @@
+"""Non-interactive batch conversion of many DXF files across worker processes."""
+import contextlib
+import glob
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .session import ConverterSession
+from .stats import ConversionStats
+from ..utils.log import capture_logs
+
+def find_dxf_files(path_or_pattern):
+    """Lists the DXF files in a directory, or the DXF files matching a glob pattern."""
+    if os.path.isdir(path_or_pattern):
+        candidates = [os.path.join(path_or_pattern, f) for f in os.listdir(path_or_pattern)]
+    else:
+        candidates = glob.glob(path_or_pattern)
+    return sorted(f for f in candidates if os.path.isfile(f) and f.lower().endswith('.dxf'))
+
+# Session of the current (worker) process, reused by every file it converts
+_session = None
+
+_session_key = None
+
+def _get_session(config, session_options):
+    """Returns this process's ConverterSession for config and options, creating it on first use."""
+    global _session, _session_key
+    # Caches arrive as fresh copies in every job; the directory identifies them
+    key = (config, {name: getattr(value, 'directory', value) for name, value in session_options.items()})
+    if _session is None or _session_key != key:
+        _session = ConverterSession(config, **session_options)
+        _session_key = key
+    return _session
+
+def convert_file(input_file, config, panel_thickness=16.0, collect_stats=False, **session_options):
+    """
+    Mirrors and converts one DXF file and reports the outcome instead of raising.
+    Runs inside a worker process; the converter's log and console output are
+    captured so that parallel jobs do not interleave, and its last error line
+    is reported. With collect_stats the result carries the ConversionStats as a dict.
+    Files converted by the same process share one ConverterSession.
+    session_options are passed to ConverterSession (cache, fast_read,
+    streaming, memory_limit, archive).
+    """
+    start = time.perf_counter()
+    log = io.StringIO()
+    stats = ConversionStats() if collect_stats else None
+    output_files, error = None, None
+    try:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log), capture_logs(log):
+            output_files = _get_session(config, session_options).convert(input_file, stats=stats,
+                                                        panel_thickness=panel_thickness)
+        if output_files is None:
+            error = _last_error_line(log.getvalue())
+    except Exception as e:
+        error = str(e) or type(e).__name__
+
+    return {
+        'file': input_file,
+        'success': error is None,
+        'seconds': time.perf_counter() - start,
+        'output_files': output_files or [],
+        'error': error,
+        'stats': stats.to_dict() if stats else None
+    }
+
+def run_batch(files, config, panel_thickness=16.0, max_workers=None, on_result=None,
+              collect_stats=False, **session_options):
+    """
+    Converts files across a process pool sized to the core count.
+    on_result is called with each result as soon as its file finishes. A failing
+    file is reported in its result and never stops the rest of the batch.
+    session_options are passed on to convert_file.
+    Every file writes its panels below the working directory under its base
+    name, so files sharing a base name (a/job.dxf and b/job.dxf) would mix
+    their output; such a batch is rejected with ValueError before any file is
+    converted.
+    panel_workers > 1 among session_options is rejected with ValueError (see
+    check_worker_options).
+    Returns the results in the order of files.
+    """
+    check_worker_options(session_options)
+    if not files:
+        return []
+    _check_output_names(files)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(files))
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(convert_file, f, config, panel_thickness, collect_stats,
+                                   **session_options): f
+                   for f in files}
+        for future in as_completed(futures):
+            input_file = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:  # The worker process itself died
+                result = {
+                    'file': input_file,
+                    'success': False,
+                    'seconds': 0.0,
+                    'output_files': [],
+                    'error': str(e) or type(e).__name__,
+                    'stats': None
+                }
+            results[input_file] = result
+            if on_result:
+                on_result(result)
+
+    return [results[f] for f in files]
+
+def check_worker_options(session_options):
+    """
+    Raises ValueError for session options that cannot be used by the sessions
+    of pool workers: with panel_workers > 1 every worker would start a process
+    pool of its own.
+    """
+    panel_workers = session_options.get('panel_workers')
+    if panel_workers and panel_workers > 1:
+        raise ValueError("panel workers cannot be used when the files are already converted in "
+                         "worker processes; use --workers to set the number of processes")
+
+def _check_output_names(files):
+    """Raises ValueError when two files would write to the same output directory or archive."""
+    by_name = {}
+    for input_file in files:
+        # Case-insensitive, as on the Windows shares the output often goes to
+        base_name = os.path.splitext(os.path.basename(input_file))[0].lower()
+        by_name.setdefault(base_name, []).append(input_file)
+    clashes = [names for names in by_name.values() if len(names) > 1]
+    if clashes:
+        raise ValueError("files with the same name would overwrite each other's output: " +
+                         "; ".join(", ".join(names) for names in clashes))
+
+def _last_error_line(output):
+    """Picks the most relevant error line from captured converter output."""
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    for line in reversed(lines):
+        if line.startswith('❌'):
+            return line
+    return lines[-1] if lines else 'Conversion failed'
@@ -1,68 +1,291 @@
 """Main DXF to XML converter module."""
+import contextlib
+import logging
 import os
 import ezdxf
-from ..utils.helpers import get_bbox_dimensions_sorted
-from .xml_generator import create_panel_xml_structure, save_xml_file
-from .panel_processor import process_machining_entities_for_panel
+from ezdxf.document import Drawing
+from ..utils.helpers import group_entities_by_layer, get_layer_polylines
+from .xml_generator import create_panel_xml_structure, xml_to_bytes
+from .output_sink import create_sink
+from .panel_processor import process_machining_entities_for_panel, index_machining_entities
 from .panel_finder import find_and_group_panels
+from concurrent.futures import ProcessPoolExecutor
+from .spatial_index import build_border_index, index_borders
+from .snapshot import snapshot_panel_group
+from .geometry_cache import GeometryCache
+from .stats import ConversionStats, NULL_STATS
+from .layer_classifier import LayerClassifier
+from .panel_cache import panel_key, machines_to_entry, restore_machines
+from .dxf_reader import read_drawing, ExtractedDrawing
+from .panel_mirroring import (
+    find_right_sheet_border,
+    get_entities_within_border,
+    index_entity_points,
+    mirror_entities,
+    MirroredDrawing
+)
 
-def dxf_to_custom_xml(input_file, config, panel_thickness=16.0):
+logger = logging.getLogger(__name__)
+
+def mirror_and_convert(input_file, config, panel_thickness=16.0, panel_workers=None, stats=None,
+                       classifier=None, cache=None, fast_read=False, first_index=0, sink=None,
+                       archive=None, output_dir=None):
+    """
+    Reads a DXF file, mirrors its right sheet and converts the result in
+    memory. Returns what dxf_to_custom_xml returns. The mirrored entities are
+    lightweight records seen through a MirroredDrawing; the document itself
+    is not modified. input_file may also be a loaded Drawing.
+    Errors while reading or mirroring are raised to the caller.
+    stats is an optional ConversionStats filled in as the conversion runs.
+    fast_read reads the file with read_drawing instead of ezdxf.readfile.
+    sink, archive and output_dir are passed to dxf_to_custom_xml.
+    """
+    stats = stats or NULL_STATS
+    if classifier is None:
+        classifier = LayerClassifier(config['machining'])
+    if isinstance(input_file, (Drawing, ExtractedDrawing)):
+        doc = input_file
+    else:
+        with stats.stage('readfile'):
+            doc = load_drawing(input_file, config, classifier, fast_read)
+    layer_map = group_entities_by_layer(doc)
+    geometry = GeometryCache()
+    with stats.stage('mirroring'):
+        view = mirror_right_sheet(doc, config, layer_map, geometry)
+
+    # Process the mirrored document in memory, without a save/reload round trip
+    return dxf_to_custom_xml(view, config, panel_thickness=panel_thickness, panel_workers=panel_workers,
+                             layer_map=layer_map, geometry=geometry, stats=stats, classifier=classifier,
+                             cache=cache, first_index=first_index, sink=sink, archive=archive,
+                             output_dir=output_dir)
+
+def mirror_right_sheet(doc, config, layer_map, geometry):
+    """
+    Mirrors the rightmost sheet of doc about its own vertical centre line.
+    layer_map (the document's group_entities_by_layer result) is extended with
+    the mirrored entities. Returns the MirroredDrawing to convert.
+    """
+    sheet_border_layer = config['sheet_border']
+    sheet_borders = get_layer_polylines(layer_map, sheet_border_layer)
+    right_border = find_right_sheet_border(doc, sheet_border_layer, layer_map, geometry)
+    entity_index = index_entity_points(layer_map.in_drawing_order(layer_map), sheet_border_layer, geometry)
+    entities_in_right = get_entities_within_border(doc, right_border, sheet_border_layer, entity_index,
+                                                   geometry)
+
+    # Get bounding box and axis for mirroring
+    min_x, _, max_x, _ = geometry.bbox(right_border)
+    axis_x = (min_x + max_x) / 2
+    mirrored_entities = mirror_entities([right_border] + entities_in_right, (min_x, max_x), axis_x)
+    return MirroredDrawing(doc, mirrored_entities, layer_map, sheet_borders)
+
+def group_panels(doc, config, layer_map, geometry, stats=NULL_STATS, classifier=None):
+    """
+    Finds the physical panels of doc and buckets its machining entities by panel.
+    Returns (grouped_panels, machining_buckets, border_index); grouped_panels
+    is empty when the drawing has no panels.
+    """
+    with stats.stage('grouping'):
+        sheet_borders = doc.sheet_borders if isinstance(doc, MirroredDrawing) else None
+        grouped_panels = find_and_group_panels(doc, config, layer_map, geometry, sheet_borders)
+    if not grouped_panels:
+        return [], [], None
+
+    # Bucket machining entities by panel group in a single modelspace pass
+    with stats.stage('indexing'):
+        machining_buckets = index_machining_entities(doc, grouped_panels, config, geometry=geometry,
+                                                     stats=stats, classifier=classifier,
+                                                     layer_map=layer_map)
+        border_index = build_border_index(doc, config, layer_map=layer_map, geometry=geometry)
+    return grouped_panels, machining_buckets, border_index
+
+def dxf_to_custom_xml(input_file, config, panel_thickness=16.0, panel_workers=None, layer_map=None,
+                      geometry=None, stats=None, classifier=None, cache=None, fast_read=False,
+                      first_index=0, sink=None, archive=None, output_dir=None):
     """
     Main function to read DXF file, identify and process panels and their
     machining entities, and generate corresponding XML files.
     Uses layer names from config.
+    input_file may also be an already loaded ezdxf Drawing, ExtractedDrawing or
+    MirroredDrawing (as built by mirror_and_convert), which is converted without
+    re-reading it from disk; output names then come from the drawing's filename.
+    fast_read reads input_file with read_drawing, which keeps only the entities
+    used here, instead of loading the whole document with ezdxf.readfile.
+    first_index is the number of panels already written for this file by
+    earlier calls, so panel numbers in the file names continue from there.
+    With panel_workers > 1 the panels are processed in that many worker
+    processes from picklable snapshots; the files written are identical.
+    The XML files go to sink, an OutputSink that stores them in the background
+    while the next panels are processed; the caller closes it. Without a sink
+    they go to the directory named after the DXF in output_dir (default: the
+    working directory), or with archive ('zip' or 'tar') to a single archive
+    there (see create_sink), which appears only once every panel has been written.
+    layer_map is the document's group_entities_by_layer result and geometry its
+    GeometryCache, shared by the grouping, indexing and panel stages; both are
+    built here when not given.
+    stats is an optional ConversionStats that receives stage timings, operation
+    and skip counts and the files written; without it nothing is measured.
+    classifier is the LayerClassifier compiled from config['machining'], as kept
+    by a ConverterSession; it is built once per call when not given.
+    cache is an optional PanelCache: panels whose geometry, machining, thickness
+    and config are unchanged reuse their cached machining instead of being
+    processed again.
+    Returns the list of XML files written, or None if the conversion failed.
     """
+    stats = stats or NULL_STATS
     try:
-        # Create output directory based on DXF filename
-        dxf_base_name = os.path.splitext(os.path.basename(input_file))[0]
-        output_dir = os.path.join(os.path.dirname(input_file), dxf_base_name)
-        os.makedirs(output_dir, exist_ok=True)
-        print(f"DEBUG: مسیر خروجی '{output_dir}' ایجاد شد.")
+        if isinstance(input_file, (Drawing, ExtractedDrawing, MirroredDrawing)):
+            doc = input_file
+            input_file = doc.filename or 'drawing.dxf'
+        else:
+            doc = None
+
+        if classifier is None:
+            classifier = LayerClassifier(config['machining'])
 
         # Load the DXF document
-        doc = ezdxf.readfile(input_file)
-        print(f"DEBUG: فایل DXF '{input_file}' با موفقیت بارگذاری شد.")
+        if doc is None:
+            with stats.stage('readfile'):
+                doc = load_drawing(input_file, config, classifier, fast_read)
+            logger.debug("DEBUG: فایل DXF '%s' با موفقیت بارگذاری شد.", input_file)
 
-        # Find and group physical panels
-        grouped_panels = find_and_group_panels(doc, config)
+        # Map layers to entities once for all stages
+        if layer_map is None:
+            layer_map = group_entities_by_layer(doc)
+        if geometry is None:
+            geometry = GeometryCache()
 
+        # Find and group physical panels
+        grouped_panels, machining_buckets, border_index = group_panels(doc, config, layer_map, geometry,
+                                                                       stats, classifier)
         if not grouped_panels:
-            print(f"❌ خطا: هیچ پنل فیزیکی برای پردازش یافت نشد.")
+            logger.error("❌ خطا: هیچ پنل فیزیکی برای پردازش یافت نشد.")
             return
 
         # Get the base name of the input DXF file without extension
         dxf_base_name = os.path.splitext(os.path.basename(input_file))[0]
 
         # Process each grouped physical panel
-        for i, panel_group_info in enumerate(grouped_panels):
-            _process_panel(i, panel_group_info, dxf_base_name, panel_thickness, doc, config)
+        output_files = []
+        with _output_sink(sink, dxf_base_name, archive, output_dir, stats) as sink:
+            if panel_workers and panel_workers > 1 and len(grouped_panels) > 1:
+                panels = [(first_index + i, group, bucket)
+                          for i, (group, bucket) in enumerate(zip(grouped_panels, machining_buckets))]
+                return process_panels_in_workers(panels, dxf_base_name, panel_thickness, config,
+                                                 panel_workers, sink, stats, cache)
+
+            for i, panel_group_info in enumerate(grouped_panels):
+                file_name, data = _process_panel(first_index + i, panel_group_info, dxf_base_name,
+                                                 panel_thickness, doc, config, machining_buckets[i],
+                                                 border_index, geometry, stats, classifier, cache)
+                output_files.append(_save_panel(sink, first_index + i, panel_group_info['type'],
+                                                file_name, data, stats))
+        return output_files
 
     except FileNotFoundError:
-        print(f"❌ خطا: فایل ورودی '{input_file}' یافت نشد.")
+        logger.error("❌ خطا: فایل ورودی '%s' یافت نشد.", input_file)
     except ezdxf.DXFStructureError:
-        print(f"❌ خطا: فایل '{input_file}' یک فایل DXF معتبر نیست یا خراب است.")
+        logger.error("❌ خطا: فایل '%s' یک فایل DXF معتبر نیست یا خراب است.", input_file)
     except Exception as e:
-        print(f"❌ خطا در پردازش فایل DXF: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("❌ خطا در پردازش فایل DXF: %s", e, exc_info=True)
+
+def load_drawing(input_file, config, classifier, fast_read=False):
+    """Reads a DXF file with read_drawing when fast_read is set, else with ezdxf.readfile."""
+    if fast_read:
+        return read_drawing(input_file, config, classifier)
+    return ezdxf.readfile(input_file)
 
-def _process_panel(index, panel_group_info, dxf_base_name, panel_thickness, doc, config):
-    """Process a single panel group and generate its XML file."""
+def process_panels_in_workers(panels, dxf_base_name, panel_thickness, config, panel_workers, sink,
+                              stats=NULL_STATS, cache=None):
+    """
+    Fans panel processing out to worker processes. panels holds one
+    (index, panel_group_info, machining_entities) tuple per panel. The workers
+    return the XML of each panel and this process hands it to sink, an
+    OutputSink closed by the caller.
+    Returns the files in the order of panels.
+    """
+    snapshots = [(index, *snapshot_panel_group(group, bucket)) for index, group, bucket in panels]
+    with ProcessPoolExecutor(max_workers=min(panel_workers, len(snapshots))) as executor:
+        futures = submit_panel_snapshots(executor, snapshots, dxf_base_name, panel_thickness, config,
+                                         stats, cache)
+        return [save_panel_result(sink, index, panel_type, future, stats)
+                for index, panel_type, future in futures]
+
+def submit_panel_snapshots(executor, snapshots, dxf_base_name, panel_thickness, config, stats=NULL_STATS,
+                           cache=None):
+    """
+    Submits the processing of panel snapshots, (index, group_snapshot,
+    machining_snapshots) tuples as made by snapshot_panel_group, to executor.
+    Returns an (index, panel_type, future) tuple per panel for save_panel_result.
+    """
+    return [(index, group_snapshot['type'],
+             executor.submit(_process_panel_snapshot, index, group_snapshot, machining_snapshots,
+                             dxf_base_name, panel_thickness, config, stats.enabled, cache))
+            for index, group_snapshot, machining_snapshots in snapshots]
+
+def save_panel_result(sink, index, panel_type, future, stats=NULL_STATS):
+    """Waits for a panel submitted by submit_panel_snapshots, hands its XML to sink and returns its path."""
+    file_name, data, worker_stats = future.result()
+    if worker_stats is not None:
+        stats.merge(worker_stats)
+    return _save_panel(sink, index, panel_type, file_name, data, stats)
+
+@contextlib.contextmanager
+def _output_sink(sink, dxf_base_name, archive=None, output_dir=None, stats=NULL_STATS):
+    """Yields sink, or a sink of its own for dxf_base_name that is committed if the block succeeds."""
+    if sink is not None:
+        yield sink
+        return
+    with create_sink(dxf_base_name, archive, output_dir, stats=stats) as own_sink:
+        yield own_sink
+
+def _save_panel(sink, index, panel_type, file_name, data, stats=NULL_STATS):
+    """Hands the XML of one panel to sink and returns the path it is written to."""
+    sink.write(file_name, data)
+    output_file = sink.location(file_name)
+    if stats.enabled:
+        stats.add_output(output_file, len(data))
+
+    logger.info("✅ فایل '%s' با موفقیت برای پنل فیزیکی شماره %d (نوع: %s) ایجاد شد.",
+                output_file, index+1, panel_type)
+    logger.debug("DEBUG: --- پایان پردازش پنل فیزیکی شماره %d ---", index+1)
+    return output_file
+
+def _process_panel_snapshot(index, group_snapshot, machining_snapshots, dxf_base_name,
+                            panel_thickness, config, collect_stats=False, cache=None):
+    """
+    Worker side of process_panels_in_workers; runs without the DXF document.
+    Returns (file_name, data, stats), stats being None unless collect_stats is set;
+    the stats carry this worker's peak memory.
+    """
+    stats = ConversionStats() if collect_stats else None
+    geometry = GeometryCache()
+    border_index = index_borders(group_snapshot['borders'], geometry=geometry)
+    file_name, data = _process_panel(index, group_snapshot, dxf_base_name, panel_thickness, None, config,
+                                     machining_snapshots, border_index, geometry, stats, cache=cache)
+    if stats is not None:
+        stats.record_worker_memory()
+    return file_name, data, stats
+
+def _process_panel(index, panel_group_info, dxf_base_name, panel_thickness, doc, config,
+                   machining_entities=None, border_index=None, geometry=None, stats=None,
+                   classifier=None, cache=None):
+    """
+    Process a single panel group and generate its XML. Returns (file_name, data),
+    the bare XML file name and its serialized bytes, for an OutputSink.
+    """
+    stats = stats or NULL_STATS
+    if geometry is None:
+        geometry = GeometryCache()
     primary_border_entity = panel_group_info['primary_border']
-    panel_xml_width, panel_xml_length = get_bbox_dimensions_sorted(
-        list(primary_border_entity.vertices())
-    )
+    panel_xml_width, panel_xml_length = geometry.dims(primary_border_entity)
     length = panel_xml_length
     width = panel_xml_width
 
-    print(f"\nDEBUG: --- شروع پردازش پنل فیزیکی شماره {index+1} (نوع: {panel_group_info['type']}) ---")
-    print(f"DEBUG:   ابعاد پنل در XML (Length x Width): {length:.3f} x {width:.3f}")
+    logger.debug("\nDEBUG: --- شروع پردازش پنل فیزیکی شماره %d (نوع: %s) ---", index+1, panel_group_info['type'])
+    logger.debug("DEBUG:   ابعاد پنل در XML (Length x Width): %.3f x %.3f", length, width)
 
-    # Create output directory and filename
-    output_dir = os.path.join(os.getcwd(), dxf_base_name)
-    os.makedirs(output_dir, exist_ok=True)
+    # Create output filename
     output_file_name_base = f"{dxf_base_name}.{length:.0f}x{width:.0f}.{index+1}"
-    output_file = os.path.join(output_dir, f"{output_file_name_base}.xml")
 
     # Create XML structure
     root, panel_element = create_panel_xml_structure(
@@ -73,19 +296,38 @@ def _process_panel(index, panel_group_info, dxf_base_name, panel_thickness, doc,
         panel_thickness
     )
 
-    # Process machining entities
-    process_machining_entities_for_panel(
-        doc,
-        panel_element,
-        panel_group_info,
-        length,
-        width,
-        panel_thickness,
-        config
-    )
+    # Reuse the machining of an unchanged panel from the cache
+    cache_key = None
+    cached_machines = None
+    if cache is not None:
+        if machining_entities is None:
+            machining_entities = index_machining_entities(doc, [panel_group_info], config,
+                                                          classifier=classifier)[0]
+        cache_key = panel_key(panel_group_info, machining_entities, panel_thickness, config, geometry)
+        cached_machines = cache.get(cache_key)
+        stats.count_cache(cached_machines is not None)
 
-    # Save XML file
-    save_xml_file(root, output_file)
+    if cached_machines is not None:
+        restore_machines(panel_element.find('Machines'), cached_machines)
+    else:
+        # Process machining entities
+        process_machining_entities_for_panel(
+            doc,
+            panel_element,
+            panel_group_info,
+            length,
+            width,
+            panel_thickness,
+            config,
+            machining_entities,
+            border_index,
+            stats,
+            classifier
+        )
+        if cache is not None:
+            cache.put(cache_key, machines_to_entry(panel_element.find('Machines')))
 
-    print(f"✅ فایل '{output_file}' با موفقیت برای پنل فیزیکی شماره {index+1} (نوع: {panel_group_info['type']}) ایجاد شد.")
-    print(f"DEBUG: --- پایان پردازش پنل فیزیکی شماره {index+1} ---")
+    # Serialize the XML file
+    with stats.stage('xml_serialize'):
+        data = xml_to_bytes(root)
+    return f"{output_file_name_base}.xml", data
@@ -1,55 +1,123 @@
 """Coordinate transformation functions for DXF to XML conversion."""
+import numpy as np
 
-def convert_coords_to_panel_system(entity_x, entity_y, panel_type, panel_xml_length, panel_xml_width,
-                                 primary_bbox_panel, secondary_bbox_panel, 
-                                 sheet_border_front_bbox, sheet_border_back_bbox, tolerance=0.1):
+# XML face codes of points on the front and back sheets
+FRONT_FACE = "5"
+BACK_FACE = "6"
+
+class PanelTransform:
     """
-    Converts DXF coordinates to panel coordinate system.
-    Returns (x, y, face) tuple where face is "5" for front or "6" for back.
-    Returns (None, None, None) if conversion fails.
+    The conversion of convert_coords_to_panel_system for one panel, with
+    everything that does not depend on the point worked out once: the region
+    of each face (its sheet bbox grown by tolerance), the translation to the
+    panel's bbox on that sheet, the DXF Y -> XML X axis swap, the mirror of the
+    back face and the panel bounds with their tolerance.
+    convert() takes one point, convert_batch() arrays of points; both give
+    exactly the results of the functions below.
     """
-    # Use a larger tolerance for checking if entity is within bounds
-    check_tolerance = max(1.0, tolerance)
-    
-    # Function implementation goes here - will copy from original code
-    # This is just a placeholder for now
-    
-    # For coordinates within front sheet
-    if (sheet_border_front_bbox is not None and
-        sheet_border_front_bbox[0] - tolerance <= entity_x <= sheet_border_front_bbox[2] + tolerance and
-        sheet_border_front_bbox[1] - tolerance <= entity_y <= sheet_border_front_bbox[3] + tolerance):
-        # Process front sheet coordinates
-        face = "5"
-        # Convert coordinates relative to panel bbox
-        if secondary_bbox_panel:
-            rel_x = entity_y - secondary_bbox_panel[1]  # Y in DXF -> X in XML
-            rel_y = entity_x - secondary_bbox_panel[0]  # X in DXF -> Y in XML
+    __slots__ = ('faces', 'bounds')
+
+    def __init__(self, panel_xml_length, panel_xml_width, primary_bbox_panel, secondary_bbox_panel,
+                 sheet_border_front_bbox, sheet_border_back_bbox, tolerance=0.1):
+        # One (region, face, origin, mirror_width) per sheet; origin is None when
+        # the panel has no bbox on that sheet, which rejects the sheet's points
+        self.faces = []
+        for sheet_bbox, face, panel_bbox, mirror_width in (
+                (sheet_border_front_bbox, FRONT_FACE, secondary_bbox_panel, None),
+                (sheet_border_back_bbox, BACK_FACE, primary_bbox_panel, panel_xml_width)):
+            if sheet_bbox is None:
+                continue
+            region = (sheet_bbox[0] - tolerance, sheet_bbox[1] - tolerance,
+                      sheet_bbox[2] + tolerance, sheet_bbox[3] + tolerance)
+            origin = (panel_bbox[0], panel_bbox[1]) if panel_bbox else None
+            self.faces.append((region, face, origin, mirror_width))
+
+        # Use a larger tolerance for checking if the point is within the panel
+        check_tolerance = max(1.0, tolerance)
+        self.bounds = (-check_tolerance, -check_tolerance,
+                       panel_xml_length + check_tolerance, panel_xml_width + check_tolerance)
+
+    @classmethod
+    def for_panel(cls, panel_group_info, panel_xml_length, panel_xml_width, tolerance=0.1):
+        """Builds the transform of a panel group as found by find_and_group_panels."""
+        return cls(panel_xml_length, panel_xml_width,
+                   panel_group_info['primary_bbox'], panel_group_info.get('secondary_bbox'),
+                   panel_group_info['sheet_border_front_bbox'], panel_group_info['sheet_border_back_bbox'],
+                   tolerance)
+
+    def convert(self, x, y):
+        """Returns the (x, y, face) of the DXF point on the panel, or (None, None, None)."""
+        for (min_x, min_y, max_x, max_y), face, origin, mirror_width in self.faces:
+            if min_x <= x <= max_x and min_y <= y <= max_y:
+                break
         else:
             return None, None, None
+        if origin is None:
+            return None, None, None
 
-    # For coordinates within back sheet
-    elif (sheet_border_back_bbox is not None and
-          sheet_border_back_bbox[0] - tolerance <= entity_x <= sheet_border_back_bbox[2] + tolerance and
-          sheet_border_back_bbox[1] - tolerance <= entity_y <= sheet_border_back_bbox[3] + tolerance):
-        # Process back sheet coordinates
-        face = "6"
-        # Convert coordinates relative to panel bbox
-        if primary_bbox_panel:
-            rel_x = entity_y - primary_bbox_panel[1]  # Y in DXF -> X in XML
-            rel_y = entity_x - primary_bbox_panel[0]  # X in DXF -> Y in XML
-            # Mirror Y coordinate for back face
-            rel_y = panel_xml_width - rel_y
-        else:
+        rel_x = y - origin[1]  # Y in DXF -> X in XML
+        rel_y = x - origin[0]  # X in DXF -> Y in XML
+        if mirror_width is not None:
+            rel_y = mirror_width - rel_y
+
+        min_x, min_y, max_x, max_y = self.bounds
+        if not (min_x <= rel_x <= max_x and min_y <= rel_y <= max_y):
             return None, None, None
-    else:
-        # Entity is not within either sheet border
-        return None, None, None
+        return rel_x, rel_y, face
+
+    def convert_batch(self, xs, ys):
+        """
+        Converts arrays of DXF points. Returns (rel_x, rel_y, faces) arrays;
+        points that fail conversion get NaN coordinates and an empty face code.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        rel_x = np.full(xs.shape, np.nan)
+        rel_y = np.full(xs.shape, np.nan)
+        faces = np.full(xs.shape, '', dtype='<U1')
 
-    # Check if converted coordinates are within panel bounds (with tolerance)
-    is_within_bounds = (-check_tolerance <= rel_x <= panel_xml_length + check_tolerance and
-                       -check_tolerance <= rel_y <= panel_xml_width + check_tolerance)
+        claimed = np.zeros(xs.shape, dtype=bool)
+        for (min_x, min_y, max_x, max_y), face, origin, mirror_width in self.faces:
+            on_face = (min_x <= xs) & (xs <= max_x) & (min_y <= ys) & (ys <= max_y) & ~claimed
+            claimed |= on_face
+            if origin is None:
+                continue
+            rel_x[on_face] = ys[on_face] - origin[1]
+            if mirror_width is None:
+                rel_y[on_face] = xs[on_face] - origin[0]
+            else:
+                rel_y[on_face] = mirror_width - (xs[on_face] - origin[0])
+            faces[on_face] = face
 
-    if not is_within_bounds:
-        return None, None, None
+        # NaN compares False, so points without a face drop out here as well
+        min_x, min_y, max_x, max_y = self.bounds
+        is_within_bounds = (min_x <= rel_x) & (rel_x <= max_x) & (min_y <= rel_y) & (rel_y <= max_y)
+        rel_x[~is_within_bounds] = np.nan
+        rel_y[~is_within_bounds] = np.nan
+        faces[~is_within_bounds] = ''
+        return rel_x, rel_y, faces
 
-    return rel_x, rel_y, face
+def convert_coords_to_panel_system(entity_x, entity_y, panel_type, panel_xml_length, panel_xml_width,
+                                 primary_bbox_panel, secondary_bbox_panel, 
+                                 sheet_border_front_bbox, sheet_border_back_bbox, tolerance=0.1):
+    """
+    Converts DXF coordinates to panel coordinate system.
+    Returns (x, y, face) tuple where face is "5" for front or "6" for back.
+    Returns (None, None, None) if conversion fails.
+    Converting many points of one panel is cheaper with a PanelTransform.
+    """
+    return PanelTransform(panel_xml_length, panel_xml_width, primary_bbox_panel, secondary_bbox_panel,
+                          sheet_border_front_bbox, sheet_border_back_bbox, tolerance).convert(entity_x, entity_y)
+
+def convert_coords_to_panel_system_batch(entity_xs, entity_ys, panel_type, panel_xml_length, panel_xml_width,
+                                         primary_bbox_panel, secondary_bbox_panel,
+                                         sheet_border_front_bbox, sheet_border_back_bbox, tolerance=0.1):
+    """
+    Vectorized convert_coords_to_panel_system for many points at once, with the
+    same sheet tests, axis swap, back-face mirroring and tolerances.
+    Returns (rel_x, rel_y, faces) arrays. Points that fail conversion get NaN
+    coordinates and an empty face code.
+    """
+    return PanelTransform(panel_xml_length, panel_xml_width, primary_bbox_panel, secondary_bbox_panel,
+                          sheet_border_front_bbox, sheet_border_back_bbox,
+                          tolerance).convert_batch(entity_xs, entity_ys)
@@ -0,0 +1,142 @@
+"""Fast DXF reader that extracts only the entities the converter uses."""
+import ezdxf
+from ezdxf.filemanagement import dxf_file_info
+from ezdxf.lldxf.validator import is_binary_dxf_file
+from ezdxf.math import Vec3
+from .layer_classifier import LayerClassifier
+from .snapshot import EntitySnapshot
+
+# Entity types the converter reads; everything else is skipped unparsed
+EXTRACTED_TYPES = ('CIRCLE', 'LWPOLYLINE')
+
+# Group codes kept for the extracted entities: layer, coordinates, radius, paperspace flag, flags
+_KEPT_CODES = frozenset((8, 10, 20, 30, 40, 67, 70))
+
+class ExtractedDrawing:
+    """
+    The modelspace of a DXF file reduced to the CIRCLE and LWPOLYLINE entities
+    on the structural and machining layers, as EntitySnapshot records in file
+    order. It can be converted wherever a loaded ezdxf Drawing can.
+    """
+    def __init__(self, filename, entities):
+        self.filename = filename
+        self.entities = entities
+
+    def modelspace(self):
+        return self.entities
+
+def read_drawing(filename, config, classifier=None):
+    """
+    Reads the ENTITIES section of an ASCII DXF file tag by tag and keeps only
+    what the converter uses (see ExtractedDrawing). Blocks, tables, objects,
+    paperspace and every other entity type or layer are skipped without being
+    parsed, so large CAD exports load much faster and take far less memory
+    than with ezdxf.readfile. Binary DXF files are read with ezdxf instead.
+    classifier is the LayerClassifier compiled from config['machining'].
+    Raises FileNotFoundError, or ezdxf.DXFStructureError for invalid files.
+    """
+    return ExtractedDrawing(filename, list(iter_entities(filename, config, classifier)))
+
+def iter_entities(filename, config, classifier=None, sheet_borders_only=False):
+    """
+    Yields the entities read_drawing keeps, one at a time in file order, so a
+    caller can go through a file without holding all of it. With
+    sheet_borders_only only the sheet borders are yielded.
+    """
+    if classifier is None:
+        classifier = LayerClassifier(config['machining'])
+    sheet_border_layer = config['sheet_border'].upper()
+    structural_layers = {config[key].upper() for key in ('part_border', 'cutting_lines', 'sheet_border')}
+
+    def is_wanted(dxftype, layer):
+        if sheet_borders_only:
+            return dxftype == 'LWPOLYLINE' and layer.upper() == sheet_border_layer
+        if dxftype == 'LWPOLYLINE' and layer.upper() in structural_layers:
+            return True
+        return classifier.classify(dxftype, layer)[0] is not None
+
+    if is_binary_dxf_file(filename):
+        doc = ezdxf.readfile(filename)
+        for e in doc.modelspace():
+            if e.dxftype() in EXTRACTED_TYPES and is_wanted(e.dxftype(), e.dxf.layer):
+                yield EntitySnapshot(e)
+        return
+
+    encoding = dxf_file_info(filename).encoding
+    with open(filename, encoding=encoding, errors='surrogateescape') as stream:
+        for entity in _read_entities(stream):
+            if is_wanted(entity.dxftype(), entity.dxf.layer):
+                yield entity
+
+def _read_entities(stream):
+    """Yields an EntitySnapshot for every modelspace CIRCLE and LWPOLYLINE of the ENTITIES section."""
+    tags = _ascii_tags(stream)
+    for code, value in tags:
+        if code == 0 and value == 'SECTION':
+            code, value = next(tags, (None, None))
+            if code == 2 and value == 'ENTITIES':
+                break
+    else:
+        raise ezdxf.DXFStructureError("DXF file has no ENTITIES section")
+
+    dxftype = None
+    entity_tags = []
+    for code, value in tags:
+        if code == 0:
+            if dxftype is not None:
+                entity = _build_entity(dxftype, entity_tags)
+                if entity is not None:
+                    yield entity
+            if value == 'ENDSEC':
+                return
+            dxftype = value if value in EXTRACTED_TYPES else None
+            entity_tags = []
+        elif dxftype is not None and code in _KEPT_CODES:
+            entity_tags.append((code, value))
+    raise ezdxf.DXFStructureError("ENTITIES section is not terminated")
+
+def _build_entity(dxftype, entity_tags):
+    """Returns the EntitySnapshot of one entity's tags, or None for paperspace entities."""
+    layer = '0'
+    flags = 0
+    radius = 1.0
+    xs, ys = [], []
+    z = 0.0
+    for code, value in entity_tags:
+        if code == 8:
+            layer = value
+        elif code == 10:
+            xs.append(float(value))
+        elif code == 20:
+            ys.append(float(value))
+        elif code == 30:
+            z = float(value)
+        elif code == 40:
+            radius = float(value)
+        elif code == 67:
+            if int(value) == 1:
+                return None
+        elif code == 70:
+            flags = int(value)
+    if len(xs) != len(ys):
+        raise ezdxf.DXFStructureError(f"{dxftype} on layer '{layer}' has an incomplete vertex")
+
+    if dxftype == 'CIRCLE':
+        center = Vec3(xs[0], ys[0], z) if xs else Vec3()
+        return EntitySnapshot.from_values(dxftype, layer, center=center, radius=radius)
+    return EntitySnapshot.from_values(dxftype, layer, flags=flags, vertices=list(zip(xs, ys)))
+
+def _ascii_tags(stream):
+    """Yields (group code, value) pairs of an ASCII DXF stream, without comments."""
+    readline = stream.readline
+    while True:
+        code = readline()
+        value = readline()
+        if not value:
+            return
+        try:
+            code = int(code)
+        except ValueError:
+            raise ezdxf.DXFStructureError(f'Invalid group code "{code.strip()}"')
+        if code != 999:
+            yield code, value.rstrip('\n')
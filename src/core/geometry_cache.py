@@ -0,0 +1,85 @@
+"""Per-document cache of polyline geometry backed by compact arrays."""
+import numpy as np
+
+# Columns of the per-polyline record array
+_START, _COUNT, _MIN_X, _MIN_Y, _MAX_X, _MAX_Y, _CLOSED = range(7)
+
+class GeometryCache:
+    """
+    Extracts the vertices of each polyline once and keeps them, with the bounding
+    box and closed flag, in growable float64 arrays instead of per-entity lists.
+    Dimensions and centre are derived from the stored bounding box.
+    Works with ezdxf LWPOLYLINE entities and anything else that provides
+    vertices() and dxf.flags, such as EntitySnapshot.
+    """
+    def __init__(self, initial_capacity=1024):
+        self._index = {}
+        self._records = np.empty((initial_capacity, 7), dtype=np.float64)
+        self._vertex_buffer = np.empty((initial_capacity * 4, 2), dtype=np.float64)
+        self._vertex_count = 0
+
+    def __len__(self):
+        return len(self._index)
+
+    def vertices(self, entity):
+        """Returns the polyline's (x, y) vertices as an (n, 2) array view."""
+        record = self._record(entity)
+        start = int(record[_START])
+        return self._vertex_buffer[start:start + int(record[_COUNT])]
+
+    def bbox(self, entity):
+        """Returns (min_x, min_y, max_x, max_y) like get_bbox, including its value for no vertices."""
+        record = self._record(entity)
+        return tuple(record[_MIN_X:_MAX_Y + 1].tolist())
+
+    def dims(self, entity):
+        """Returns the bounding box dimensions sorted (smallest, largest) like get_bbox_dimensions_sorted."""
+        min_x, min_y, max_x, max_y = self.bbox(entity)
+        if min_x == float('inf'):
+            return 0.0, 0.0
+        width = max_x - min_x
+        height = max_y - min_y
+        return round(min(width, height), 3), round(max(width, height), 3)
+
+    def center(self, entity):
+        """Returns the centre of the bounding box, or (None, None) for no vertices."""
+        min_x, min_y, max_x, max_y = self.bbox(entity)
+        if min_x == float('inf'):
+            return None, None
+        return (min_x + max_x) / 2.0, (min_y + max_y) / 2.0
+
+    def is_closed(self, entity):
+        return bool(self._record(entity)[_CLOSED])
+
+    def _record(self, entity):
+        index = self._index.get(entity)
+        if index is None:
+            index = self._add(entity)  # May grow (replace) the record array
+        return self._records[index]
+
+    def _add(self, entity):
+        vertices = np.array([(v[0], v[1]) for v in entity.vertices()], dtype=np.float64).reshape(-1, 2)
+        count = len(vertices)
+
+        index = len(self._index)
+        if index == len(self._records):
+            self._records = np.resize(self._records, (2 * len(self._records), 7))
+        required = self._vertex_count + count
+        if required > len(self._vertex_buffer):
+            self._vertex_buffer = np.resize(self._vertex_buffer, (max(required, 2 * len(self._vertex_buffer)), 2))
+
+        self._vertex_buffer[self._vertex_count:required] = vertices
+        record = self._records[index]
+        record[_START] = self._vertex_count
+        record[_COUNT] = count
+        if count:
+            record[_MIN_X:_MIN_Y + 1] = vertices.min(axis=0)
+            record[_MAX_X:_MAX_Y + 1] = vertices.max(axis=0)
+        else:
+            record[_MIN_X:_MIN_Y + 1] = np.inf
+            record[_MAX_X:_MAX_Y + 1] = -np.inf
+        record[_CLOSED] = bool(entity.dxf.flags & 1)
+
+        self._vertex_count = required
+        self._index[entity] = index
+        return index
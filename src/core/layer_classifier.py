@@ -0,0 +1,55 @@
+"""Classification of machining layers compiled once from the machining config."""
+from .machining_operations import _compile_depth_pattern
+
+# Entity type each operation kind is drawn with
+OPERATION_ENTITY_TYPES = {
+    'drilling': 'CIRCLE',
+    'pocket': 'LWPOLYLINE',
+    'groove': 'LWPOLYLINE'
+}
+
+class LayerClassifier:
+    """
+    Classifies (entity type, layer name) pairs into a machining operation kind
+    and the depth carried by the layer name.
+    All layer patterns of the machining config are compiled up front, and the
+    result is memoized per distinct layer, since a drawing has dozens of layers
+    but tens of thousands of entities.
+    Entries with a 'layer_pattern' (drilling, groove) match layers like
+    'ABF_D8'; any other entry is a literal pocket layer such as 'ABF_DSIDE_8'.
+    """
+    def __init__(self, machining_config):
+        self._literal_layers = []
+        self._patterns = []
+        for name, operation_config in machining_config.items():
+            if 'layer_pattern' in operation_config:
+                self._patterns.append((name, _compile_depth_pattern(operation_config['layer_pattern'])))
+            else:
+                self._literal_layers.append((name.upper(), 'pocket'))
+        self._cache = {}
+
+    def classify(self, entity_type, layer_name):
+        """Returns (operation_kind, depth), or (None, None) for non-machining entities."""
+        key = (entity_type, layer_name)
+        result = self._cache.get(key)
+        if result is None:
+            result = self._cache[key] = self._classify(entity_type, layer_name.upper())
+        return result
+
+    def is_machining_layer(self, layer_name):
+        """Tells whether entities on this layer can be machining operations."""
+        return any(self.classify(entity_type, layer_name)[0] is not None
+                   for entity_type in set(OPERATION_ENTITY_TYPES.values()))
+
+    def _classify(self, entity_type, layer_name):
+        # Literal layers win over patterns, like the pocket check before the groove check
+        for literal_layer, kind in self._literal_layers:
+            if layer_name == literal_layer and OPERATION_ENTITY_TYPES[kind] == entity_type:
+                return kind, None
+        for kind, regex in self._patterns:
+            if OPERATION_ENTITY_TYPES.get(kind) != entity_type:
+                continue
+            match = regex.match(layer_name)
+            if match:
+                return kind, int(match.group(1))
+        return None, None
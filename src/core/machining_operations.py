@@ -1,24 +1,33 @@
 """XML creation functions for different types of machining operations."""
+import logging
 import math
 import re
+from functools import lru_cache
 import xml.etree.ElementTree as ET
-from typing import Dict, List, Tuple, Optional
-from .coordinates import convert_coords_to_panel_system
+from typing import Dict, List, NamedTuple, Tuple, Optional
+from .coordinates import PanelTransform
 from ..utils.config import DXF_LAYER_CONFIG
 from ..utils.helpers import get_bbox
 
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def _compile_depth_pattern(pattern: str):
+    """Compiles a layer pattern such as 'ABF_D{depth}' into a regex with the depth as group 1."""
+    # Convert pattern to regex by escaping special chars and replacing {depth} with capture group
+    regex_pattern = (pattern.replace('.', r'\.')
+                          .replace('*', r'\*')
+                          .replace('{depth}', r'(\d+)'))
+    return re.compile(regex_pattern, re.IGNORECASE)
+
 def _extract_depth_from_layer(layer_name: str, pattern: str) -> Optional[int]:
     """Extract depth value from layer name using the configured pattern."""
     try:
-        # Convert pattern to regex by escaping special chars and replacing {depth} with capture group
-        regex_pattern = (pattern.replace('.', r'\.')
-                              .replace('*', r'\*')
-                              .replace('{depth}', r'(\d+)'))
-        match = re.match(regex_pattern, layer_name, re.IGNORECASE)
+        match = _compile_depth_pattern(pattern).match(layer_name)
         if match:
             return int(match.group(1))
     except Exception as e:
-        print(f"DEBUG: Error extracting depth from layer {layer_name}: {e}")
+        logger.debug("DEBUG: Error extracting depth from layer %s: %s", layer_name, e)
     return None
 
 def _validate_depth(depth: int, config: Dict) -> bool:
@@ -30,9 +39,24 @@ def _validate_depth(depth: int, config: Dict) -> bool:
     except KeyError:
         return True  # If validation config is missing, assume valid
 
+class ResolvedOperation(NamedTuple):
+    """
+    A machining entity resolved once for a panel: its converted coordinates and
+    the depth parsed from its layer, ready to be passed to an XML builder.
+    """
+    kind: str                   # 'drilling', 'pocket' or 'groove'
+    entity: object              # Source DXF entity (or EntitySnapshot)
+    layer: str                  # Upper-cased layer name
+    depth: Optional[int]        # Depth from the layer name; None for pockets
+    x: Optional[float] = None   # Converted center, drilling only
+    y: Optional[float] = None
+    face: Optional[str] = None
+    force_face: Optional[str] = None
+
 def create_drilling_xml(machines_element, entity, panel_type, panel_length, panel_width,
                        primary_bbox_panel, secondary_bbox_panel, sheet_border_front_bbox,
-                       sheet_border_back_bbox, tolerance, config, force_face=None, mirror_x=False):
+                       sheet_border_back_bbox, tolerance, config, force_face=None, mirror_x=False,
+                       transform=None):
     """Creates XML for drilling operations (Type 2).
     
     Args:
@@ -49,41 +73,50 @@ def create_drilling_xml(machines_element, entity, panel_type, panel_length, pane
         config: Drilling configuration
         force_face: If provided, use this face number instead of calculated one
         mirror_x: If True, mirror the X coordinate for back-side operations
+        transform: The panel's PanelTransform; built from the bounding boxes when omitted
     """
+    if transform is None:
+        transform = PanelTransform(panel_length, panel_width, primary_bbox_panel, secondary_bbox_panel,
+                                   sheet_border_front_bbox, sheet_border_back_bbox, tolerance)
     center = entity.dxf.center
-    rel_x, rel_y, face = convert_coords_to_panel_system(
-        center.x, center.y, panel_type, panel_length, panel_width,
-        primary_bbox_panel, secondary_bbox_panel,
-        sheet_border_front_bbox, sheet_border_back_bbox, tolerance
-    )
+    rel_x, rel_y, face = transform.convert(center.x, center.y)
 
     if rel_x is None or rel_y is None or face is None:
-        print(f"DEBUG: Invalid coordinates for drilling operation")
+        logger.debug("DEBUG: Invalid coordinates for drilling operation")
         return
 
     layer_name = entity.dxf.layer.upper()
-    drilling_config = DXF_LAYER_CONFIG['machining']['drilling']
-    
-    # Extract and validate depth
-    depth = _extract_depth_from_layer(layer_name, drilling_config['layer_pattern'])
+    depth = _extract_depth_from_layer(layer_name, config['layer_pattern'])
+
+    operation = ResolvedOperation('drilling', entity, layer_name, depth, rel_x, rel_y, face, force_face)
+    create_drilling_xml_for_operation(machines_element, operation, panel_length, config, mirror_x=mirror_x)
+
+def create_drilling_xml_for_operation(machines_element, operation, panel_length, config, mirror_x=False):
+    """Creates XML for an already resolved drilling operation (Type 2); config is the drilling config."""
+    drilling_config = config
+    depth = operation.depth
+
+    # Validate depth
     if depth is None or not _validate_depth(depth, drilling_config):
-        print(f"DEBUG: Invalid drilling depth in layer {layer_name}")
+        logger.debug("DEBUG: Invalid drilling depth in layer %s", operation.layer)
         return
     
     # Calculate diameter
     if drilling_config.get('diameter_equals_depth', False):
         diameter = float(depth)
     else:
-        diameter = round(entity.dxf.radius * 2, 3)
+        diameter = round(operation.entity.dxf.radius * 2, 3)
 
     # Apply mirroring for back-side operations if requested
-    final_x = panel_length - rel_x if mirror_x else rel_x
-    final_face = force_face if force_face else face
+    center = operation.entity.dxf.center
+    rel_y = operation.y
+    final_x = panel_length - operation.x if mirror_x else operation.x
+    final_face = operation.force_face if operation.force_face else operation.face
 
-    print(f"DEBUG: Processing drilling - Center: ({center.x:.3f}, {center.y:.3f}) -> "
-          f"Panel coords: ({final_x:.3f}, {rel_y:.3f}), Face: {final_face}, "
-          f"Depth: {depth}, Diameter: {diameter:.3f}"
-          f"{' (mirrored)' if mirror_x else ''}")
+    logger.debug("DEBUG: Processing drilling - Center: (%.3f, %.3f) -> "
+                 "Panel coords: (%.3f, %.3f), Face: %s, Depth: %s, Diameter: %.3f%s",
+                 center.x, center.y, final_x, rel_y, final_face, depth, diameter,
+                 ' (mirrored)' if mirror_x else '')
 
     ET.SubElement(machines_element, "Machining",
                  Type=drilling_config['type'],
@@ -97,10 +130,15 @@ def create_drilling_xml(machines_element, entity, panel_type, panel_length, pane
 
 def create_pocket_xml(machines_element, entity, panel_length, panel_width, panel_type,
                      primary_bbox_panel, secondary_bbox_panel, sheet_border_front_bbox,
-                     sheet_border_back_bbox, tolerance, config):
-    """Creates XML for pocket operations (Type 1)."""
+                     sheet_border_back_bbox, tolerance, config, transform=None):
+    """Creates XML for pocket operations (Type 1); config is the machining config.
+    The type, faces, diameter and edge tolerance come from the entry of the
+    pocket's layer, e.g. config['ABF_DSIDE_8'].
+    transform is the panel's PanelTransform; built from the bounding boxes when omitted.
+    """
+    pocket_config = _get_pocket_config(config, entity.dxf.layer)
     vertices = list(entity.vertices())
-    if len(vertices) < 4 or not entity.dxf.flags & 1:
+    if pocket_config is None or len(vertices) < 4 or not entity.dxf.flags & 1:
         return
 
     # Calculate pocket dimensions and center
@@ -112,79 +150,90 @@ def create_pocket_xml(machines_element, entity, panel_length, panel_width, panel
     pocket_depth = max(rect_dx, rect_dy)
 
     # Convert center to panel coordinates
-    center_rel_x, center_rel_y, sheet_face = convert_coords_to_panel_system(
-        center_x, center_y, panel_type, panel_length, panel_width,
-        primary_bbox_panel, secondary_bbox_panel,
-        sheet_border_front_bbox, sheet_border_back_bbox, tolerance
-    )
+    if transform is None:
+        transform = PanelTransform(panel_length, panel_width, primary_bbox_panel, secondary_bbox_panel,
+                                   sheet_border_front_bbox, sheet_border_back_bbox, tolerance)
+    center_rel_x, center_rel_y, sheet_face = transform.convert(center_x, center_y)
 
     if None in (center_rel_x, center_rel_y, sheet_face):
         return
 
-    # Determine face (1-4) based on proximity to edges
-    edge_tolerance = 20.0
+    # Determine the edge, and so the face, based on proximity to edges
+    edge_tolerance = pocket_config['edge_tolerance']
     is_close_to_min_y = math.isclose(center_rel_y, 0, abs_tol=edge_tolerance)
     is_close_to_max_y = math.isclose(center_rel_y, panel_width, abs_tol=edge_tolerance)
     is_close_to_min_x = math.isclose(center_rel_x, 0, abs_tol=edge_tolerance)
     is_close_to_max_x = math.isclose(center_rel_x, panel_length, abs_tol=edge_tolerance)
 
-    # Assign face based on proximity
+    # Assign edge based on proximity
     if is_close_to_max_y:
-        face = "1"  # Top edge
+        edge = 'near_top'
     elif is_close_to_min_y:
-        face = "2"  # Bottom edge
+        edge = 'near_bottom'
     elif is_close_to_max_x:
-        face = "3"  # Right edge
+        edge = 'near_right'
     elif is_close_to_min_x:
-        face = "4"  # Left edge
+        edge = 'near_left'
     else:
         # Find nearest edge if not close to any
         distances = {
-            "1": abs(panel_width - center_rel_y),   # Distance to top
-            "2": abs(center_rel_y),                 # Distance to bottom
-            "3": abs(panel_length - center_rel_x),  # Distance to right
-            "4": abs(center_rel_x)                  # Distance to left
+            'near_top': abs(panel_width - center_rel_y),
+            'near_bottom': abs(center_rel_y),
+            'near_right': abs(panel_length - center_rel_x),
+            'near_left': abs(center_rel_x)
         }
-        face = min(distances, key=distances.get)
+        edge = min(distances, key=distances.get)
 
     # Snap coordinates to the assigned edge
-    if face == "1":
+    if edge == 'near_top':
         center_rel_y = panel_width
-    elif face == "2":
+    elif edge == 'near_bottom':
         center_rel_y = 0
-    elif face == "3":
+    elif edge == 'near_right':
         center_rel_x = panel_length
-    elif face == "4":
+    elif edge == 'near_left':
         center_rel_x = 0
 
     ET.SubElement(machines_element, "Machining",
-                 Type="1",
+                 Type=pocket_config['type'],
                  IsGenCode="2",
-                 Face=face,
+                 Face=pocket_config['faces'][edge],
                  X=f"{center_rel_x:.3f}",
                  Y=f"{center_rel_y:.3f}",
                  Z="8",
-                 Diameter="8.000",
+                 Diameter=f"{pocket_config['diameter']:.3f}",
                  Depth=f"{pocket_depth:.3f}")
 
 
+def _get_pocket_config(machining_config, layer_name):
+    """Returns the machining config entry of a literal pocket layer, or None."""
+    layer_name = layer_name.upper()
+    for name, operation_config in machining_config.items():
+        if 'layer_pattern' not in operation_config and name.upper() == layer_name:
+            return operation_config
+    return None
+
+
 def create_groove_xml(machines_element, entity, panel_length, panel_width, panel_type,
                      primary_bbox_panel, secondary_bbox_panel, sheet_border_front_bbox,
-                     sheet_border_back_bbox, tolerance, panel_thickness, config):
-    """Creates XML for groove operations (Type 4)."""
+                     sheet_border_back_bbox, tolerance, panel_thickness, config, depth=None, transform=None):
+    """Creates XML for groove operations (Type 4); config is the groove config.
+    depth is the value already parsed from the layer name; parsed here when omitted.
+    transform is the panel's PanelTransform; built from the bounding boxes when omitted.
+    """
     if entity.dxftype() != 'LWPOLYLINE' or not entity.dxf.flags & 1:
-        print(f"DEBUG: Invalid groove entity - must be closed LWPOLYLINE")
+        logger.debug("DEBUG: Invalid groove entity - must be closed LWPOLYLINE")
         return
 
     vertices = list(entity.vertices())
     if len(vertices) < 4:
-        print(f"DEBUG: Invalid groove - needs at least 4 vertices")
+        logger.debug("DEBUG: Invalid groove - needs at least 4 vertices")
         return
 
     # Calculate groove width from rectangle geometry
     width = _calculate_groove_width(vertices)
     if width is None:
-        print(f"DEBUG: Unable to determine groove width")
+        logger.debug("DEBUG: Unable to determine groove width")
         return
 
     # Get groove center point
@@ -192,23 +241,23 @@ def create_groove_xml(machines_element, entity, panel_length, panel_width, panel
     center_y = sum(v[1] for v in vertices) / len(vertices)
 
     # Convert to panel coordinates
-    rel_x, rel_y, face = convert_coords_to_panel_system(
-        center_x, center_y, panel_type, panel_length, panel_width,
-        primary_bbox_panel, secondary_bbox_panel,
-        sheet_border_front_bbox, sheet_border_back_bbox, tolerance
-    )
+    if transform is None:
+        transform = PanelTransform(panel_length, panel_width, primary_bbox_panel, secondary_bbox_panel,
+                                   sheet_border_front_bbox, sheet_border_back_bbox, tolerance)
+    rel_x, rel_y, face = transform.convert(center_x, center_y)
 
     if rel_x is None or rel_y is None or face is None:
-        print(f"DEBUG: Invalid coordinates for groove operation")
+        logger.debug("DEBUG: Invalid coordinates for groove operation")
         return
 
-    groove_config = DXF_LAYER_CONFIG['machining']['groove']
+    groove_config = config
     
     # Extract and validate depth
     layer_name = entity.dxf.layer.upper()
-    depth = _extract_depth_from_layer(layer_name, groove_config['layer_pattern'])
+    if depth is None:
+        depth = _extract_depth_from_layer(layer_name, groove_config['layer_pattern'])
     if depth is None or not _validate_depth(depth, groove_config):
-        print(f"DEBUG: Invalid groove depth in layer {layer_name}")
+        logger.debug("DEBUG: Invalid groove depth in layer %s", layer_name)
         return
 
     # Get start and end points of the groove
@@ -217,31 +266,18 @@ def create_groove_xml(machines_element, entity, panel_length, panel_width, panel
     
     # Get start and end points in panel coordinates
     if is_horizontal:
-        start_x, start_y, _ = convert_coords_to_panel_system(
-            rect_min_x, center_y, panel_type, panel_length, panel_width,
-            primary_bbox_panel, secondary_bbox_panel,
-            sheet_border_front_bbox, sheet_border_back_bbox, tolerance
-        )
-        end_x, end_y, _ = convert_coords_to_panel_system(
-            rect_max_x, center_y, panel_type, panel_length, panel_width,
-            primary_bbox_panel, secondary_bbox_panel,
-            sheet_border_front_bbox, sheet_border_back_bbox, tolerance
-        )
+        start_x, start_y, _ = transform.convert(rect_min_x, center_y)
+        end_x, end_y, _ = transform.convert(rect_max_x, center_y)
     else:
-        start_x, start_y, _ = convert_coords_to_panel_system(
-            center_x, rect_min_y, panel_type, panel_length, panel_width,
-            primary_bbox_panel, secondary_bbox_panel,
-            sheet_border_front_bbox, sheet_border_back_bbox, tolerance
-        )
-        end_x, end_y, _ = convert_coords_to_panel_system(
-            center_x, rect_max_y, panel_type, panel_length, panel_width,
-            primary_bbox_panel, secondary_bbox_panel,
-            sheet_border_front_bbox, sheet_border_back_bbox, tolerance
-        )
+        start_x, start_y, _ = transform.convert(center_x, rect_min_y)
+        end_x, end_y, _ = transform.convert(center_x, rect_max_y)
+    if None in (start_x, start_y, end_x, end_y):
+        logger.debug("DEBUG: Groove end outside the panel")
+        return
 
-    print(f"DEBUG: Processing groove - Start: ({start_x:.3f}, {start_y:.3f}), "
-          f"End: ({end_x:.3f}, {end_y:.3f}), Face: {face}, "
-          f"Depth: {depth}, Width: {width:.3f}")
+    logger.debug("DEBUG: Processing groove - Start: (%.3f, %.3f), End: (%.3f, %.3f), "
+                 "Face: %s, Depth: %s, Width: %.3f",
+                 start_x, start_y, end_x, end_y, face, depth, width)
 
     ET.SubElement(machines_element, "Machining",
                  Type=groove_config['type'],
@@ -261,7 +297,7 @@ def _calculate_groove_width(vertices: List[Tuple[float, float]]) -> Optional[flo
     """Calculate the width of a groove from its vertices (shorter dimension)."""
     try:
         if len(vertices) < 4:
-            print("DEBUG: Not enough vertices for groove width calculation")
+            logger.debug("DEBUG: Not enough vertices for groove width calculation")
             return None
             
         # Get bounding box
@@ -273,13 +309,13 @@ def _calculate_groove_width(vertices: List[Tuple[float, float]]) -> Optional[flo
         width_y = max(ys) - min(ys)
         
         if width_x <= 0 or width_y <= 0:
-            print("DEBUG: Invalid groove dimensions")
+            logger.debug("DEBUG: Invalid groove dimensions")
             return None
             
         width = min(width_x, width_y)
         return round(width, 3)
     except Exception as e:
-        print(f"DEBUG: Error calculating groove width: {e}")
+        logger.debug("DEBUG: Error calculating groove width: %s", e)
         return None
 
 
@@ -288,8 +324,8 @@ import re
 from typing import Dict, List, Tuple, Optional
 
 class MachiningOperations:
-    def __init__(self):
-        self.config = DXF_LAYER_CONFIG['machining']
+    def __init__(self, machining_config=None):
+        self.config = machining_config or DXF_LAYER_CONFIG['machining']
         self._drilling_pattern = self.config['drilling']['layer_pattern']
         self._drill_regex = re.compile(
             self._drilling_pattern.format(depth=r'(\d+)')
@@ -0,0 +1,267 @@
+"""Destinations for the XML files of a conversion: a directory or a single archive."""
+import abc
+import io
+import os
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from .stats import NULL_STATS
+
+# Threads writing files and files serialized but not yet written, per DirectorySink
+DEFAULT_WRITE_WORKERS = 4
+DEFAULT_MAX_PENDING = 32
+
+ARCHIVE_FORMATS = ('zip', 'tar')
+
+def write_file_atomic(path, chunks):
+    """
+    Writes the byte chunks to a temporary file next to path and renames it to
+    path once complete, so nobody ever sees a partly written file and an
+    interrupted write leaves the previous file in place.
+    """
+    temp_path = _temp_path(path)
+    try:
+        with open(temp_path, 'xb') as f:
+            f.writelines(chunks)
+        os.replace(temp_path, path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+
+class OutputSink(abc.ABC):
+    """
+    Receives the XML files of one DXF by name and stores them on a background
+    thread while the converter prepares the next ones. At most max_pending
+    files wait to be stored; write() blocks beyond that, which bounds the
+    memory held by serialized files.
+    Nothing is visible at the destination until close() commits the output;
+    close() raises the first error instead and discards what was written.
+    Used as a context manager, the output is committed on success and
+    discarded when the block raises.
+    The time spent storing the files (summed over the writer threads) and
+    committing them is added to the 'xml_save' stage of stats.
+    """
+    def __init__(self, max_workers=1, max_pending=DEFAULT_MAX_PENDING, stats=NULL_STATS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='output-sink')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._futures = []
+        self._closed = False
+        self._stats = stats
+        self._store_seconds = 0.0
+        self._timer_lock = threading.Lock()
+
+    def write(self, name, data):
+        """Queues the file name (a bare file name) with content data (bytes)."""
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._timed_store, name, data)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    @abc.abstractmethod
+    def location(self, name):
+        """Returns the path of the file name once committed: the file itself, or the archive holding it."""
+
+    def close(self):
+        """Waits for all writes and commits them. Does nothing once closed or aborted."""
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        self._stats.add_time('xml_save', self._store_seconds)
+        try:
+            for future in self._futures:
+                future.result()
+            with self._stats.stage('xml_save'):
+                self._commit()
+        except BaseException:
+            self._discard()
+            raise
+
+    def abort(self):
+        """Waits for pending writes and discards everything written."""
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        self._discard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _timed_store(self, name, data):
+        start = time.perf_counter()
+        try:
+            self._store(name, data)
+        finally:
+            with self._timer_lock:
+                self._store_seconds += time.perf_counter() - start
+
+    @abc.abstractmethod
+    def _store(self, name, data):
+        """Stores one file; runs on a writer thread."""
+
+    @abc.abstractmethod
+    def _commit(self):
+        """Makes everything stored visible at the destination."""
+
+    @abc.abstractmethod
+    def _discard(self):
+        """Removes everything stored."""
+
+class DirectorySink(OutputSink):
+    """
+    Writes each file to a temporary name in directory on a pool of threads.
+    close() then syncs them to disk in one pass when fsync is set, renames
+    all files into place and syncs the directory once, so a network share
+    sees a burst of renames instead of half-written jobs and the writer
+    threads never wait for the disk. The directory is created with the first
+    file.
+    """
+    def __init__(self, directory, fsync=True, max_workers=DEFAULT_WRITE_WORKERS,
+                 max_pending=DEFAULT_MAX_PENDING, stats=NULL_STATS):
+        super().__init__(max_workers, max_pending, stats)
+        self.directory = directory
+        self.fsync = fsync
+        self._temp_paths = {}
+        self._lock = threading.Lock()
+
+    def location(self, name):
+        return os.path.join(self.directory, name)
+
+    def _store(self, name, data):
+        temp_path = _temp_path(self.location(name))
+        with self._lock:
+            if not self._temp_paths:
+                os.makedirs(self.directory, exist_ok=True)
+            self._temp_paths[name] = temp_path
+        with open(temp_path, 'xb') as f:
+            f.write(data)
+
+    def _commit(self):
+        if self.fsync:
+            for temp_path in self._temp_paths.values():
+                _fsync_file(temp_path)
+        for name, temp_path in self._temp_paths.items():
+            os.replace(temp_path, self.location(name))
+        self._temp_paths = {}
+        if self.fsync:
+            _fsync_directory(self.directory)
+
+    def _discard(self):
+        for temp_path in self._temp_paths.values():
+            _remove(temp_path)
+        self._temp_paths = {}
+
+class _ArchiveSink(OutputSink):
+    """
+    Streams all files into one archive, written under a temporary name and
+    renamed by close(). location() is the archive's path for every file.
+    """
+    def __init__(self, path, fsync=True, max_pending=DEFAULT_MAX_PENDING, stats=NULL_STATS):
+        super().__init__(1, max_pending, stats)  # One thread, so members keep their order
+        self.path = path
+        self.fsync = fsync
+        self._temp_path = _temp_path(path)
+        self._file = open(self._temp_path, 'xb')
+        self._archive = self._open_archive(self._file)
+        self._date_time = time.localtime()[:6]
+
+    def location(self, name):
+        return self.path
+
+    @abc.abstractmethod
+    def _open_archive(self, f):
+        """Returns the archive object writing into the open file f."""
+
+    def _commit(self):
+        self._archive.close()
+        if self.fsync:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def _discard(self):
+        try:
+            self._archive.close()
+        finally:
+            self._file.close()
+            _remove(self._temp_path)
+
+class ZipSink(_ArchiveSink):
+    """Writes all files into one deflated zip archive at path."""
+    def _open_archive(self, f):
+        return zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED)
+
+    def _store(self, name, data):
+        info = zipfile.ZipInfo(name, self._date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        self._archive.writestr(info, data)
+
+class TarSink(_ArchiveSink):
+    """Writes all files into one uncompressed tar archive at path."""
+    def _open_archive(self, f):
+        return tarfile.open(fileobj=f, mode='w')
+
+    def _store(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = time.mktime(self._date_time + (0, 0, -1))
+        self._archive.addfile(info, io.BytesIO(data))
+
+def create_sink(dxf_base_name, archive=None, directory=None, fsync=True, stats=NULL_STATS):
+    """
+    Returns the sink for the XML files of one DXF: the directory dxf_base_name,
+    or with archive ('zip' or 'tar') the file dxf_base_name.zip or .tar,
+    inside directory (default: the working directory).
+    """
+    directory = directory or os.getcwd()
+    if archive is None:
+        return DirectorySink(os.path.join(directory, dxf_base_name), fsync=fsync, stats=stats)
+    if archive not in ARCHIVE_FORMATS:
+        raise ValueError(f"archive must be one of {', '.join(ARCHIVE_FORMATS)}")
+    sink_class = ZipSink if archive == 'zip' else TarSink
+    return sink_class(os.path.join(directory, f"{dxf_base_name}.{archive}"), fsync=fsync, stats=stats)
+
+def _temp_path(path):
+    # Not mkstemp: the file must get the usual permissions, not owner-only ones
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+
+def _fsync_file(path):
+    fd = os.open(path, os.O_RDWR)  # Windows syncs only files open for writing
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _fsync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # Directories cannot be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,216 @@
+"""On-disk cache of computed panel machining, keyed by a hash of everything that affects it."""
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+# Bump when a change to the converter alters the XML written for the same input
+CACHE_VERSION = 1
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Temporary files older than this were left behind by a writer that died
+STALE_TEMP_SECONDS = 3600
+
+# Share of max_bytes left after an eviction, so a full cache is not rescanned on every write
+EVICT_TO = 0.9
+
+class PanelCache:
+    """
+    Keeps the Machining elements computed for each panel in a directory, one
+    JSON file per panel key (see panel_key). Re-exporting a nesting drawing with
+    a few changed panels then only reprocesses those panels.
+    The directory is bounded to max_bytes; the least recently used entries are
+    evicted first, recency being the file modification time, so several
+    processes can share one directory. Each cache keeps a running total of the
+    bytes it knows of; once that passes max_bytes it rescans the directory, so
+    the entries of all processes count, and evicts down to EVICT_TO of the
+    budget. Until then the directory may exceed the budget by what other
+    processes have written since the last scan. Temporary files of writes in
+    progress count towards it; stale ones are removed.
+    """
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = None  # key -> (size, last use), loaded on first use
+        self._entry_bytes = 0
+        self._temp_bytes = 0  # Temporary files seen by the last scan
+        os.makedirs(directory, exist_ok=True)
+
+    def __getstate__(self):
+        # Worker processes rescan the directory instead of receiving a stale index
+        return {'directory': self.directory, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'], state['max_bytes'])
+
+    def __len__(self):
+        return len(self._index())
+
+    def get(self, key):
+        """Returns the cached list of Machining attribute lists for key, or None."""
+        path = self._path(key)
+        self._index()
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # Mark as recently used
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            self._forget(key)
+            return None
+        self._remember(key, stat.st_size, stat.st_mtime)
+        return entry['machines']
+
+    def put(self, key, machines):
+        """Stores the Machining attribute lists for key and evicts old entries if over budget."""
+        data = json.dumps({'version': CACHE_VERSION, 'machines': machines}, ensure_ascii=False).encode('utf-8')
+        self._index()
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+        except FileNotFoundError:
+            return  # The cache was invalidated while writing
+        except OSError:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        self._remember(key, len(data), os.path.getmtime(self._path(key)))
+        if self._entry_bytes + self._temp_bytes > self.max_bytes:
+            self._evict()
+
+    def invalidate(self, keys=None):
+        """
+        Removes the given keys, or when keys is None every entry in the directory,
+        also those of other processes, and every temporary file. Returns the
+        number of entries removed.
+        """
+        if keys is None:
+            self._entries = {}
+            self._entry_bytes = self._temp_bytes = 0
+            removed = 0
+            with os.scandir(self.directory) as scan:
+                for dir_entry in scan:
+                    if dir_entry.name.endswith(('.json', '.tmp')):
+                        try:
+                            os.unlink(dir_entry.path)
+                        except FileNotFoundError:
+                            continue
+                        removed += dir_entry.name.endswith('.json')
+            return removed
+
+        index = self._index()
+        keys = [key for key in keys if key in index]
+        for key in keys:
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+            self._forget(key)
+        return len(keys)
+
+    def size_bytes(self):
+        self._index()
+        return self._entry_bytes
+
+    def _evict(self):
+        # Other processes may have added or removed entries since the last scan
+        self._scan()
+        index = self._entries
+        target = self.max_bytes * EVICT_TO
+        if self._entry_bytes + self._temp_bytes <= self.max_bytes:
+            return
+        for key in sorted(index, key=lambda k: index[k][1]):
+            if self._entry_bytes + self._temp_bytes <= target:
+                break
+            self.invalidate([key])
+
+    def _remember(self, key, size, last_use):
+        old = self._entries.get(key)
+        self._entry_bytes += size - (old[0] if old else 0)
+        self._entries[key] = (size, last_use)
+
+    def _forget(self, key):
+        old = self._entries.pop(key, None)
+        if old:
+            self._entry_bytes -= old[0]
+
+    def _index(self):
+        if self._entries is None:
+            self._scan()
+        return self._entries
+
+    def _scan(self):
+        """
+        Rebuilds the index and the byte totals from the directory and removes
+        stale temporary files.
+        """
+        entries = {}
+        temp_bytes = 0
+        stale_before = time.time() - STALE_TEMP_SECONDS
+        with os.scandir(self.directory) as scan:
+            for dir_entry in scan:
+                try:
+                    stat = dir_entry.stat()
+                    if dir_entry.name.endswith('.json'):
+                        entries[dir_entry.name[:-5]] = (stat.st_size, stat.st_mtime)
+                    elif dir_entry.name.endswith('.tmp'):
+                        if stat.st_mtime < stale_before:
+                            os.unlink(dir_entry.path)
+                        else:
+                            temp_bytes += stat.st_size
+                except FileNotFoundError:  # Removed by another process meanwhile
+                    pass
+        self._entries = entries
+        self._entry_bytes = sum(size for size, _ in entries.values())
+        self._temp_bytes = temp_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+def panel_key(panel_group_info, machining_entities, panel_thickness, config, geometry):
+    """
+    Hashes everything the XML of a panel depends on: its type, borders and
+    bounding boxes, the sheet bounding boxes, its machining entities in order,
+    the panel thickness, the config and CACHE_VERSION. Returns a hex digest.
+    Entities may be ezdxf entities or EntitySnapshots; both hash the same.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"v{CACHE_VERSION}|{panel_group_info['type']}|{float(panel_thickness)!r}|".encode())
+    h.update(json.dumps(config, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+    for key in ('primary_bbox', 'secondary_bbox', 'sheet_border_front_bbox', 'sheet_border_back_bbox'):
+        h.update(repr(_plain_bbox(panel_group_info.get(key))).encode())
+    for border in panel_group_info['borders']:
+        h.update(f"|B|{border.dxf.layer}|".encode())
+        h.update(geometry.vertices(border).tobytes())
+    for kind, entity in machining_entities:
+        _hash_entity(h, kind, entity)
+    return h.hexdigest()
+
+def machines_to_entry(machines_element):
+    """Returns the Machining children of a Machines element as lists of attribute pairs."""
+    return [list(machining.attrib.items()) for machining in machines_element]
+
+def restore_machines(machines_element, machines):
+    """Appends cached Machining elements, attributes in their original order."""
+    for attributes in machines:
+        ET.SubElement(machines_element, 'Machining', dict(attributes))
+
+def _hash_entity(h, kind, entity):
+    dxftype = entity.dxftype()
+    h.update(f"|{kind}|{dxftype}|{entity.dxf.layer}|".encode())
+    if dxftype == 'CIRCLE':
+        center = entity.dxf.center
+        h.update(struct.pack('<3d', center[0], center[1], entity.dxf.radius))
+    elif dxftype == 'LWPOLYLINE':
+        h.update(struct.pack('<i', entity.dxf.flags))
+        for vertex in entity.vertices():
+            h.update(struct.pack('<2d', vertex[0], vertex[1]))
+
+def _plain_bbox(bbox):
+    return None if bbox is None else tuple(float(v) for v in bbox)
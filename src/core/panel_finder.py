@@ -1,31 +1,51 @@
 """Functions for finding and grouping panels in DXF files."""
-from ..utils.helpers import get_bbox, get_bbox_dimensions_sorted
+import logging
+import math
+from .geometry_cache import GeometryCache
+from .spatial_index import SpatialIndex
+from .panel_processor import _get_entity_reference_point
+from .stats import NULL_STATS
+from ..utils.helpers import group_entities_by_layer, get_layer_polylines
 
-def find_and_group_panels(doc, config):
+logger = logging.getLogger(__name__)
+
+# Maximum difference per dimension for a part border and a cutting line to match
+DIMENSION_TOLERANCE = 1.0
+
+def find_and_group_panels(doc, config, layer_map=None, geometry=None, sheet_borders=None):
     """Finds and groups panels based on sheet borders and part borders.
     Returns a list of panel groups, each containing information about 
     borders and bounding boxes.
+    layer_map is the document's group_entities_by_layer result and geometry its
+    GeometryCache; both are built here when not given.
+    sheet_borders are the borders of the drawing's front and back sheet, as
+    kept by a MirroredDrawing, whose own sheet border layer also holds the
+    mirrored copy of the back sheet. By default they are read from the layer;
+    of several sheet pairs (see find_sheet_pairs) only the first is used.
     """
+    if layer_map is None:
+        layer_map = group_entities_by_layer(doc)
+    if geometry is None:
+        geometry = GeometryCache()
+
     # Find all sheet borders
-    sheet_borders = [e for e in doc.modelspace() 
-                    if e.dxftype() == 'LWPOLYLINE' and 
-                    e.dxf.layer.upper() == config['sheet_border'].upper()]
-    
+    if sheet_borders is None:
+        sheet_borders = get_layer_polylines(layer_map, config['sheet_border'])
+        if len(sheet_borders) > 2:
+            logger.warning("⚠️ هشدار: بیش از یک جفت ورق یافت شد. فقط جفت اول استفاده می‌شود.")
+            sheet_borders = find_sheet_pairs(sheet_borders, geometry)[0]
+
     if len(sheet_borders) < 1:
-        print("❌ خطا: هیچ مرز ورقی (_ABF_SHEET_BORDER) یافت نشد.")
+        logger.error("❌ خطا: هیچ مرز ورقی (%s) یافت نشد.", config['sheet_border'])
         return []
-    elif len(sheet_borders) > 2:
-        print("⚠️ هشدار: بیش از دو مرز ورق یافت شد. فقط دو مورد اول استفاده می‌شود.")
-        sheet_borders = sheet_borders[:2]
 
     # Get bounding boxes for sheet borders
     sheet_bboxes = []
     for border in sheet_borders:
-        vertices = list(border.vertices())
-        if vertices:
-            min_x, min_y, max_x, max_y = get_bbox(vertices)
+        if len(geometry.vertices(border)):
+            min_x, min_y, max_x, max_y = geometry.bbox(border)
             sheet_bboxes.append((min_x, min_y, max_x, max_y))
-            print(f"DEBUG: مرز ورق شناسایی شد (محدوده: {(min_x, min_y, max_x, max_y)})")
+            logger.debug("DEBUG: مرز ورق شناسایی شد (محدوده: %s)", (min_x, min_y, max_x, max_y))
 
     if len(sheet_bboxes) < 2:
         front_bbox = sheet_bboxes[0] if sheet_bboxes else None
@@ -38,45 +58,36 @@ def find_and_group_panels(doc, config):
             front_bbox, back_bbox = sheet_bboxes[1], sheet_bboxes[0]
 
     # Find all part borders and cutting lines
-    part_borders = [e for e in doc.modelspace() 
-                   if e.dxftype() == 'LWPOLYLINE' and 
-                   e.dxf.layer.upper() == config['part_border'].upper()]
-    
-    cutting_lines = [e for e in doc.modelspace() 
-                    if e.dxftype() == 'LWPOLYLINE' and 
-                    e.dxf.layer.upper() == config['cutting_lines'].upper()]
+    part_borders = get_layer_polylines(layer_map, config['part_border'])
+    cutting_lines = get_layer_polylines(layer_map, config['cutting_lines'])
 
     # Group panels
     panel_groups = []
     
+    # Index cutting lines by quantized dimensions, so matching is not quadratic
+    dimension_buckets, cutting_line_entries = _build_dimension_index(cutting_lines, geometry)
+
     # First, handle back-capable panels (those with part borders)
     for part_border in part_borders:
-        part_vertices = list(part_border.vertices())
-        if not part_vertices:
+        if not len(geometry.vertices(part_border)):
             continue
 
-        # Find matching cutting line by dimensions
-        part_min_dim, part_max_dim = get_bbox_dimensions_sorted(part_vertices)
-        matching_cutting_line = None
-        
-        for cutting_line in cutting_lines:
-            cut_vertices = list(cutting_line.vertices())
-            if not cut_vertices:
-                continue
-            
-            cut_min_dim, cut_max_dim = get_bbox_dimensions_sorted(cut_vertices)
-            if (abs(cut_min_dim - part_min_dim) <= 1.0 and 
-                abs(cut_max_dim - part_max_dim) <= 1.0):
-                matching_cutting_line = cutting_line
-                print(f"DEBUG:   تطابق ابعاد پیدا شد برای مرز {config['part_border']} "
-                      f"(ابعاد {part_min_dim:.1f} x {part_max_dim:.1f}) با مرز "
-                      f"{config['cutting_lines']} "
-                      f"(ابعاد {cut_min_dim:.1f} x {cut_max_dim:.1f}).")
-                break
-
-        if matching_cutting_line:
-            part_bbox = get_bbox(part_vertices)
-            cut_bbox = get_bbox(list(matching_cutting_line.vertices()))
+        # Find matching cutting line by dimensions, nearest position on ties
+        part_min_dim, part_max_dim = geometry.dims(part_border)
+        part_bbox = geometry.bbox(part_border)
+        match = _take_matching_cutting_line(
+            dimension_buckets, (part_min_dim, part_max_dim),
+            _sheet_position(part_bbox, front_bbox, back_bbox), front_bbox, back_bbox
+        )
+
+        if match:
+            matching_cutting_line = match['entity']
+            cut_min_dim, cut_max_dim = match['dims']
+            logger.debug("DEBUG:   تطابق ابعاد پیدا شد برای مرز %s (ابعاد %.1f x %.1f) با مرز "
+                         "%s (ابعاد %.1f x %.1f).",
+                         config['part_border'], part_min_dim, part_max_dim,
+                         config['cutting_lines'], cut_min_dim, cut_max_dim)
+            cut_bbox = match['bbox']
             panel_groups.append({
                 'type': 'back_capable',
                 'primary_border': part_border,
@@ -87,22 +98,22 @@ def find_and_group_panels(doc, config):
                 'sheet_border_front_bbox': front_bbox,
                 'sheet_border_back_bbox': back_bbox
             })
-            cutting_lines.remove(matching_cutting_line)
-            print(f"DEBUG: پنل back_capable گروه بندی شد (مرز {config['part_border']} "
-                  f"در مختصات (np.float64({(part_bbox[0] + part_bbox[2])/2:.13f}), "
-                  f"np.float64({(part_bbox[1] + part_bbox[3])/2:.13f}))) با مرز "
-                  f"{config['cutting_lines']} در مختصات "
-                  f"(np.float64({(cut_bbox[0] + cut_bbox[2])/2:.13f}), "
-                  f"np.float64({(cut_bbox[1] + cut_bbox[3])/2:.13f}))) "
-                  f"بر اساس تطابق ابعاد.")
+            logger.debug("DEBUG: پنل back_capable گروه بندی شد (مرز %s "
+                         "در مختصات (np.float64(%.13f), np.float64(%.13f))) با مرز "
+                         "%s در مختصات (np.float64(%.13f), np.float64(%.13f))) "
+                         "بر اساس تطابق ابعاد.",
+                         config['part_border'],
+                         (part_bbox[0] + part_bbox[2])/2, (part_bbox[1] + part_bbox[3])/2,
+                         config['cutting_lines'],
+                         (cut_bbox[0] + cut_bbox[2])/2, (cut_bbox[1] + cut_bbox[3])/2)
 
     # Handle remaining cutting lines as front-only panels
-    for cutting_line in cutting_lines:
-        cut_vertices = list(cutting_line.vertices())
-        if not cut_vertices:
+    for entry in cutting_line_entries:
+        if entry['used']:
             continue
-        
-        cut_bbox = get_bbox(cut_vertices)
+
+        cutting_line = entry['entity']
+        cut_bbox = entry['bbox']
         panel_groups.append({
             'type': 'front_only',
             'primary_border': cutting_line,
@@ -113,10 +124,175 @@ def find_and_group_panels(doc, config):
             'sheet_border_front_bbox': front_bbox,
             'sheet_border_back_bbox': back_bbox
         })
-        print(f"DEBUG: مرز {config['cutting_lines']} (مرکز "
-              f"({(cut_bbox[0] + cut_bbox[2])/2:.1f}, "
-              f"{(cut_bbox[1] + cut_bbox[3])/2:.1f}))) "
-              f"به عنوان پنل فیزیکی تنها front_only اضافه شد.")
+        logger.debug("DEBUG: مرز %s (مرکز (%.1f, %.1f))) به عنوان پنل فیزیکی تنها front_only اضافه شد.",
+                     config['cutting_lines'],
+                     (cut_bbox[0] + cut_bbox[2])/2, (cut_bbox[1] + cut_bbox[3])/2)
 
-    print(f"\nDEBUG: تعداد کل پنل‌های فیزیکی شناسایی شده پس از گروه بندی: {len(panel_groups)}\n")
+    logger.debug("\nDEBUG: تعداد کل پنل‌های فیزیکی شناسایی شده پس از گروه بندی: %d\n", len(panel_groups))
     return panel_groups
+
+def _build_dimension_index(cutting_lines, geometry):
+    """
+    Buckets cutting lines by their sorted (min_dim, max_dim) quantized to
+    DIMENSION_TOLERANCE. Returns (buckets, entries); entries keep the input
+    order and are flagged 'used' once matched, which consumes them in O(1).
+    """
+    buckets = {}
+    entries = []
+    for order, cutting_line in enumerate(cutting_lines):
+        if not len(geometry.vertices(cutting_line)):
+            continue
+        entry = {
+            'order': order,
+            'entity': cutting_line,
+            'dims': geometry.dims(cutting_line),
+            'bbox': geometry.bbox(cutting_line),
+            'used': False
+        }
+        entries.append(entry)
+        buckets.setdefault(_dimension_key(entry['dims']), []).append(entry)
+    return buckets, entries
+
+def _dimension_key(dims):
+    return (math.floor(dims[0] / DIMENSION_TOLERANCE), math.floor(dims[1] / DIMENSION_TOLERANCE))
+
+def _take_matching_cutting_line(buckets, part_dims, part_position, front_bbox, back_bbox):
+    """
+    Finds and consumes the unused cutting line whose dimensions are within
+    DIMENSION_TOLERANCE of part_dims. Only the neighbouring buckets can hold
+    such a line. Among several matches the one nearest to part_position wins,
+    then the one found first in the drawing. Returns the entry or None.
+    """
+    key_min, key_max = _dimension_key(part_dims)
+    best, best_rank = None, None
+    for offset_min in (-1, 0, 1):
+        for offset_max in (-1, 0, 1):
+            for entry in buckets.get((key_min + offset_min, key_max + offset_max), ()):
+                cut_min_dim, cut_max_dim = entry['dims']
+                if (entry['used'] or
+                        abs(cut_min_dim - part_dims[0]) > DIMENSION_TOLERANCE or
+                        abs(cut_max_dim - part_dims[1]) > DIMENSION_TOLERANCE):
+                    continue
+                position = _sheet_position(entry['bbox'], front_bbox, back_bbox)
+                rank = (math.dist(position, part_position), entry['order'])
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = entry, rank
+    if best:
+        best['used'] = True
+    return best
+
+def _sheet_position(bbox, front_bbox, back_bbox):
+    """
+    Position of a border's centre in front-sheet coordinates. The back sheet is
+    the horizontal mirror of the front sheet, so centres on it are mirrored
+    across, which puts both faces of a panel at the same position.
+    """
+    center_x = (bbox[0] + bbox[2]) / 2
+    center_y = (bbox[1] + bbox[3]) / 2
+    if (front_bbox and back_bbox and
+            back_bbox[0] <= center_x <= back_bbox[2] and back_bbox[1] <= center_y <= back_bbox[3]):
+        return (front_bbox[0] + (back_bbox[2] - center_x),
+                front_bbox[1] + (center_y - back_bbox[1]))
+    return center_x, center_y
+
+def find_sheet_pairs(sheet_borders, geometry=None):
+    """
+    Pairs the sheet borders of a drawing with any number of sheets. Sheets are
+    laid out in rows of overlapping Y ranges. Within a row, from left to right,
+    each sheet is paired with the nearest following sheet of the same size
+    (within DIMENSION_TOLERANCE), its back sheet, or else with the next sheet;
+    the last sheet of a row may stay single. A drawing with two sheets is
+    therefore always one pair, as before.
+    Returns lists of one or two borders, front first, bottom row first.
+    """
+    if geometry is None:
+        geometry = GeometryCache()
+    rows = []
+    row_max_y = None
+    for border in sorted(sheet_borders, key=lambda b: geometry.bbox(b)[1]):
+        min_y, max_y = geometry.bbox(border)[1], geometry.bbox(border)[3]
+        if rows and min_y < row_max_y:
+            rows[-1].append(border)
+            row_max_y = max(row_max_y, max_y)
+        else:
+            rows.append([border])
+            row_max_y = max_y
+
+    pairs = []
+    for row in rows:
+        row.sort(key=lambda b: geometry.bbox(b)[0])
+        unpaired = list(row)
+        while unpaired:
+            front = unpaired.pop(0)
+            front_dims = geometry.dims(front)
+            back = next((b for b in unpaired if _same_dims(geometry.dims(b), front_dims)),
+                        unpaired[0] if unpaired else None)
+            if back is None:
+                pairs.append([front])
+            else:
+                unpaired.remove(back)
+                pairs.append([front, back])
+    return pairs
+
+def split_sheet_pairs(entities, config, geometry=None, tolerance=1.0, stats=NULL_STATS):
+    """
+    Splits the entities of a drawing by sheet pair (see find_sheet_pairs and
+    assign_sheet_pairs). Each pair's list keeps the drawing order and contains
+    the pair's sheet borders.
+    Returns one entity list per pair.
+    """
+    if geometry is None:
+        geometry = GeometryCache()
+    entities = list(entities)
+    sheet_border_layer = config['sheet_border'].upper()
+    sheet_borders = [e for e in entities
+                     if e.dxftype() == 'LWPOLYLINE' and e.dxf.layer.upper() == sheet_border_layer]
+
+    sheet_pairs = find_sheet_pairs(sheet_borders, geometry)
+    pairs = [[] for _ in sheet_pairs]
+    for pair_index, entity in assign_sheet_pairs(entities, sheet_pairs, config, geometry, tolerance, stats):
+        pairs[pair_index].append(entity)
+    return pairs
+
+def assign_sheet_pairs(entities, sheet_pairs, config, geometry=None, tolerance=1.0, stats=NULL_STATS):
+    """
+    Yields (pair_index, entity) for the entities of a drawing, in their order,
+    given its sheet_pairs as found by find_sheet_pairs. A sheet border belongs
+    to its own pair; it is recognised by its vertices, so the entities may be
+    read from the file again after the borders. Any other entity belongs to
+    the sheet containing its reference point; entities outside every sheet
+    are counted as skipped in stats, and entities without a reference point
+    are left out.
+    """
+    if geometry is None:
+        geometry = GeometryCache()
+    sheet_border_layer = config['sheet_border'].upper()
+    pair_of_border = {}
+    sheet_boxes = []
+    for index, pair in enumerate(sheet_pairs):
+        for border in pair:
+            pair_of_border.setdefault(_border_key(border), index)
+            sheet_boxes.append((index, geometry.bbox(border)))
+    sheet_index = SpatialIndex(sheet_boxes, tolerance=tolerance)
+
+    for entity in entities:
+        pair_index = None
+        if entity.dxftype() == 'LWPOLYLINE' and entity.dxf.layer.upper() == sheet_border_layer:
+            pair_index = pair_of_border.get(_border_key(entity))
+        if pair_index is None:
+            point = _get_entity_reference_point(entity)
+            if point is None:  # Text, blocks and the like, which the converter never reads
+                continue
+            owners = sheet_index.query_point(point[0], point[1])
+            if not owners:
+                stats.skip('outside_sheets')
+                continue
+            pair_index = owners[0]
+        yield pair_index, entity
+
+def _border_key(border):
+    return tuple((float(x), float(y)) for x, y, *_ in border.vertices())
+
+def _same_dims(dims_a, dims_b):
+    return (abs(dims_a[0] - dims_b[0]) <= DIMENSION_TOLERANCE and
+            abs(dims_a[1] - dims_b[1]) <= DIMENSION_TOLERANCE)
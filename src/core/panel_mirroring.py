@@ -1,120 +1,189 @@
 """
 Panel mirroring utilities for DXF processing.
 """
+import itertools
+import logging
+from types import SimpleNamespace
 import ezdxf
+from ezdxf.math import Vec3
 from typing import List, Tuple
+from .spatial_index import SpatialIndex
+from .geometry_cache import GeometryCache
+from ..utils.helpers import group_entities_by_layer, get_layer_polylines
 
-def find_right_sheet_border(doc, sheet_border_layer) -> ezdxf.entities.LWPolyline:
-    """Find the rightmost border polyline in the given sheet border layer."""
-    borders = [e for e in doc.modelspace() if e.dxftype() == 'LWPOLYLINE' and e.dxf.layer.upper() == sheet_border_layer.upper()]
+logger = logging.getLogger(__name__)
+
+def find_right_sheet_border(doc, sheet_border_layer, layer_map=None, geometry=None) -> ezdxf.entities.LWPolyline:
+    """Find the rightmost border polyline in the given sheet border layer.
+
+    layer_map may be the document's group_entities_by_layer result and
+    geometry its GeometryCache.
+    """
+    if layer_map is None:
+        layer_map = group_entities_by_layer(doc)
+    if geometry is None:
+        geometry = GeometryCache()
+    borders = get_layer_polylines(layer_map, sheet_border_layer)
     if not borders:
         raise ValueError(f"No borders found in layer {sheet_border_layer}")
     
-    # Sort by right edge (max X) of bounding box
-    def max_x(entity):
-        points = list(entity.get_points())
-        return max(p[0] for p in points)
-    
-    # Get the rightmost border
-    right_border = max(borders, key=max_x)
-    print(f"DEBUG: Found right sheet border with bounds: {list(right_border.get_points())}")
+    # Get the rightmost border, by right edge (max X) of bounding box
+    right_border = max(borders, key=lambda entity: geometry.bbox(entity)[2])
+    logger.debug("DEBUG: Found right sheet border with bounds: %s", geometry.bbox(right_border))
     return right_border
 
-def get_entities_within_border(doc, border) -> List:
-    """Return all entities whose reference point is inside the border's bounding box."""
-    points = list(border.get_points())
-    min_x = min(p[0] for p in points)
-    max_x = max(p[0] for p in points)
-    min_y = min(p[1] for p in points)
-    max_y = max(p[1] for p in points)
-    tolerance = 1.0  # Add tolerance for border detection
+def get_entities_within_border(doc, border, sheet_border_layer, entity_index=None, geometry=None,
+                               tolerance=1.0) -> List:
+    """Return all entities with a reference point inside the border's bounding box.
+
+    Entities on sheet_border_layer are never included. entity_index is a
+    SpatialIndex of the candidate entities (see index_entity_points), built
+    once per drawing; when omitted the modelspace is indexed here. geometry
+    is the document's GeometryCache, if there is one.
+    """
+    if geometry is None:
+        geometry = GeometryCache()
+    if entity_index is None:
+        entity_index = index_entity_points(doc.modelspace(), sheet_border_layer, geometry)
+    min_x, min_y, max_x, max_y = geometry.bbox(border)
+
+    logger.debug("DEBUG: Searching for entities within border bbox: X[%s, %s], Y[%s, %s]",
+                 min_x, max_x, min_y, max_y)
+
+    min_x, min_y = min_x - tolerance, min_y - tolerance
+    max_x, max_y = max_x + tolerance, max_y + tolerance
     entities = []
-    
-    print(f"DEBUG: Searching for entities within border bbox: X[{min_x}, {max_x}], Y[{min_y}, {max_y}]")
-    
-    for e in doc.modelspace():
-        if e is border or e.dxf.layer.upper() == '_ABF_SHEET_BORDER':
+    for e in entity_index.query_bbox(min_x, min_y, max_x, max_y):
+        if e is border:
+            continue
+        if e.dxftype() == 'LWPOLYLINE':
+            # The polyline's box meets the border's; one vertex within it is enough
+            vertices = geometry.vertices(e)
+            if not ((vertices[:, 0] >= min_x) & (vertices[:, 0] <= max_x) &
+                    (vertices[:, 1] >= min_y) & (vertices[:, 1] <= max_y)).any():
+                continue
+        entities.append(e)
+        logger.debug("DEBUG: Found entity %s in layer %s", e.dxftype(), e.dxf.layer)
+    return entities
+
+def index_entity_points(entities, sheet_border_layer, geometry=None):
+    """
+    Builds a SpatialIndex of entities by their reference points: the centre
+    of circles and arcs, the start of lines and the bounding box of polyline
+    vertices. Entities on sheet_border_layer are left out.
+    """
+    if geometry is None:
+        geometry = GeometryCache()
+    sheet_border_layer = sheet_border_layer.upper()
+    items = []
+    for e in entities:
+        if e.dxf.layer.upper() == sheet_border_layer:
             continue
-            
-        entity_points = []
         try:
-            if e.dxftype() == 'CIRCLE':
-                entity_points = [(e.dxf.center[0], e.dxf.center[1])]
-            elif e.dxftype() == 'LWPOLYLINE':
-                verts = list(e.vertices())
-                if verts:
-                    # For polylines, check if any vertex is within bounds
-                    entity_points = [(v[0], v[1]) for v in verts]
-            elif hasattr(e.dxf, 'center'):
-                entity_points = [(e.dxf.center[0], e.dxf.center[1])]
+            if e.dxftype() == 'LWPOLYLINE':
+                items.append((e, geometry.bbox(e)))
+                continue
+            if e.dxftype() == 'CIRCLE' or hasattr(e.dxf, 'center'):
+                x, y = e.dxf.center[0], e.dxf.center[1]
             elif hasattr(e.dxf, 'start'):
-                entity_points = [(e.dxf.start[0], e.dxf.start[1])]
+                x, y = e.dxf.start[0], e.dxf.start[1]
+            else:
+                continue
         except Exception as ex:
-            print(f"DEBUG: Error checking entity {e.dxftype()}: {ex}")
+            logger.debug("DEBUG: Error checking entity %s: %s", e.dxftype(), ex)
             continue
-            
-        # Check if any point is within the border (with tolerance)
-        for x, y in entity_points:
-            if (min_x - tolerance <= x <= max_x + tolerance and 
-                min_y - tolerance <= y <= max_y + tolerance):
-                entities.append(e)
-                print(f"DEBUG: Found entity {e.dxftype()} in layer {e.dxf.layer} at ({x}, {y})")
-                break  # One point within border is enough
-    return entities
+        items.append((e, (x, y, x, y)))
+    return SpatialIndex(items)
+
+class MirroredEntity:
+    """
+    Read-only mirror image of an entity about a vertical axis, standing in for
+    a mirrored copy of it. It reads like the entity to the converter:
+    dxftype(), vertices() and the layer, center, radius, flags, start and end
+    attributes, the mirrored ones computed once from the source.
+    """
+    __slots__ = ('source', 'dxf', '_vertices')
+
+    def __init__(self, source, axis_x):
+        self.source = source
+        self.dxf = SimpleNamespace(layer=source.dxf.layer)
+        self._vertices = None
+        dxftype = source.dxftype()
+        if dxftype == 'CIRCLE':
+            center = source.dxf.center
+            self.dxf.center = Vec3(2*axis_x - center[0], center[1], center[2])
+            self.dxf.radius = source.dxf.radius
+        elif dxftype == 'LWPOLYLINE':
+            self.dxf.flags = source.dxf.flags
+            self._vertices = [(2*axis_x - v[0], v[1]) for v in source.vertices()]
+        elif hasattr(source.dxf, 'start') and hasattr(source.dxf, 'end'):
+            start, end = source.dxf.start, source.dxf.end
+            self.dxf.start = Vec3(2*axis_x - start[0], start[1])
+            self.dxf.end = Vec3(2*axis_x - end[0], end[1])
+        else:
+            raise TypeError(f"cannot mirror {dxftype}")
+
+    def dxftype(self):
+        return self.source.dxftype()
+
+    def vertices(self):
+        return iter(self._vertices or [])
+
+    def __len__(self):
+        return len(self._vertices or [])
+
+class MirroredDrawing:
+    """
+    A drawing plus the mirrored entities of its right sheet, without adding
+    them to the document. modelspace() yields the document's entities and
+    then the mirrored ones, which is all the converter reads from a drawing.
+    sheet_borders are the document's own sheet borders, without the mirrored
+    copy of the right one.
+    """
+    def __init__(self, doc, mirrored_entities, layer_map=None, sheet_borders=None):
+        """layer_map, the document's group_entities_by_layer result, is extended with the mirrored entities."""
+        self.doc = doc
+        self.mirrored_entities = list(mirrored_entities)
+        self.sheet_borders = sheet_borders
+        if layer_map is not None:
+            for e in self.mirrored_entities:
+                layer_map.add(e)
+
+    @property
+    def filename(self):
+        return self.doc.filename
+
+    def modelspace(self):
+        return itertools.chain(self.doc.modelspace(), self.mirrored_entities)
 
 def mirror_entities(entities, border_bbox: Tuple[float, float], axis_x: float):
-    """Mirror entities along the given vertical axis (axis_x)."""
+    """Mirror entities along the given vertical axis (axis_x). Returns MirroredEntity records."""
     mirrored = []
-    print(f"DEBUG: Mirroring {len(entities)} entities around x={axis_x}")
+    logger.debug("DEBUG: Mirroring %d entities around x=%s", len(entities), axis_x)
     
     for e in entities:
         try:
-            clone = e.copy()
-            print(f"DEBUG: Mirroring entity of type {e.dxftype()} in layer {e.dxf.layer}")
-            
-            if e.dxftype() == 'CIRCLE':
-                x, y = e.dxf.center[0], e.dxf.center[1]
-                z = e.dxf.center[2] if len(e.dxf.center) > 2 else 0
-                clone.dxf.center = (2*axis_x - x, y, z)
-                print(f"DEBUG: Mirrored circle from ({x}, {y}) to ({2*axis_x - x}, {y})")
-            
-            elif e.dxftype() == 'LWPOLYLINE':
-                verts = list(e.vertices())
-                new_verts = [(2*axis_x - v[0], v[1]) for v in verts]
-                if hasattr(clone, 'vertices'):
-                    clone.vertices = new_verts
-                else:
-                    clone.set_points(new_verts)
-                print(f"DEBUG: Mirrored polyline with {len(verts)} vertices")
-            
-            elif hasattr(e.dxf, 'start') and hasattr(e.dxf, 'end'):
-                x1, y1 = e.dxf.start[0], e.dxf.start[1]
-                x2, y2 = e.dxf.end[0], e.dxf.end[1]
-                clone.dxf.start = (2*axis_x - x1, y1)
-                clone.dxf.end = (2*axis_x - x2, y2)
-                print(f"DEBUG: Mirrored line from ({x1}, {y1})-({x2}, {y2})")
-            
-            else:
-                print(f"DEBUG: Skipping unsupported entity type: {e.dxftype()}")
-                continue
-                
-            # Ensure layers are preserved
-            if hasattr(e.dxf, 'layer'):
-                clone.dxf.layer = e.dxf.layer
-            
-            mirrored.append(clone)
+            logger.debug("DEBUG: Mirroring entity of type %s in layer %s", e.dxftype(), e.dxf.layer)
+            clone = MirroredEntity(e, axis_x)
+        except TypeError:
+            logger.debug("DEBUG: Skipping unsupported entity type: %s", e.dxftype())
+            continue
         except Exception as ex:
-            print(f"DEBUG: Error mirroring entity {e.dxftype()}: {ex}")
+            logger.debug("DEBUG: Error mirroring entity %s: %s", e.dxftype(), ex)
             continue
+
+        if e.dxftype() == 'CIRCLE':
+            logger.debug("DEBUG: Mirrored circle from (%s, %s) to (%s, %s)",
+                         e.dxf.center[0], e.dxf.center[1], clone.dxf.center[0], clone.dxf.center[1])
+        elif e.dxftype() == 'LWPOLYLINE':
+            logger.debug("DEBUG: Mirrored polyline with %d vertices", len(e))
+        else:
+            logger.debug("DEBUG: Mirrored line from (%s, %s)-(%s, %s)",
+                         e.dxf.start[0], e.dxf.start[1], e.dxf.end[0], e.dxf.end[1])
+        mirrored.append(clone)
     
     return mirrored
 
-def add_entities_to_doc(doc, entities):
-    """Add entities to the DXF document's modelspace."""
-    msp = doc.modelspace()
-    for e in entities:
-        msp.add_entity(e)
-
 def pair_overlapping_panels(panel_list: List[Tuple[float, float, float, float]]):
     """Pair panels whose bounding boxes overlap."""
     pairs = []
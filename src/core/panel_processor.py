@@ -1,50 +1,103 @@
 """Process panel machining entities from DXF to XML."""
-import re
+import logging
 from .machining_operations import (
-    create_drilling_xml,
+    ResolvedOperation,
+    create_drilling_xml_for_operation,
     create_pocket_xml,
     create_groove_xml,
-    _extract_depth_from_layer,
     _validate_depth
 )
-from .coordinates import convert_coords_to_panel_system
-from ..utils.config import DXF_LAYER_CONFIG
+from .coordinates import PanelTransform
+from .spatial_index import SpatialIndex, build_border_index
+from .layer_classifier import LayerClassifier
+from .geometry_cache import GeometryCache
+from .stats import NULL_STATS
+from ..utils.helpers import group_entities_by_layer
 
-def process_machining_entities_for_panel(doc, panel_element, panel_group_info, panel_length, panel_width, panel_thickness, config):
+logger = logging.getLogger(__name__)
+
+def index_machining_entities(doc, panel_groups, config, tolerance=1.0, geometry=None, stats=NULL_STATS,
+                             classifier=None, layer_map=None):
+    """
+    Buckets the machining entities of the drawing by their owning panel group
+    in a single pass over the machining layers, so each panel only has to look
+    at its own entities.
+    Returns one list of (operation_kind, entity) tuples per panel group, in
+    modelspace order. An entity inside several group bounding boxes is added
+    to every one of them. geometry is the document's GeometryCache, if any.
+    Machining entities outside every group are counted as skipped in stats.
+    classifier is a LayerClassifier compiled from config['machining'], built here when not given.
+    layer_map is the document's group_entities_by_layer result, built here when not given.
+    """
+    if geometry is None:
+        geometry = GeometryCache()
+    if classifier is None:
+        classifier = LayerClassifier(config['machining'])
+    if layer_map is None:
+        layer_map = group_entities_by_layer(doc)
+    group_index = SpatialIndex(
+        ((i, _get_group_bbox(group['borders'], geometry)) for i, group in enumerate(panel_groups)),
+        tolerance=tolerance
+    )
+    buckets = [[] for _ in panel_groups]
+
+    sheet_border_layer = config['sheet_border'].upper()
+    machining_layers = [layer for layer in layer_map
+                        if layer != sheet_border_layer and classifier.is_machining_layer(layer)]
+
+    for entity in layer_map.in_drawing_order(machining_layers):
+        # Classify the entity once, independent of the panel it belongs to
+        kind, _ = classifier.classify(entity.dxftype(), entity.dxf.layer)
+        if kind is None:
+            continue
+
+        entity_point = _get_entity_reference_point(entity)
+        if entity_point is None:
+            stats.skip('no_reference_point')
+            continue
+        owners = group_index.query_point(entity_point[0], entity_point[1])
+        if not owners:
+            stats.skip('outside_panels')
+        for i in owners:
+            if entity not in panel_groups[i]['borders']:
+                buckets[i].append((kind, entity))
+
+    return buckets
+
+def process_machining_entities_for_panel(doc, panel_element, panel_group_info, panel_length, panel_width,
+                                         panel_thickness, config, machining_entities=None, border_index=None,
+                                         stats=NULL_STATS, classifier=None):
     """
     Process machining entities for a panel, handling back-side operations based on mirrored panels.
     For back-capable panels:
     - Right side panels in the _ABF_SHEET_BORDER define both front and back operations
     - Left side panels only get front-side operations
     - Back-side operations are mirrored horizontally
+    machining_entities is this panel's bucket from index_machining_entities; when it
+    is not given, the modelspace is indexed for this panel alone.
+    stats receives the operations written and the entities rejected, per kind.
+    All layer names, patterns and faces come from config; classifier is its
+    compiled LayerClassifier, built here when not given.
     """
     machines_element = panel_element.find('Machines')
-    borders_in_group = panel_group_info['borders']
     panel_type = panel_group_info['type']
     sheet_border_front_bbox = panel_group_info['sheet_border_front_bbox']
     sheet_border_back_bbox = panel_group_info['sheet_border_back_bbox']
     primary_bbox_panel = panel_group_info['primary_bbox']
     secondary_bbox_panel = panel_group_info.get('secondary_bbox')
 
-    # Calculate overall BBox for all borders in this panel group
-    group_min_x, group_min_y = float('inf'), float('inf')
-    group_max_x, group_max_y = -float('inf'), -float('inf')
-
-    for border_entity_in_group in borders_in_group:
-        border_vertices = list(border_entity_in_group.vertices())
-        if not border_vertices:
-            continue
-        min_x = min(v[0] for v in border_vertices)
-        max_x = max(v[0] for v in border_vertices)
-        min_y = min(v[1] for v in border_vertices)
-        max_y = max(v[1] for v in border_vertices)
-        group_min_x = min(group_min_x, min_x)
-        group_min_y = min(group_min_y, min_y)
-        group_max_x = max(group_max_x, max_x)
-        group_max_y = max(group_max_y, max_y)
+    machining_config = config['machining']
+    if classifier is None:
+        classifier = LayerClassifier(machining_config)
+    if machining_entities is None:
+        machining_entities = index_machining_entities(doc, [panel_group_info], config,
+                                                      classifier=classifier)[0]
+    if border_index is None:
+        border_index = build_border_index(doc, config)
 
     tolerance = 1.0
-    print(f"DEBUG: اسکان و پردازش موجودیت‌های ماشینکاری برای پنل فیزیکی...")
+    transform = PanelTransform.for_panel(panel_group_info, panel_length, panel_width, tolerance)
+    logger.debug("DEBUG: اسکان و پردازش موجودیت‌های ماشینکاری برای پنل فیزیکی...")
 
     # Determine if panel is in right side (back) sheet
     is_right_side = False
@@ -53,101 +106,145 @@ def process_machining_entities_for_panel(doc, panel_element, panel_group_info, p
         back_sheet_center_x = (sheet_border_back_bbox[0] + sheet_border_back_bbox[2]) / 2
         panel_center_x = (primary_bbox_panel[0] + primary_bbox_panel[2]) / 2
         is_right_side = panel_center_x > back_sheet_center_x
-        print(f"DEBUG: Panel position: {'Right side' if is_right_side else 'Left side'} "
-              f"of sheet border (center_x: {panel_center_x:.1f}, back_sheet_center: {back_sheet_center_x:.1f})")
-
-    for entity in doc.modelspace():
-        # Skip border entities themselves and sheet borders
-        if (entity in borders_in_group or 
-            (entity.dxftype() == 'LWPOLYLINE' and 
-             entity.dxf.layer.upper() == config['sheet_border'].upper())):
-            continue
+        logger.debug("DEBUG: Panel position: %s of sheet border (center_x: %.1f, back_sheet_center: %.1f)",
+                     'Right side' if is_right_side else 'Left side', panel_center_x, back_sheet_center_x)
 
-        # Get entity reference point for containment check
-        entity_point = _get_entity_reference_point(entity)
-        if not _is_point_within_group(entity_point, group_min_x, group_min_y, 
-                                    group_max_x, group_max_y, tolerance):
-            continue
+    with stats.stage('coordinate_conversion'):
+        operations = resolve_machining_operations(machining_entities, panel_group_info, panel_length,
+                                                  panel_width, border_index, classifier,
+                                                  config['structural_layers'], tolerance, stats,
+                                                  transform)
 
-        layer_name = entity.dxf.layer.upper()
-        
-        # Handle drilling operations
-        if entity.dxftype() == 'CIRCLE':
-            drilling_pattern = DXF_LAYER_CONFIG['machining']['drilling']['layer_pattern']
-            drilling_match = re.match(drilling_pattern.replace('{depth}', r'\d+'), layer_name, re.IGNORECASE)
-            
-            if drilling_match:
-                print(f"DEBUG: Processing drilling in layer {layer_name}")
-                rel_x, rel_y, calculated_face = convert_coords_to_panel_system(
-                    entity.dxf.center.x, entity.dxf.center.y,
-                    panel_type, panel_length, panel_width,
-                    primary_bbox_panel, secondary_bbox_panel,
-                    sheet_border_front_bbox, sheet_border_back_bbox,
-                    tolerance
-                )
-                print(f"DEBUG: Drilling coordinates - Original: ({entity.dxf.center.x}, {entity.dxf.center.y}), Converted: ({rel_x}, {rel_y}), Calculated face: {calculated_face}")
-                
-                if rel_x is None or rel_y is None:
-                    print("DEBUG: Invalid coordinates for drilling operation")
-                    continue
-
-                # Get drilling parameters from layer name
-                layer_name = entity.dxf.layer.upper()
-                drilling_config = DXF_LAYER_CONFIG['machining']['drilling']
-                depth = _extract_depth_from_layer(layer_name, drilling_config['layer_pattern'])
-
-                if depth is None:
-                    print(f"DEBUG: Invalid drilling layer name: {layer_name}")
-                    continue
-
-                # Get parent border for the entity
-                parent_border = None
-                for border in borders_in_group:
-                    border_vertices = list(border.vertices())
-                    if not border_vertices:
-                        continue
-                    min_x = min(v[0] for v in border_vertices)
-                    max_x = max(v[0] for v in border_vertices)
-                    min_y = min(v[1] for v in border_vertices)
-                    max_y = max(v[1] for v in border_vertices)
-                    
-                    # Check if point is inside this border
-                    if (min_x - tolerance <= entity.dxf.center.x <= max_x + tolerance and
-                        min_y - tolerance <= entity.dxf.center.y <= max_y + tolerance):
-                        parent_border = border
-                        break
-
-                # Get face from structural_layers config
-                force_face = None  # Don't force a face by default
-                if parent_border:
-                    parent_layer = parent_border.dxf.layer.upper()
-                    if parent_layer in DXF_LAYER_CONFIG['structural_layers']:
-                        layer_config = DXF_LAYER_CONFIG['structural_layers'][parent_layer]
-                        if 'face' in layer_config:  # Only set force_face if configured
-                            force_face = layer_config['face']
-                            print(f"DEBUG: Setting force_face to {force_face} for entity in layer {parent_layer}")
-
-                create_drilling_xml(machines_element, entity, panel_type, panel_length, 
-                                 panel_width, primary_bbox_panel, secondary_bbox_panel,
-                                 sheet_border_front_bbox, sheet_border_back_bbox, 
-                                 tolerance, DXF_LAYER_CONFIG['machining']['drilling'],
-                                 force_face=force_face)
-
-        # Handle pocket operations
-        elif entity.dxftype() == 'LWPOLYLINE' and layer_name == 'ABF_DSIDE_8':
-            create_pocket_xml(machines_element, entity, panel_length, panel_width,
-                            panel_type, primary_bbox_panel, secondary_bbox_panel,
-                            sheet_border_front_bbox, sheet_border_back_bbox,
-                            tolerance, DXF_LAYER_CONFIG['machining'])
-
-        # Handle groove operations
-        elif entity.dxftype() == 'LWPOLYLINE':
-            groove_pattern = DXF_LAYER_CONFIG['machining']['groove']['layer_pattern']
-            if re.match(groove_pattern.replace('{depth}', r'\d+'), layer_name, re.IGNORECASE):
-                create_groove_xml(machines_element, entity, panel_length, panel_width,
+    with stats.stage('xml_build'):
+        for operation in operations:
+            written_before = len(machines_element)
+
+            # Handle drilling operations
+            if operation.kind == 'drilling':
+                create_drilling_xml_for_operation(machines_element, operation, panel_length,
+                                                  machining_config['drilling'])
+
+            # Handle pocket operations
+            elif operation.kind == 'pocket':
+                create_pocket_xml(machines_element, operation.entity, panel_length, panel_width,
+                                panel_type, primary_bbox_panel, secondary_bbox_panel,
+                                sheet_border_front_bbox, sheet_border_back_bbox,
+                                tolerance, machining_config, transform=transform)
+
+            # Handle groove operations
+            elif operation.kind == 'groove':
+                create_groove_xml(machines_element, operation.entity, panel_length, panel_width,
                                 panel_type, primary_bbox_panel, secondary_bbox_panel,
                                 sheet_border_front_bbox, sheet_border_back_bbox,
-                                tolerance, panel_thickness, DXF_LAYER_CONFIG['machining']['groove'])
+                                tolerance, panel_thickness, machining_config['groove'],
+                                depth=operation.depth, transform=transform)
+
+            if stats.enabled:
+                if len(machines_element) > written_before:
+                    stats.count_operation(operation.kind)
+                else:
+                    stats.skip(f'{operation.kind}_rejected')
+
+def resolve_machining_operations(machining_entities, panel_group_info, panel_length, panel_width,
+                                 border_index, classifier, structural_layers, tolerance=1.0,
+                                 stats=NULL_STATS, transform=None):
+    """
+    Resolves a panel's bucket of (operation_kind, entity) tuples into
+    ResolvedOperation records, converting coordinates and parsing layer depths
+    exactly once per entity. Drills that cannot be placed on the panel are
+    dropped here and counted as skipped in stats. Returns the records in bucket order.
+    classifier parses the layer depths; structural_layers is the config entry
+    that maps a drill's parent border layer to a forced face. transform is the
+    panel's PanelTransform, built here when not given.
+    """
+    borders_in_group = panel_group_info['borders']
+    if transform is None:
+        transform = PanelTransform.for_panel(panel_group_info, panel_length, panel_width, tolerance)
+
+    # Convert all drill centers of the panel in one vectorized call
+    drill_entities = [entity for kind, entity in machining_entities if kind == 'drilling']
+    drill_coords = iter(_convert_drill_coords(drill_entities, transform))
+
+    operations = []
+    for kind, entity in machining_entities:
+        layer_name = entity.dxf.layer.upper()
+
+        if kind == 'drilling':
+            logger.debug("DEBUG: Processing drilling in layer %s", layer_name)
+            rel_x, rel_y, calculated_face = next(drill_coords)
+            logger.debug("DEBUG: Drilling coordinates - Original: (%s, %s), Converted: (%s, %s), Calculated face: %s",
+                         entity.dxf.center.x, entity.dxf.center.y, rel_x, rel_y, calculated_face)
+
+            if rel_x is None or rel_y is None:
+                logger.debug("DEBUG: Invalid coordinates for drilling operation")
+                stats.skip('drilling_outside_panel')
+                continue
+
+            # Get drilling parameters from layer name
+            _, depth = classifier.classify(entity.dxftype(), entity.dxf.layer)
+
+            if depth is None:
+                logger.debug("DEBUG: Invalid drilling layer name: %s", layer_name)
+                stats.skip('drilling_invalid_layer')
+                continue
+
+            # Get parent border for the entity
+            containing_borders = border_index.query_point(entity.dxf.center.x, entity.dxf.center.y)
+            parent_border = next((border for border in borders_in_group
+                                  if border in containing_borders), None)
+
+            # Get face from structural_layers config
+            force_face = None  # Don't force a face by default
+            if parent_border:
+                parent_layer = parent_border.dxf.layer.upper()
+                if parent_layer in structural_layers:
+                    layer_config = structural_layers[parent_layer]
+                    if 'face' in layer_config:  # Only set force_face if configured
+                        force_face = layer_config['face']
+                        logger.debug("DEBUG: Setting force_face to %s for entity in layer %s", force_face, parent_layer)
+
+            operations.append(ResolvedOperation(kind, entity, layer_name, depth,
+                                                rel_x, rel_y, calculated_face, force_face))
+
+        elif kind == 'groove':
+            _, depth = classifier.classify(entity.dxftype(), entity.dxf.layer)
+            operations.append(ResolvedOperation(kind, entity, layer_name, depth))
+
+        else:
+            operations.append(ResolvedOperation(kind, entity, layer_name, None))
+
+    return operations
+
+def _convert_drill_coords(drill_entities, transform):
+    """
+    Converts the centers of all drill entities at once with the panel's PanelTransform.
+    Returns one (rel_x, rel_y, face) tuple per entity, (None, None, None) where
+    conversion failed, like convert_coords_to_panel_system.
+    """
+    if not drill_entities:
+        return []
+    rel_xs, rel_ys, faces = transform.convert_batch(
+        [entity.dxf.center.x for entity in drill_entities],
+        [entity.dxf.center.y for entity in drill_entities]
+    )
+    return [(float(rel_x), float(rel_y), str(face)) if face else (None, None, None)
+            for rel_x, rel_y, face in zip(rel_xs, rel_ys, faces)]
+
+def _get_group_bbox(borders, geometry):
+    """Calculates the overall bounding box of all borders in a panel group."""
+    group_min_x, group_min_y = float('inf'), float('inf')
+    group_max_x, group_max_y = -float('inf'), -float('inf')
+
+    for border_entity_in_group in borders:
+        min_x, min_y, max_x, max_y = geometry.bbox(border_entity_in_group)
+        group_min_x = min(group_min_x, min_x)
+        group_min_y = min(group_min_y, min_y)
+        group_max_x = max(group_max_x, max_x)
+        group_max_y = max(group_max_y, max_y)
+
+    if group_min_x == float('inf'):
+        return None
+    return group_min_x, group_min_y, group_max_x, group_max_y
 
 def _get_entity_reference_point(entity):
     """Gets a reference point from an entity for containment checking."""
@@ -156,9 +253,9 @@ def _get_entity_reference_point(entity):
             center = entity.dxf.center
             return [center.x, center.y]
         elif entity.dxftype() == 'LWPOLYLINE':
-            vertices = list(entity.vertices())
-            if vertices:
-                return [vertices[0][0], vertices[0][1]]
+            first_vertex = next(iter(entity.vertices()), None)
+            if first_vertex is not None:
+                return [first_vertex[0], first_vertex[1]]
         elif entity.dxftype() == 'LINE':
             start = entity.dxf.start
             return [start.x, start.y]
@@ -168,15 +265,5 @@ def _get_entity_reference_point(entity):
         elif entity.dxftype() == 'POINT':
             return [entity.dxf.location.x, entity.dxf.location.y]
     except Exception as e:
-        print(f"DEBUG: Error getting reference point for {entity.dxftype()}: {e}")
+        logger.debug("DEBUG: Error getting reference point for %s: %s", entity.dxftype(), e)
     return None
-
-def _is_point_within_group(point, min_x, min_y, max_x, max_y, tolerance):
-    """Checks if a point is within the group bounding box with tolerance."""
-    if point is None or len(point) < 2:
-        return False
-    result = (min_x - tolerance <= point[0] <= max_x + tolerance and
-             min_y - tolerance <= point[1] <= max_y + tolerance)
-    if not result:
-        print(f"DEBUG: Point ({point[0]}, {point[1]}) outside bounds: X[{min_x - tolerance}, {max_x + tolerance}], Y[{min_y - tolerance}, {max_y + tolerance}]")
-    return result
@@ -0,0 +1,64 @@
+"""Converter session that keeps a compiled configuration across many conversions."""
+from .converter import dxf_to_custom_xml
+from .streaming import convert_sheet_pairs
+from .layer_classifier import LayerClassifier
+from .stats import reset_peak_rss
+from ..utils.config import DXF_LAYER_CONFIG
+
+class ConverterSession:
+    """
+    Converts any number of drawings with one configuration.
+    The machining layer patterns are compiled when the session is created and
+    the classification of every distinct layer is remembered across files, so
+    batch jobs and long-running services pay the setup cost once.
+    cache is an optional PanelCache shared by all conversions of the session.
+    fast_read reads DXF paths with read_drawing instead of ezdxf.readfile.
+    Drawings with several sheet pairs are converted pair by pair (see
+    convert_sheet_pairs); streaming keeps that strictly sequential and memory
+    bounded. A drawing whose peak memory exceeds memory_limit (bytes) fails.
+    archive ('zip' or 'tar') writes the XML files of each drawing into one
+    archive instead of a directory (see create_sink); both go to output_dir,
+    by default the working directory.
+    """
+    def __init__(self, config=DXF_LAYER_CONFIG, panel_thickness=16.0, panel_workers=None, cache=None,
+                 fast_read=False, streaming=False, memory_limit=None, archive=None,
+                 output_dir=None):
+        self.config = config
+        self.panel_thickness = panel_thickness
+        self.panel_workers = panel_workers
+        self.cache = cache
+        self.fast_read = fast_read
+        self.streaming = streaming
+        self.memory_limit = memory_limit
+        self.archive = archive
+        self.output_dir = output_dir
+        self.classifier = LayerClassifier(config['machining'])
+
+    def convert(self, drawing_or_path, stats=None, panel_thickness=None, mirror=True):
+        """
+        Converts a DXF file path or a loaded drawing and returns the list of
+        XML files written, or None if the conversion failed.
+        With mirror (the default) the right sheet of each sheet pair is mirrored
+        first, like convert_sheet_pairs; otherwise the drawing is converted as it is.
+        panel_thickness overrides the session's thickness for this drawing.
+        The peak memory is recorded in stats in either mode; memory_limit only
+        fails mirrored conversions.
+        """
+        if panel_thickness is None:
+            panel_thickness = self.panel_thickness
+        if mirror:
+            return convert_sheet_pairs(drawing_or_path, self.config, panel_thickness=panel_thickness,
+                                       panel_workers=self.panel_workers, stats=stats,
+                                       classifier=self.classifier, cache=self.cache,
+                                       memory_limit=self.memory_limit, fast_read=self.fast_read,
+                                       streaming=self.streaming, archive=self.archive,
+                                       output_dir=self.output_dir)
+        reset_peak_rss()  # Measure this drawing, not the largest one converted before
+        output_files = dxf_to_custom_xml(drawing_or_path, self.config, panel_thickness=panel_thickness,
+                                         panel_workers=self.panel_workers, stats=stats,
+                                         classifier=self.classifier, cache=self.cache,
+                                         fast_read=self.fast_read, archive=self.archive,
+                                         output_dir=self.output_dir)
+        if stats is not None:
+            stats.record_memory(self.memory_limit)
+        return output_files
@@ -0,0 +1,59 @@
+"""Picklable geometry snapshots of panel groups for processing in worker processes."""
+from types import SimpleNamespace
+
+class EntitySnapshot:
+    """
+    Picklable copy of the parts of a CIRCLE or LWPOLYLINE entity that the
+    converter reads: dxftype(), vertices() and the layer, center, radius and
+    flags attributes. It can be passed wherever the pipeline expects the entity.
+    """
+    def __init__(self, entity):
+        self._dxftype = entity.dxftype()
+        self.dxf = SimpleNamespace(layer=entity.dxf.layer)
+        self._vertices = None
+        if self._dxftype == 'CIRCLE':
+            self.dxf.center = entity.dxf.center
+            self.dxf.radius = entity.dxf.radius
+        elif self._dxftype == 'LWPOLYLINE':
+            self.dxf.flags = entity.dxf.flags
+            self._vertices = [(float(x), float(y)) for x, y in entity.vertices()]
+
+    @classmethod
+    def from_values(cls, dxftype, layer, center=None, radius=None, flags=0, vertices=None):
+        """Builds a snapshot from plain values, e.g. read from the DXF tags directly."""
+        snapshot = cls.__new__(cls)
+        snapshot._dxftype = dxftype
+        snapshot.dxf = SimpleNamespace(layer=layer)
+        snapshot._vertices = None
+        if dxftype == 'CIRCLE':
+            snapshot.dxf.center = center
+            snapshot.dxf.radius = radius
+        elif dxftype == 'LWPOLYLINE':
+            snapshot.dxf.flags = flags
+            snapshot._vertices = vertices
+        return snapshot
+
+    def dxftype(self):
+        return self._dxftype
+
+    def vertices(self):
+        return iter(self._vertices or [])
+
+    def __len__(self):
+        return len(self._vertices or [])
+
+def snapshot_panel_group(panel_group_info, machining_entities):
+    """
+    Copies a panel group and its bucket of (operation_kind, entity) tuples into
+    plain data, so no ezdxf entities have to cross a process boundary.
+    Returns (group_snapshot, machining_snapshots).
+    """
+    border_snapshots = {id(border): EntitySnapshot(border) for border in panel_group_info['borders']}
+    group_snapshot = dict(panel_group_info)
+    group_snapshot['borders'] = list(border_snapshots.values())
+    for key in ('primary_border', 'secondary_border'):
+        border = panel_group_info.get(key)
+        group_snapshot[key] = border_snapshots.get(id(border)) if border is not None else None
+
+    machining_snapshots = [(kind, EntitySnapshot(entity)) for kind, entity in machining_entities]
+    return group_snapshot, machining_snapshots
@@ -0,0 +1,110 @@
+"""Spatial index for point-in-border containment queries."""
+import math
+import numpy as np
+from .geometry_cache import GeometryCache
+from ..utils.helpers import group_entities_by_layer, get_layer_polylines
+
+class SpatialIndex:
+    """
+    Uniform grid over axis-aligned bounding boxes.
+    Answers "which boxes contain this point" by looking at a single grid cell
+    instead of scanning every box. Boxes are grown by the tolerance when they
+    are registered, so a query matches exactly like
+    min - tolerance <= p <= max + tolerance.
+    """
+    def __init__(self, items, tolerance=0.0, cell_size=None):
+        """
+        items: iterable of (item, bbox) pairs, bbox as (min_x, min_y, max_x, max_y).
+        cell_size: grid cell edge in drawing units; derived from the boxes when omitted.
+        """
+        self.tolerance = tolerance
+        self._items = []
+        self._bboxes = []
+        for item, bbox in items:
+            if bbox is None or bbox[0] == float('inf'):
+                continue
+            self._items.append(item)
+            self._bboxes.append((bbox[0] - tolerance, bbox[1] - tolerance,
+                                 bbox[2] + tolerance, bbox[3] + tolerance))
+
+        boxes = np.array(self._bboxes, dtype=np.float64).reshape(-1, 4)
+        self.cell_size = cell_size or self._default_cell_size(boxes)
+        self._cells = {}
+        cell_ranges = np.floor(boxes / self.cell_size).astype(np.int64).tolist()
+        for index, (min_i, min_j, max_i, max_j) in enumerate(cell_ranges):
+            if min_i == max_i and min_j == max_j:
+                self._cells.setdefault((min_i, min_j), []).append(index)
+                continue
+            for i in range(min_i, max_i + 1):
+                for j in range(min_j, max_j + 1):
+                    self._cells.setdefault((i, j), []).append(index)
+
+    def __len__(self):
+        return len(self._items)
+
+    def query_point(self, x, y):
+        """Returns all items whose box contains the point, in insertion order."""
+        candidates = self._cells.get(self._cell(x, y))
+        if not candidates:
+            return []
+        result = []
+        for index in candidates:
+            min_x, min_y, max_x, max_y = self._bboxes[index]
+            if min_x <= x <= max_x and min_y <= y <= max_y:
+                result.append(self._items[index])
+        return result
+
+    def query_bbox(self, min_x, min_y, max_x, max_y):
+        """Returns all items whose box intersects the given box, in insertion order."""
+        min_i, min_j = self._cell(min_x, min_y)
+        max_i, max_j = self._cell(max_x, max_y)
+        if (max_i - min_i + 1) * (max_j - min_j + 1) <= len(self._cells):
+            cells = (self._cells.get((i, j), ()) for i in range(min_i, max_i + 1)
+                     for j in range(min_j, max_j + 1))
+        else:  # Fewer occupied cells than cells under the box
+            cells = (indices for (i, j), indices in self._cells.items()
+                     if min_i <= i <= max_i and min_j <= j <= max_j)
+        found = set()
+        for indices in cells:
+            for index in indices:
+                bbox = self._bboxes[index]
+                if bbox[0] <= max_x and min_x <= bbox[2] and bbox[1] <= max_y and min_y <= bbox[3]:
+                    found.add(index)
+        return [self._items[index] for index in sorted(found)]
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    @staticmethod
+    def _default_cell_size(boxes):
+        """
+        Uses the median box size so a typical panel covers only a few cells,
+        but no less than 1/256 of the extent, so points do not scatter over
+        millions of cells.
+        """
+        if not len(boxes):
+            return 1.0
+        sizes = np.sort(np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]))
+        extent = max(boxes[:, 2].max() - boxes[:, 0].min(), boxes[:, 3].max() - boxes[:, 1].min())
+        return float(max(sizes[len(sizes) // 2], extent / 256, 1.0))
+
+def build_border_index(doc, config, tolerance=1.0, layer_map=None, geometry=None):
+    """
+    Builds a SpatialIndex of the part-border, cutting-line and sheet-border
+    polylines of a document. Items are the border entities themselves.
+    layer_map may be the document's group_entities_by_layer result and
+    geometry its GeometryCache.
+    """
+    if layer_map is None:
+        layer_map = group_entities_by_layer(doc)
+    borders = []
+    for layer_key in ('part_border', 'cutting_lines', 'sheet_border'):
+        borders.extend(get_layer_polylines(layer_map, config[layer_key]))
+    return index_borders(borders, tolerance=tolerance, geometry=geometry)
+
+def index_borders(borders, tolerance=1.0, geometry=None):
+    """Builds a SpatialIndex of the given border polylines, keyed by the borders themselves."""
+    if geometry is None:
+        geometry = GeometryCache()
+    items = [(border, geometry.bbox(border)) for border in borders]
+    return SpatialIndex(items, tolerance=tolerance)
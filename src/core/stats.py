@@ -0,0 +1,199 @@
+"""Stage timings and entity counters collected during a conversion."""
+import contextlib
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_bytes():
+    """
+    Returns the peak resident set size of this process in bytes since it
+    started or since the last successful reset_peak_rss(), or None where
+    unavailable.
+    On Linux this is the VmHWM of /proc/self/status, the peak reset_peak_rss()
+    restarts; getrusage() also counts the peak of the process this one was
+    started from, e.g. a test runner.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024  # Kilobytes
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Kilobytes on Linux
+
+def reset_peak_rss():
+    """
+    Restarts the peak measured by peak_rss_bytes at the current memory use, so
+    a long-running process can measure each conversion on its own. Only
+    possible on Linux; returns whether the peak was reset.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')  # Resets the peak RSS of the process
+        return True
+    except OSError:
+        return False
+
+class ConversionStats:
+    """
+    Collects what a conversion spent its time on and what it did.
+    stages: seconds per pipeline stage (readfile, splitting, mirroring, grouping,
+        indexing, coordinate_conversion, xml_build, xml_serialize, xml_save). With
+        panel workers the per-panel stages are summed over all workers; xml_save
+        is the time the output sink spent writing and committing the files,
+        summed over its writer threads.
+    operations: machining operations written to XML per kind.
+    skipped: machining entities left out, per reason.
+    output_files and bytes_written: the XML files written, one per panel; a file
+        written into an archive is listed as the archive (see OutputSink.location).
+    cache_hits and cache_misses: panels taken from or added to a PanelCache;
+        operations and skipped only cover the panels actually processed.
+    peak_rss_bytes: peak memory of the converting process during this
+        conversion, sampled by record_memory. The peak is restarted when a
+        conversion starts (see reset_peak_rss); where that is not possible
+        (other than Linux) it is the peak of the process so far, which may
+        come from an earlier, larger file.
+    worker_peak_rss_bytes: the largest peak memory of the panel worker
+        processes, which each report their own; None without panel workers.
+    memory_limit_bytes: the ceiling both peaks were checked against.
+    Pass an instance to the converter to fill it; leave it out to collect nothing.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}
+        self.operations = {}
+        self.skipped = {}
+        self.bytes_written = 0
+        self.output_files = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.peak_rss_bytes = None
+        self.worker_peak_rss_bytes = None
+        self.memory_limit_bytes = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Adds the time spent in the with-block to the named stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        """Adds seconds measured elsewhere, e.g. on another thread, to the named stage."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count_operation(self, kind, n=1):
+        self.operations[kind] = self.operations.get(kind, 0) + n
+
+    def skip(self, reason, n=1):
+        self.skipped[reason] = self.skipped.get(reason, 0) + n
+
+    def add_output(self, path, size):
+        self.output_files.append(path)
+        self.bytes_written += size
+
+    def count_cache(self, hit):
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def record_memory(self, limit_bytes=None):
+        """
+        Samples the process's peak memory and remembers the ceiling it is held to.
+        Returns True while the peaks of the process and its panel workers are
+        within limit_bytes (or no limit is set).
+        """
+        if limit_bytes is not None:
+            self.memory_limit_bytes = limit_bytes
+        peak = peak_rss_bytes()
+        if peak is not None:
+            self.peak_rss_bytes = max(self.peak_rss_bytes or 0, peak)
+        peak = max(peak or 0, self.worker_peak_rss_bytes or 0)
+        return limit_bytes is None or peak <= limit_bytes
+
+    def record_worker_memory(self):
+        """Samples the peak memory of this panel worker process into worker_peak_rss_bytes."""
+        peak = peak_rss_bytes()
+        if peak is not None:
+            self.worker_peak_rss_bytes = max(self.worker_peak_rss_bytes or 0, peak)
+
+    def merge(self, other):
+        """Adds the stats of another conversion, e.g. one collected in a worker process."""
+        for name, seconds in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        for kind, n in other.operations.items():
+            self.count_operation(kind, n)
+        for reason, n in other.skipped.items():
+            self.skip(reason, n)
+        self.bytes_written += other.bytes_written
+        self.output_files.extend(other.output_files)
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        if other.peak_rss_bytes is not None:
+            self.peak_rss_bytes = max(self.peak_rss_bytes or 0, other.peak_rss_bytes)
+        if other.worker_peak_rss_bytes is not None:
+            self.worker_peak_rss_bytes = max(self.worker_peak_rss_bytes or 0, other.worker_peak_rss_bytes)
+        if other.memory_limit_bytes is not None:
+            self.memory_limit_bytes = other.memory_limit_bytes
+
+    def to_dict(self):
+        return {
+            'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            'total_seconds': round(sum(self.stages.values()), 6),
+            'panels': len(self.output_files),
+            'operations': dict(self.operations),
+            'skipped': dict(self.skipped),
+            'bytes_written': self.bytes_written,
+            'output_files': list(self.output_files),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'peak_rss_bytes': self.peak_rss_bytes,
+            'worker_peak_rss_bytes': self.worker_peak_rss_bytes,
+            'memory_limit_bytes': self.memory_limit_bytes
+        }
+
+    def dump_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+class _NullStats:
+    """Stand-in used when no stats are requested; every call is a no-op."""
+    enabled = False
+    _null_stage = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._null_stage
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count_operation(self, kind, n=1):
+        pass
+
+    def skip(self, reason, n=1):
+        pass
+
+    def add_output(self, path, size):
+        pass
+
+    def count_cache(self, hit):
+        pass
+
+    def record_memory(self, limit_bytes=None):
+        return limit_bytes is None or (peak_rss_bytes() or 0) <= limit_bytes
+
+NULL_STATS = _NullStats()
@@ -0,0 +1,233 @@
+"""Conversion of drawings with several sheet pairs, one pair at a time or in parallel."""
+import contextlib
+import logging
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from ezdxf.document import Drawing
+from .converter import (
+    mirror_and_convert,
+    mirror_right_sheet,
+    group_panels,
+    submit_panel_snapshots,
+    save_panel_result,
+    load_drawing
+)
+from .dxf_reader import EXTRACTED_TYPES, ExtractedDrawing, iter_entities
+from .geometry_cache import GeometryCache
+from .layer_classifier import LayerClassifier
+from .output_sink import create_sink
+from .panel_finder import assign_sheet_pairs, find_sheet_pairs, split_sheet_pairs
+from .snapshot import EntitySnapshot, snapshot_panel_group
+from .stats import ConversionStats, NULL_STATS, reset_peak_rss
+from ..utils.helpers import group_entities_by_layer
+
+logger = logging.getLogger(__name__)
+
+def convert_sheet_pairs(input_file, config, panel_thickness=16.0, panel_workers=None, stats=None,
+                        classifier=None, cache=None, memory_limit=None, fast_read=False, streaming=False,
+                        archive=None, output_dir=None):
+    """
+    Converts a drawing with any number of front/back sheet pairs (see
+    find_sheet_pairs). A drawing with a single pair is converted as a whole
+    by mirror_and_convert. Otherwise every pair is mirrored and grouped on its
+    own, with panel numbers continuing across pairs:
+    - with panel_workers > 1 the pairs are sent to one pool of that many
+      worker processes, which mirrors and groups each pair and then
+      processes the panels of all pairs;
+    - otherwise, or with streaming, the pairs are converted one after another
+      and each is released before the next one.
+    With streaming a DXF path is never loaded as a whole: a first pass reads
+    only the sheet borders, a second spills the entities of each pair to a
+    temporary file, and the pairs are then read back and converted one at a
+    time, so the peak memory follows the largest pair rather than the file.
+    memory_limit is a ceiling in bytes; the peak memory of this conversion is
+    checked against it after every pair, and the conversion fails once it is
+    exceeded. Both are reported in stats; with stats the peaks of panel
+    workers are checked as well.
+    All XML files of the drawing go to one OutputSink in output_dir (see
+    create_sink and archive), committed only when every pair has been converted.
+    Returns the list of XML files written, or None if the conversion failed.
+    """
+    stats = stats or NULL_STATS
+    reset_peak_rss()  # Measure this drawing, not the largest one converted before
+    if classifier is None:
+        classifier = LayerClassifier(config['machining'])
+    sheet_border_layer = config['sheet_border'].upper()
+    if isinstance(input_file, (Drawing, ExtractedDrawing)):
+        doc = input_file
+    elif streaming:
+        doc = None
+        with stats.stage('readfile'):
+            sheet_borders = list(iter_entities(input_file, config, classifier, sheet_borders_only=True))
+    else:
+        with stats.stage('readfile'):
+            doc = load_drawing(input_file, config, classifier, fast_read)
+    if doc is None:
+        filename = input_file
+    else:
+        filename = doc.filename or 'drawing.dxf'
+        sheet_borders = [e for e in doc.modelspace()
+                         if e.dxftype() == 'LWPOLYLINE' and e.dxf.layer.upper() == sheet_border_layer]
+    dxf_base_name = os.path.splitext(os.path.basename(filename))[0]
+
+    with stats.stage('splitting'):
+        sheet_pairs = find_sheet_pairs(sheet_borders)
+    with create_sink(dxf_base_name, archive, output_dir, stats=stats) as sink:
+        if len(sheet_pairs) <= 1:
+            if doc is None:
+                with stats.stage('readfile'):
+                    doc = load_drawing(input_file, config, classifier, fast_read=True)
+            output_files = mirror_and_convert(doc, config, panel_thickness=panel_thickness,
+                                              panel_workers=panel_workers, stats=stats,
+                                              classifier=classifier, cache=cache, sink=sink)
+            if output_files is not None and not _check_memory(stats, memory_limit, 1):
+                output_files = None
+        elif doc is None:
+            logger.debug("DEBUG: %d جفت ورق یافت شد.", len(sheet_pairs))
+            with tempfile.TemporaryDirectory() as spill_dir:
+                with stats.stage('splitting'):
+                    spill_files = _spill_sheet_pairs(input_file, config, classifier, sheet_pairs,
+                                                     spill_dir, stats)
+                output_files = _convert_pairs(_read_spilled_pairs(spill_files, stats), len(sheet_pairs),
+                                              filename, config, panel_thickness, panel_workers, stats,
+                                              classifier, cache, memory_limit, sink)
+        else:
+            with stats.stage('splitting'):
+                pairs = split_sheet_pairs(doc.modelspace(), config, stats=stats)
+            del doc  # Only the per-pair lists are kept from here on
+            logger.debug("DEBUG: %d جفت ورق یافت شد.", len(pairs))
+            if panel_workers and panel_workers > 1 and not streaming:
+                output_files = _convert_pairs_in_workers(pairs, filename, config, panel_thickness,
+                                                         panel_workers, stats, classifier, cache,
+                                                         memory_limit, sink)
+            else:
+                output_files = _convert_pairs(_take_each(pairs), len(pairs), filename, config,
+                                              panel_thickness, panel_workers, stats, classifier, cache,
+                                              memory_limit, sink)
+        if output_files is None:
+            sink.abort()
+    return output_files
+
+def _spill_sheet_pairs(filename, config, classifier, sheet_pairs, spill_dir, stats):
+    """
+    Reads the entities of filename once and pickles each into the temporary
+    file of its sheet pair in spill_dir, in drawing order.
+    Returns the files, one per pair.
+    """
+    spill_files = [os.path.join(spill_dir, f'{index}.pickle') for index in range(len(sheet_pairs))]
+    with contextlib.ExitStack() as stack:
+        streams = [stack.enter_context(open(path, 'wb')) for path in spill_files]
+        entities = iter_entities(filename, config, classifier)
+        for pair_index, entity in assign_sheet_pairs(entities, sheet_pairs, config, stats=stats):
+            pickle.dump(entity, streams[pair_index], pickle.HIGHEST_PROTOCOL)
+    return spill_files
+
+def _read_spilled_pairs(spill_files, stats):
+    """Yields the entity list of each pair spilled by _spill_sheet_pairs, one pair at a time."""
+    for path in spill_files:
+        with stats.stage('readfile'):
+            entities = []
+            with open(path, 'rb') as stream:
+                while True:
+                    try:
+                        entities.append(pickle.load(stream))
+                    except EOFError:
+                        break
+            os.remove(path)
+        yield entities
+        del entities
+
+def _take_each(pairs):
+    """Yields the entity lists of pairs, dropping each from pairs so it is released once converted."""
+    for pair_number in range(len(pairs)):
+        pair_entities, pairs[pair_number] = pairs[pair_number], None
+        yield pair_entities
+        del pair_entities
+
+def _convert_pairs(pairs, pair_count, filename, config, panel_thickness, panel_workers, stats, classifier,
+                   cache, memory_limit, sink):
+    """Converts the entity lists yielded by pairs one after another, releasing each before the next one."""
+    output_files = []
+    for pair_number, pair_entities in enumerate(pairs):
+        logger.debug("DEBUG: --- جفت ورق %d از %d (%d موجودیت) ---",
+                     pair_number + 1, pair_count, len(pair_entities))
+        pair_files = mirror_and_convert(ExtractedDrawing(filename, pair_entities), config,
+                                        panel_thickness=panel_thickness, panel_workers=panel_workers,
+                                        stats=stats, classifier=classifier, cache=cache,
+                                        first_index=len(output_files), sink=sink)
+        del pair_entities
+        if pair_files is None or not _check_memory(stats, memory_limit, pair_number + 1):
+            return None
+        output_files.extend(pair_files)
+    return output_files
+
+def _convert_pairs_in_workers(pairs, filename, config, panel_thickness, panel_workers, stats,
+                              classifier, cache, memory_limit, sink):
+    """
+    Sends each pair to a pool of panel_workers processes, which mirrors and
+    groups it there (see _group_pair). The panels of a pair are processed in
+    the same pool as soon as it is grouped, numbered in pair order, so the
+    cores stay busy even when the pairs differ in size.
+    """
+    dxf_base_name = os.path.splitext(os.path.basename(filename))[0]
+    with ProcessPoolExecutor(max_workers=panel_workers) as executor:
+        pair_futures = []
+        for pair_entities in _take_each(pairs):
+            snapshots = [EntitySnapshot(e) for e in pair_entities if e.dxftype() in EXTRACTED_TYPES]
+            pair_futures.append(executor.submit(_group_pair, snapshots, filename, config, classifier,
+                                                stats.enabled))
+            del snapshots
+
+        pair_panels = []
+        for pair_number, future in enumerate(pair_futures):
+            panel_snapshots, worker_stats = future.result()
+            if worker_stats is not None:
+                stats.merge(worker_stats)
+            if not panel_snapshots:
+                logger.error("❌ خطا: هیچ پنل فیزیکی برای پردازش یافت نشد (جفت ورق %d).", pair_number + 1)
+                executor.shutdown(cancel_futures=True)
+                return None
+            first_index = sum(len(panels) for panels in pair_panels)
+            pair_panels.append(submit_panel_snapshots(
+                executor, [(first_index + i, *snapshot) for i, snapshot in enumerate(panel_snapshots)],
+                dxf_base_name, panel_thickness, config, stats, cache))
+
+        output_files = []
+        for pair_number, panels in enumerate(pair_panels):
+            output_files.extend(save_panel_result(sink, index, panel_type, future, stats)
+                                for index, panel_type, future in panels)
+            if not _check_memory(stats, memory_limit, pair_number + 1):
+                executor.shutdown(cancel_futures=True)
+                return None
+    return output_files
+
+def _group_pair(entities, filename, config, classifier, collect_stats=False):
+    """
+    Worker side of _convert_pairs_in_workers: mirrors and groups the
+    EntitySnapshots of one sheet pair. Returns the snapshot_panel_group of
+    each panel and the worker's stats, None unless collect_stats is set.
+    """
+    stats = ConversionStats() if collect_stats else NULL_STATS
+    drawing = ExtractedDrawing(filename, entities)
+    layer_map = group_entities_by_layer(drawing)
+    geometry = GeometryCache()
+    with stats.stage('mirroring'):
+        view = mirror_right_sheet(drawing, config, layer_map, geometry)
+    grouped_panels, machining_buckets, _ = group_panels(view, config, layer_map, geometry, stats,
+                                                        classifier)
+    panel_snapshots = [snapshot_panel_group(group, bucket)
+                       for group, bucket in zip(grouped_panels, machining_buckets)]
+    if not collect_stats:
+        return panel_snapshots, None
+    stats.record_worker_memory()
+    return panel_snapshots, stats
+
+def _check_memory(stats, memory_limit, pair_number):
+    """Returns whether the peak memory is within memory_limit, logging an error when it is not."""
+    if stats.record_memory(memory_limit):
+        return True
+    logger.error("❌ خطا: مصرف حافظه از سقف %.0f مگابایت بیشتر شد (جفت ورق %d)؛ تبدیل متوقف شد.",
+                 memory_limit / (1024 * 1024), pair_number)
+    return False
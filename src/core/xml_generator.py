@@ -1,6 +1,6 @@
 """XML generation functions for DXF to XML conversion."""
 import xml.etree.ElementTree as ET
-import xml.dom.minidom
+from .output_sink import write_file_atomic
 
 def create_panel_xml_structure(panel_id, panel_name, length, width, thickness):
     """Creates the basic XML structure for a panel including Outline and empty Machines tag."""
@@ -39,10 +39,42 @@ def create_panel_xml_structure(panel_id, panel_name, length, width, thickness):
     return root, panel_element
 
 def save_xml_file(root, output_file):
-    """Saves XML structure to file with pretty printing."""
-    xml_string = ET.tostring(root, encoding='utf-8').decode('utf-8')
-    dom = xml.dom.minidom.parseString(xml_string)
-    pretty_xml_string = dom.toprettyxml(indent="  ", encoding='utf-8')
-    
-    with open(output_file, "wb") as f:
-        f.write(pretty_xml_string)
+    """Saves XML structure to file with pretty printing. The file appears only once complete."""
+    write_file_atomic(output_file, (line.encode('utf-8') for line in iter_pretty_xml(root)))
+
+def xml_to_bytes(root):
+    """Returns the pretty printed document as written by save_xml_file."""
+    return "".join(iter_pretty_xml(root)).encode('utf-8')
+
+def iter_pretty_xml(root, indent="  "):
+    """
+    Yields the pretty printed document line by line in a single pass over the tree.
+    The output is byte-identical to ET.tostring -> minidom -> toprettyxml for the
+    element-only trees built here; an element's text is written inline and only
+    when it has no children.
+    """
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    # Iterative walk: (element, depth, closing) entries on an explicit stack
+    stack = [(root, 0, False)]
+    while stack:
+        element, depth, closing = stack.pop()
+        prefix = indent * depth
+        if closing:
+            yield f"{prefix}</{element.tag}>\n"
+            continue
+
+        attributes = "".join(f' {name}="{_escape(value)}"' for name, value in element.attrib.items())
+        children = list(element)
+        if children:
+            yield f"{prefix}<{element.tag}{attributes}>\n"
+            stack.append((element, depth, True))
+            stack.extend((child, depth + 1, False) for child in reversed(children))
+        elif element.text:
+            yield f"{prefix}<{element.tag}{attributes}>{_escape(element.text)}</{element.tag}>\n"
+        else:
+            yield f"{prefix}<{element.tag}{attributes}/>\n"
+
+def _escape(value):
+    """Escapes character data the same way minidom does when writing."""
+    return (str(value).replace("&", "&amp;").replace("<", "&lt;")
+                      .replace("\"", "&quot;").replace(">", "&gt;"))
@@ -0,0 +1 @@
+"""Long-running conversion service."""
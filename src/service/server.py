@@ -0,0 +1,283 @@
+"""
+Resident conversion service with a small HTTP API on a TCP port or a Unix socket.
+
+    POST /convert          body: DXF bytes, or JSON {"path": "...", "thickness": 16.0}
+                           query: name=<file.dxf>, thickness=<mm>, format=json|zip
+    GET  /health           queue and worker status
+
+Conversions run in a fixed pool of worker processes that keep ezdxf and a
+ConverterSession loaded. At most workers + queue_size requests are accepted
+at a time; further requests get 503 with Retry-After until a slot frees up.
+"""
+import io
+import json
+import logging
+import os
+import signal
+import socketserver
+import tarfile
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from ..core.batch import convert_file, check_worker_options
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+
+class ConversionService:
+    """
+    Owns the worker pool and the admission limit shared by all request threads.
+    workers: number of worker processes (default: number of cores).
+    queue_size: requests that may wait for a free worker before new ones are rejected.
+    session_options: passed to each worker's ConverterSession (cache, fast_read,
+    streaming, memory_limit); panel_workers > 1 raises ValueError (see
+    check_worker_options).
+    """
+    def __init__(self, config, panel_thickness=16.0, workers=None, queue_size=16, **session_options):
+        check_worker_options(session_options)
+        self.config = config
+        self.session_options = session_options
+        self.panel_thickness = panel_thickness
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._active = 0
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_ignore_interrupts)
+
+    def try_acquire(self):
+        """Reserves a slot for one request. Returns False when the service is full."""
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self._active += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+        self._slots.release()
+
+    def convert(self, name, data=None, path=None, panel_thickness=None):
+        """Runs one conversion in the pool and waits for its result dict (see _convert_job)."""
+        if panel_thickness is None:
+            panel_thickness = self.panel_thickness
+        future = self._executor.submit(_convert_job, name, data, path, self.config, panel_thickness,
+                                       self.session_options)
+        return future.result()
+
+    def status(self):
+        with self._lock:
+            active = self._active
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'active': active
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+def _ignore_interrupts():
+    """Leaves Ctrl+C to the main process, which shuts the pool down cleanly."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _convert_job(name, data, path, config, panel_thickness, session_options=None):
+    """
+    Worker side of ConversionService.convert. Converts DXF bytes (saved under
+    name) or a DXF path inside a private working directory, so the XML files
+    never collide with other jobs. Returns the batch result dict of convert_file,
+    with 'outputs' mapping each XML file name to its bytes.
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        if data is not None:
+            path = os.path.join(work_dir, name)
+            with open(path, 'wb') as f:
+                f.write(data)
+        cwd = os.getcwd()
+        os.chdir(work_dir)  # Panels are written below the working directory
+        try:
+            result = convert_file(path, config, panel_thickness, **(session_options or {}))
+        finally:
+            os.chdir(cwd)
+
+        outputs = {}
+        for output_file in dict.fromkeys(result['output_files']):
+            outputs.update(_read_output(output_file))
+    result['outputs'] = outputs
+    result['output_files'] = list(outputs)
+    return result
+
+def _read_output(path):
+    """
+    Returns {XML file name: bytes} for one file of a conversion's output_files:
+    the XML file itself, or every member of the archive holding them.
+    """
+    extension = os.path.splitext(path)[1][1:]
+    if extension == 'zip':
+        with zipfile.ZipFile(path) as archive:
+            return {name: archive.read(name) for name in archive.namelist()}
+    if extension == 'tar':
+        with tarfile.open(path) as archive:
+            return {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+    with open(path, 'rb') as f:
+        return {os.path.basename(path): f.read()}
+
+def zip_outputs(outputs):
+    """Packs {file name: bytes} into an in-memory zip archive and returns its bytes."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for file_name, content in outputs.items():
+            archive.writestr(file_name, content)
+    return buffer.getvalue()
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of the ConversionService stored on the server."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/health':
+            self._send_json(200, self.server.service.status())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/convert':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            job = self._parse_job(parse_qs(url.query, keep_blank_values=True))
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        service = self.server.service
+        if not service.try_acquire():
+            self._send_json(503, {'error': 'conversion queue is full'}, {'Retry-After': '1'})
+            return
+        try:
+            result = service.convert(job['name'], job['data'], job['path'], job['thickness'])
+        except Exception as e:  # The worker process itself died
+            logger.error("❌ Conversion worker failed: %s", e)
+            self._send_json(500, {'error': str(e) or type(e).__name__})
+            return
+        finally:
+            service.release()
+
+        if not result['success']:
+            self._send_json(422, {'file': job['name'], 'error': result['error']})
+        elif job['format'] == 'zip':
+            archive_name = os.path.splitext(job['name'])[0] + '.zip'
+            self._send(200, zip_outputs(result['outputs']), 'application/zip',
+                       {'Content-Disposition': f'attachment; filename="{archive_name}"'})
+        else:
+            self._send_json(200, {
+                'file': job['name'],
+                'seconds': round(result['seconds'], 6),
+                'outputs': {file_name: content.decode('utf-8')
+                            for file_name, content in result['outputs'].items()}
+            })
+
+    def _parse_job(self, query):
+        """Reads a job from a JSON body with a path, or from raw DXF bytes plus query parameters."""
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True  # The body cannot be skipped without its length
+            raise ValueError("invalid Content-Length header")
+        body = self.rfile.read(length)
+
+        options = {key: values[-1] for key, values in query.items()}
+        job = {'data': None, 'path': None}
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            try:
+                options.update(json.loads(body or b'{}'))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"invalid JSON body: {e}")
+            if not options.get('path'):
+                raise ValueError("JSON requests need a 'path'")
+            job['path'] = os.path.abspath(options['path'])
+            job['name'] = os.path.basename(job['path'])
+        else:
+            if not body:
+                raise ValueError("request body is empty")
+            job['data'] = body
+            job['name'] = os.path.basename(options.get('name', 'drawing.dxf'))
+        # The name becomes a file in the worker's directory and the base of the XML names;
+        # requiring '<stem>.dxf' also rules out '', '.' and '..'
+        if len(job['name']) <= 4 or not job['name'].lower().endswith('.dxf'):
+            raise ValueError(f"invalid file name {job['name']!r}: expected a name like drawing.dxf")
+
+        job['format'] = options.get('format', 'json')
+        if job['format'] not in ('json', 'zip'):
+            raise ValueError("format must be 'json' or 'zip'")
+        thickness = options.get('thickness')
+        try:
+            job['thickness'] = float(thickness) if thickness is not None else None
+        except ValueError:
+            raise ValueError("thickness must be a number")
+        return job
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                   'application/json; charset=utf-8', headers)
+
+    def _send(self, status, content, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug("DEBUG: %s - %s", self.address_string(), format % args)
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def create_server(service, host='127.0.0.1', port=DEFAULT_PORT, socket_path=None):
+    """
+    Binds the HTTP API of service to host:port, or to socket_path when given.
+    Returns the server; call serve_forever() on it.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, ConversionRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ConversionRequestHandler)
+    server.service = service
+    return server
+
+def serve(config, panel_thickness=16.0, workers=None, queue_size=16, host='127.0.0.1',
+          port=DEFAULT_PORT, socket_path=None, **session_options):
+    """Runs the conversion service until interrupted. session_options go to ConversionService."""
+    service = ConversionService(config, panel_thickness, workers, queue_size, **session_options)
+    server = create_server(service, host, port, socket_path)
+    address = socket_path or f"http://{host}:{server.server_address[1]}"
+    logger.info("✅ Conversion service listening on %s (%d workers, queue %d)",
+                address, service.workers, service.queue_size)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -51,6 +51,25 @@ class TerminalUI:
         choice = self._get_user_choice(len(dxf_files))
         return self._handle_user_choice(choice, dxf_files)
 
+    def show_batch_result(self, result):
+        """Prints the outcome of one file of a batch run."""
+        if result['success']:
+            print(f"✅ {result['file']}: {len(result['output_files'])} XML file(s) "
+                  f"in {result['seconds']:.2f}s")
+        else:
+            print(f"❌ {result['file']}: {result['error']} ({result['seconds']:.2f}s)")
+
+    def show_batch_summary(self, results, elapsed):
+        """Prints the totals of a batch run."""
+        failed = [r for r in results if not r['success']]
+        print("\n=========================================")
+        print(f"  Converted: {len(results) - len(failed)}/{len(results)} files in {elapsed:.2f}s")
+        if failed:
+            print(f"  Failed: {len(failed)}")
+            for result in failed:
+                print(f"  - {result['file']}")
+        print("=========================================")
+
     def _get_dxf_files_in_current_directory(self):
         """Lists all files with .dxf extension in the current directory."""
         return [f for f in os.listdir('.') if os.path.isfile(f) and f.lower().endswith('.dxf')]
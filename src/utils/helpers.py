@@ -1,4 +1,5 @@
 """Utility functions for DXF to XML conversion."""
+import heapq
 import math
 import re
 
@@ -44,3 +45,40 @@ def get_number_from_layer_name_after_D(layer_name, drilling_prefix):
         except ValueError:
             return None
     return None
+
+class LayerMap(dict):
+    """
+    Upper-cased layer name -> the layer's entities in drawing order, as built
+    by group_entities_by_layer. Entities are added with add(), which also
+    remembers their position in the drawing, so that in_drawing_order() can
+    merge some layers back into drawing order without another pass.
+    """
+    def __init__(self):
+        super().__init__()
+        self._positions = {}
+        self._count = 0
+
+    def add(self, entity):
+        layer = entity.dxf.layer.upper()
+        self.setdefault(layer, []).append(entity)
+        self._positions.setdefault(layer, []).append(self._count)
+        self._count += 1
+
+    def in_drawing_order(self, layers):
+        """Returns the entities of the given upper-cased layers in drawing order."""
+        streams = [zip(self._positions[layer], self[layer]) for layer in layers if layer in self]
+        return [entity for _, entity in heapq.merge(*streams, key=lambda item: item[0])]
+
+def group_entities_by_layer(doc):
+    """
+    Maps each upper-cased layer name to its modelspace entities in a single pass.
+    Entities keep their modelspace order within a layer. Returns a LayerMap.
+    """
+    layer_map = LayerMap()
+    for entity in doc.modelspace():
+        layer_map.add(entity)
+    return layer_map
+
+def get_layer_polylines(layer_map, layer_name):
+    """Returns the LWPOLYLINE entities of a layer from a group_entities_by_layer map."""
+    return [e for e in layer_map.get(layer_name.upper(), []) if e.dxftype() == 'LWPOLYLINE']
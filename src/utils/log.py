@@ -0,0 +1,36 @@
+"""Logging setup for the converter's console trace."""
+import contextlib
+import logging
+import sys
+
+# Parent of every module logger in the package (src.core.converter, ...)
+LOGGER_NAME = 'src'
+
+def configure_logging(verbose=False, stream=None):
+    """
+    Sends the converter's log records to the console as bare messages.
+    The default level shows results, warnings and errors only; verbose
+    restores the full DEBUG trace of every panel and entity.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+    logger.propagate = False
+    return logger
+
+@contextlib.contextmanager
+def capture_logs(stream):
+    """Temporarily redirects the converter's log records to stream, keeping the level."""
+    logger = logging.getLogger(LOGGER_NAME)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    saved_handlers, saved_propagate = logger.handlers[:], logger.propagate
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    try:
+        yield stream
+    finally:
+        logger.handlers[:] = saved_handlers
+        logger.propagate = saved_propagate
@@ -0,0 +1,38 @@
+"""Shared fixture for tests that convert synthetic drawings."""
+import os
+import tempfile
+import unittest
+from benchmarks.synthetic import build_nesting_drawing
+from src.core.session import ConverterSession
+
+class ConversionTestCase(unittest.TestCase):
+    """
+    Gives every test a temporary directory, self.dir, for its drawings and
+    their XML output; the working directory is left alone.
+    """
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dir = temp_dir.name
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def save_drawing(self, name='job.dxf', **options):
+        """Saves build_nesting_drawing(**options) as name in self.dir and returns its path."""
+        path = self.path(name)
+        build_nesting_drawing(**options).saveas(path)
+        return path
+
+    def session(self, **options):
+        """Returns a ConverterSession that writes its output to self.dir."""
+        return ConverterSession(output_dir=self.dir, **options)
+
+    def read_outputs(self, output_files, rename=None):
+        """Returns the contents of output_files, with rename (old, new) applied to each."""
+        contents = []
+        for path in output_files:
+            with open(path, 'rb') as f:
+                data = f.read()
+            contents.append(data.replace(*rename) if rename else data)
+        return contents
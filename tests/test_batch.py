@@ -0,0 +1,60 @@
+"""Test suite for batch conversion."""
+import os
+import tempfile
+import unittest
+from src.core.batch import find_dxf_files, convert_file, run_batch
+from src.utils.config import DXF_LAYER_CONFIG
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for name in ('a.dxf', 'B.DXF', 'notes.txt'):
+            with open(os.path.join(self.temp_dir.name, name), 'w') as f:
+                f.write('not a drawing')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_find_dxf_files(self):
+        """Test directory and glob lookup of DXF files."""
+        expected = [os.path.join(self.temp_dir.name, name) for name in ('B.DXF', 'a.dxf')]
+        self.assertEqual(find_dxf_files(self.temp_dir.name), expected)
+        self.assertEqual(find_dxf_files(os.path.join(self.temp_dir.name, 'a*')), expected[1:])
+
+    def test_convert_file_reports_failure(self):
+        """Test that a broken file is reported instead of raising."""
+        result = convert_file(os.path.join(self.temp_dir.name, 'a.dxf'), DXF_LAYER_CONFIG)
+        self.assertFalse(result['success'])
+        self.assertTrue(result['error'])
+        self.assertEqual(result['output_files'], [])
+
+    def test_run_batch_keeps_going(self):
+        """Test that every file gets a result even when all of them fail."""
+        files = find_dxf_files(self.temp_dir.name)
+        results = run_batch(files, DXF_LAYER_CONFIG, max_workers=2)
+        self.assertEqual([r['file'] for r in results], files)
+        self.assertFalse(any(r['success'] for r in results))
+
+    def test_run_batch_rejects_clashing_names(self):
+        """Test that files sharing a base name are rejected before anything is converted."""
+        other_dir = os.path.join(self.temp_dir.name, 'other')
+        os.mkdir(other_dir)
+        clash = os.path.join(other_dir, 'A.dxf')
+        with open(clash, 'w') as f:
+            f.write('not a drawing')
+        files = find_dxf_files(self.temp_dir.name) + [clash]
+        with self.assertRaises(ValueError) as cm:
+            run_batch(files, DXF_LAYER_CONFIG, max_workers=2)
+        self.assertIn(clash, str(cm.exception))
+        self.assertNotIn('B.DXF', str(cm.exception))
+
+    def test_run_batch_rejects_panel_workers(self):
+        """Test that panel worker pools inside the batch workers are refused, not ignored."""
+        files = find_dxf_files(self.temp_dir.name)
+        with self.assertRaises(ValueError) as cm:
+            run_batch(files, DXF_LAYER_CONFIG, max_workers=2, panel_workers=4)
+        self.assertIn('--workers', str(cm.exception))
+        self.assertEqual(len(run_batch(files, DXF_LAYER_CONFIG, max_workers=2, panel_workers=1)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""Test suite for the synthetic benchmark drawings and stage timing."""
+import os
+import tempfile
+import unittest
+from benchmarks.run import STAGES, time_pipeline
+from benchmarks.synthetic import build_nesting_drawing
+from src.core.panel_finder import find_and_group_panels
+from src.utils.config import DXF_LAYER_CONFIG
+
+class TestBenchmarks(unittest.TestCase):
+    def test_drawing_contents(self):
+        """Test that the generated drawing has the requested panels and machining."""
+        doc = build_nesting_drawing(panels_per_sheet=5, holes_per_panel=7, seed=3)
+        layers = [e.dxf.layer for e in doc.modelspace()]
+        self.assertEqual(layers.count('_ABF_SHEET_BORDER'), 2)
+        self.assertEqual(layers.count('_ABF_CUTTING_LINES'), 5)
+        self.assertEqual(layers.count('_ABF_PART_BORDER'), 5)
+        self.assertEqual(sum(layer.startswith('ABF_D') and layer[5:].isdigit() for layer in layers), 5 * 2 * 7)
+        self.assertEqual(layers.count('ABF_DSIDE_8'), 5 * 2)
+        self.assertEqual(sum(layer.startswith('ABF_GROOVE') for layer in layers), 5 * 2 * 2)
+
+        groups = find_and_group_panels(doc, DXF_LAYER_CONFIG)
+        self.assertEqual([g['type'] for g in groups], ['back_capable'] * 5)
+
+    def test_drawing_is_deterministic(self):
+        """Test that the same seed gives the same geometry."""
+        first, second = (build_nesting_drawing(3, 4, seed=9) for _ in range(2))
+        points = [[tuple(e.dxf.center) if e.dxftype() == 'CIRCLE' else list(e.vertices())
+                   for e in doc.modelspace()] for doc in (first, second)]
+        self.assertEqual(points[0], points[1])
+
+    def test_time_pipeline(self):
+        """Test that the real conversion is timed per stage and writes every panel."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dxf_path = os.path.join(temp_dir, 'synthetic.dxf')
+            build_nesting_drawing(3, 5).saveas(dxf_path)
+            timings, counts = time_pipeline(dxf_path, temp_dir)
+            self.assertEqual(set(timings), set(STAGES))
+            self.assertTrue(all(timings[stage] > 0 for stage in ('readfile', 'mirroring', 'xml_save')))
+            self.assertEqual(counts['panels'], 3)
+            self.assertGreater(counts['operations'], 0)
+            output_dir = os.path.join(temp_dir, 'synthetic')
+            self.assertEqual(len([f for f in os.listdir(output_dir) if f.endswith('.xml')]), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Test suite for coordinate conversion."""
+import math
+import random
+import unittest
+from src.core.coordinates import (
+    PanelTransform,
+    convert_coords_to_panel_system,
+    convert_coords_to_panel_system_batch
+)
+
+class TestCoordinates(unittest.TestCase):
+    def setUp(self):
+        self.front_bbox = (0, 0, 2800, 2070)
+        self.back_bbox = (3000, 0, 5800, 2070)
+        self.primary_bbox = (4400, 100, 5000, 900)
+        self.secondary_bbox = (100, 100, 700, 900)
+
+    def _assert_batch_matches_scalar(self, points, **kwargs):
+        args = dict(panel_type='back_capable', panel_xml_length=800, panel_xml_width=600,
+                    primary_bbox_panel=self.primary_bbox, secondary_bbox_panel=self.secondary_bbox,
+                    sheet_border_front_bbox=self.front_bbox, sheet_border_back_bbox=self.back_bbox,
+                    tolerance=1.0)
+        args.update(kwargs)
+        rel_xs, rel_ys, faces = convert_coords_to_panel_system_batch(
+            [p[0] for p in points], [p[1] for p in points], **args)
+
+        for i, (x, y) in enumerate(points):
+            with self.subTest(point=(x, y)):
+                rel_x, rel_y, face = convert_coords_to_panel_system(x, y, **args)
+                if face is None:
+                    self.assertEqual(faces[i], '')
+                    self.assertTrue(math.isnan(rel_xs[i]) and math.isnan(rel_ys[i]))
+                else:
+                    self.assertEqual((rel_xs[i], rel_ys[i], faces[i]), (rel_x, rel_y, face))
+
+    def test_batch_matches_scalar(self):
+        """Test the vectorized conversion against the scalar one, including edges."""
+        random.seed(7)
+        points = [(random.uniform(-100, 6000), random.uniform(-100, 2200)) for _ in range(500)]
+        points += [(99, 99), (701, 901), (702, 500), (4399, 100), (5001, 901), (-1, 0), (2801, 2071), (2900, 500)]
+        self._assert_batch_matches_scalar(points)
+
+    def test_batch_without_panel_bboxes(self):
+        """Test that points on a sheet without a matching panel bbox are rejected."""
+        points = [(300, 300), (4600, 300)]
+        self._assert_batch_matches_scalar(points, secondary_bbox_panel=None)
+        self._assert_batch_matches_scalar(points, primary_bbox_panel=None, sheet_border_back_bbox=None)
+
+    def test_panel_transform(self):
+        """Test the axis swap on the front face, the mirror on the back face and the rejections."""
+        transform = PanelTransform(800, 600, self.primary_bbox, self.secondary_bbox,
+                                   self.front_bbox, self.back_bbox, tolerance=1.0)
+        self.assertEqual(transform.convert(150, 300), (200, 50, "5"))
+        self.assertEqual(transform.convert(4450, 300), (200, 550, "6"))
+        self.assertEqual(transform.convert(2900, 300), (None, None, None))  # Between the sheets
+        self.assertEqual(transform.convert(150, 1500), (None, None, None))  # Off the panel
+
+        rel_xs, rel_ys, faces = transform.convert_batch([150, 4450, 2900], [300, 300, 300])
+        self.assertEqual(list(faces), ["5", "6", ""])
+        self.assertEqual((rel_xs[1], rel_ys[1]), (200, 550))
+        self.assertTrue(math.isnan(rel_xs[2]))
+
+    def test_panel_transform_for_panel(self):
+        """Test that a transform built from a panel group matches the function on its bboxes."""
+        panel_group_info = {'primary_bbox': self.primary_bbox, 'secondary_bbox': self.secondary_bbox,
+                            'sheet_border_front_bbox': self.front_bbox,
+                            'sheet_border_back_bbox': self.back_bbox}
+        transform = PanelTransform.for_panel(panel_group_info, 800, 600, tolerance=1.0)
+        for point in ((150, 300), (4450, 300), (702, 500), (5001, 901)):
+            with self.subTest(point=point):
+                self.assertEqual(transform.convert(*point), convert_coords_to_panel_system(
+                    *point, 'back_capable', 800, 600, self.primary_bbox, self.secondary_bbox,
+                    self.front_bbox, self.back_bbox, tolerance=1.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""Test suite for the fast DXF reader."""
+import unittest
+import ezdxf
+from benchmarks.synthetic import build_nesting_drawing
+from src.core.dxf_reader import read_drawing
+from src.utils.config import DXF_LAYER_CONFIG
+from tests.conversion_case import ConversionTestCase
+
+class TestReadDrawing(ConversionTestCase):
+    def test_keeps_only_converter_entities(self):
+        """Test that other layers, entity types, blocks and paperspace are skipped."""
+        doc = ezdxf.new('R2010')
+        msp = doc.modelspace()
+        msp.add_lwpolyline([(0, 0), (100, 0), (100, 50)], close=True, dxfattribs={'layer': '_ABF_PART_BORDER'})
+        msp.add_circle((10, 20, 0), radius=4, dxfattribs={'layer': 'ABF_D8'})
+        msp.add_circle((30, 20), radius=4, dxfattribs={'layer': 'NOTES'})
+        msp.add_lwpolyline([(0, 0), (5, 5)], dxfattribs={'layer': 'NOTES'})
+        msp.add_line((0, 0), (10, 10), dxfattribs={'layer': 'ABF_D8'})
+        msp.add_text('label', dxfattribs={'layer': 'ABF_D8'})
+        doc.blocks.new('PART').add_circle((0, 0), radius=4, dxfattribs={'layer': 'ABF_D8'})
+        doc.paperspace().add_circle((0, 0), radius=4, dxfattribs={'layer': 'ABF_D8'})
+        doc.saveas(self.path('mixed.dxf'))
+
+        entities = read_drawing(self.path('mixed.dxf'), DXF_LAYER_CONFIG).modelspace()
+        self.assertEqual([(e.dxftype(), e.dxf.layer) for e in entities],
+                         [('LWPOLYLINE', '_ABF_PART_BORDER'), ('CIRCLE', 'ABF_D8')])
+        border, hole = entities
+        self.assertEqual(list(border.vertices()), [(0, 0), (100, 0), (100, 50)])
+        self.assertEqual(border.dxf.flags & 1, 1)
+        self.assertEqual((hole.dxf.center.x, hole.dxf.center.y, hole.dxf.radius), (10, 20, 4))
+
+    def test_same_output_as_ezdxf(self):
+        """Test that fast reading writes the same XML files as ezdxf.readfile."""
+        doc = build_nesting_drawing(panels_per_sheet=3, holes_per_panel=8, seed=2)
+        for i in range(50):
+            doc.modelspace().add_text(f"note {i}", dxfattribs={'layer': 'NOTES', 'insert': (i, i)})
+        doc.saveas(self.path('job.dxf'))
+
+        outputs = [self.read_outputs(self.session(fast_read=fast_read).convert(self.path('job.dxf')))
+                   for fast_read in (False, True)]
+        self.assertTrue(outputs[0])
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_invalid_file(self):
+        """Test that a file without an ENTITIES section is rejected like ezdxf does."""
+        with open(self.path('broken.dxf'), 'w') as f:
+            f.write("0\nSECTION\n2\nHEADER\n0\nENDSEC\n0\nEOF\n")
+        with self.assertRaises(ezdxf.DXFStructureError):
+            read_drawing(self.path('broken.dxf'), DXF_LAYER_CONFIG)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+"""Test suite for the polyline geometry cache."""
+import unittest
+import ezdxf
+from src.core.geometry_cache import GeometryCache
+from src.utils.helpers import get_bbox, get_bbox_dimensions_sorted
+
+class TestGeometryCache(unittest.TestCase):
+    def setUp(self):
+        doc = ezdxf.new('R2010')
+        msp = doc.modelspace()
+        self.polylines = [
+            msp.add_lwpolyline([(i, 0), (i + 300.25, 0), (i + 300.25, 900), (i, 900)], close=(i % 2 == 0))
+            for i in range(50)
+        ]
+        self.empty = msp.add_lwpolyline([])
+
+    def test_matches_helpers(self):
+        """Test that cached geometry matches the vertex list based helpers."""
+        geometry = GeometryCache(initial_capacity=4)  # Forces the arrays to grow
+        for polyline in self.polylines:
+            vertices = list(polyline.vertices())
+            with self.subTest(polyline=polyline.dxf.handle):
+                self.assertEqual(geometry.vertices(polyline).tolist(), [list(v) for v in vertices])
+                self.assertEqual(geometry.bbox(polyline), get_bbox(vertices))
+                self.assertEqual(geometry.dims(polyline), get_bbox_dimensions_sorted(vertices))
+                self.assertEqual(geometry.is_closed(polyline), polyline.closed)
+        self.assertEqual(len(geometry), len(self.polylines))
+
+    def test_empty_polyline(self):
+        """Test that a polyline without vertices behaves like an empty vertex list."""
+        geometry = GeometryCache()
+        self.assertEqual(len(geometry.vertices(self.empty)), 0)
+        self.assertEqual(geometry.bbox(self.empty), get_bbox([]))
+        self.assertEqual(geometry.dims(self.empty), (0.0, 0.0))
+        self.assertEqual(geometry.center(self.empty), (None, None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+"""Test suite for the machining layer classifier."""
+import unittest
+from src.core.layer_classifier import LayerClassifier
+from src.utils.config import DXF_LAYER_CONFIG
+
+class TestLayerClassifier(unittest.TestCase):
+    def setUp(self):
+        self.classifier = LayerClassifier(DXF_LAYER_CONFIG['machining'])
+
+    def test_classify(self):
+        """Test operation kind and depth for entity type and layer name pairs."""
+        test_cases = [
+            ('CIRCLE', 'ABF_D10', ('drilling', 10)),
+            ('CIRCLE', 'abf_d8', ('drilling', 8)),
+            ('CIRCLE', 'ABF_D35', ('drilling', 35)),      # Depth is validated later
+            ('LWPOLYLINE', 'ABF_D10', (None, None)),      # Drills are circles only
+            ('LWPOLYLINE', 'ABF_DSIDE_8', ('pocket', None)),
+            ('CIRCLE', 'ABF_DSIDE_8', (None, None)),
+            ('LWPOLYLINE', 'ABF_GROOVE8', ('groove', 8)),
+            ('LWPOLYLINE', '_ABF_CUTTING_LINES', (None, None)),
+            ('LINE', 'ABF_D10', (None, None)),
+        ]
+
+        for entity_type, layer_name, expected in test_cases:
+            with self.subTest(entity_type=entity_type, layer_name=layer_name):
+                self.assertEqual(self.classifier.classify(entity_type, layer_name), expected)
+
+    def test_classify_is_memoized(self):
+        """Test that repeated lookups are answered from the cache."""
+        self.classifier.classify('CIRCLE', 'ABF_D5')
+        self.classifier._patterns = []
+        self.assertEqual(self.classifier.classify('CIRCLE', 'ABF_D5'), ('drilling', 5))
+
+if __name__ == '__main__':
+    unittest.main()
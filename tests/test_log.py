@@ -0,0 +1,41 @@
+"""Test suite for the converter's logging setup."""
+import io
+import logging
+import unittest
+from src.utils.log import configure_logging, capture_logs
+
+class TestLogging(unittest.TestCase):
+    def tearDown(self):
+        logger = logging.getLogger('src')
+        logger.handlers[:] = []
+        logger.setLevel(logging.NOTSET)
+        logger.propagate = True
+
+    def test_quiet_by_default(self):
+        """Test that DEBUG trace is dropped and results are kept by default."""
+        stream = io.StringIO()
+        configure_logging(stream=stream)
+        logger = logging.getLogger('src.core.converter')
+        logger.debug("DEBUG: %s", 'hidden')
+        logger.info("✅ %s", 'shown')
+        self.assertEqual(stream.getvalue(), "✅ shown\n")
+
+    def test_verbose_restores_trace(self):
+        """Test that verbose logging prints DEBUG lines as bare messages."""
+        stream = io.StringIO()
+        configure_logging(verbose=True, stream=stream)
+        logging.getLogger('src.core.panel_finder').debug("DEBUG: مرز %s", 'A')
+        self.assertEqual(stream.getvalue(), "DEBUG: مرز A\n")
+
+    def test_capture_logs(self):
+        """Test that captured records go only to the capture stream."""
+        console, captured = io.StringIO(), io.StringIO()
+        configure_logging(stream=console)
+        with capture_logs(captured):
+            logging.getLogger('src.core.converter').error("❌ %s", 'failed')
+        logging.getLogger('src.core.converter').error("❌ %s", 'after')
+        self.assertEqual(captured.getvalue(), "❌ failed\n")
+        self.assertEqual(console.getvalue(), "❌ after\n")
+
+if __name__ == '__main__':
+    unittest.main()
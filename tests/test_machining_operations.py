@@ -1,11 +1,14 @@
 """Test suite for machining operations."""
 import unittest
 import xml.etree.ElementTree as ET
+import ezdxf
 from src.core.machining_operations import (
+    create_pocket_xml,
     _extract_depth_from_layer,
     _validate_depth,
     _calculate_groove_width
 )
+from src.utils.config import DXF_LAYER_CONFIG
 
 class TestMachiningOperations(unittest.TestCase):
     def setUp(self):
@@ -47,6 +50,29 @@ class TestMachiningOperations(unittest.TestCase):
                 result = _validate_depth(depth, self.test_config)
                 self.assertEqual(result, expected)
 
+    def test_pocket_uses_config(self):
+        """Test that the pocket's type, faces, diameter and edge tolerance come from its config entry."""
+        doc = ezdxf.new('R2010')
+        # 10 from the left edge and 15 from the bottom edge of the panel
+        pocket = doc.modelspace().add_lwpolyline([(9, 6), (21, 6), (21, 14), (9, 14)], close=True,
+                                                 dxfattribs={'layer': 'abf_dside_8'})
+        pocket_config = DXF_LAYER_CONFIG['machining']['ABF_DSIDE_8']
+        bbox = (0, 0, 300, 500)
+        test_cases = [
+            ({}, {'Type': '1', 'Face': '2', 'X': '10.000', 'Y': '0.000', 'Diameter': '8.000'}),
+            ({'type': '9', 'diameter': 6.0, 'faces': dict(pocket_config['faces'], near_bottom='7')},
+             {'Type': '9', 'Face': '7', 'Diameter': '6.000'}),
+            ({'edge_tolerance': 1.0}, {'Face': '4', 'X': '0.000', 'Y': '15.000'}),
+        ]
+        for changes, expected in test_cases:
+            with self.subTest(changes=changes):
+                machining_config = dict(DXF_LAYER_CONFIG['machining'], ABF_DSIDE_8=dict(pocket_config, **changes))
+                machines = ET.Element('Machines')
+                create_pocket_xml(machines, pocket, 500, 300, 'front_only', bbox, bbox, bbox, None,
+                                  1.0, machining_config)
+                attributes = machines[0].attrib
+                self.assertEqual({key: attributes[key] for key in expected}, expected)
+
     def test_calculate_groove_width(self):
         """Test groove width calculation from vertices."""
         test_cases = [
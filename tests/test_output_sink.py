@@ -0,0 +1,166 @@
+"""Test suite for atomic file writing and the output sinks."""
+import os
+import stat
+import tarfile
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import zipfile
+from src.core.output_sink import OutputSink, DirectorySink, ZipSink, TarSink, create_sink, write_file_atomic
+from src.core.stats import ConversionStats
+
+class TestOutputSink(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_atomic_write(self):
+        """Test that the file gets its full content, normal permissions and no temporary file is left."""
+        path = os.path.join(self.dir, 'panel.xml')
+        write_file_atomic(path, [b'<a>', b'</a>'])
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'<a></a>')
+        self.assertEqual(os.listdir(self.dir), ['panel.xml'])
+
+        umask = os.umask(0)
+        os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o666 & ~umask)
+
+    def test_failed_write_keeps_old_file(self):
+        """Test that a write failing halfway leaves the previous file untouched."""
+        path = os.path.join(self.dir, 'panel.xml')
+        write_file_atomic(path, [b'old'])
+
+        def chunks():
+            yield b'new'
+            raise OSError("disk full")
+        with self.assertRaises(OSError):
+            write_file_atomic(path, chunks())
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'old')
+        self.assertEqual(os.listdir(self.dir), ['panel.xml'])
+
+    def test_directory_sink(self):
+        """Test that files appear only on close, in full, without temporary files left."""
+        directory = os.path.join(self.dir, 'job')
+        with DirectorySink(directory, max_workers=2, max_pending=1) as sink:
+            for i in range(20):
+                sink.write(f"{i}.xml", str(i).encode())
+            self.assertFalse(any(name.endswith('.xml') for name in os.listdir(directory)))
+            self.assertEqual(sink.location('0.xml'), os.path.join(directory, '0.xml'))
+        self.assertEqual(sorted(os.listdir(directory)), sorted(f"{i}.xml" for i in range(20)))
+        for i in range(20):
+            with open(os.path.join(directory, f"{i}.xml"), 'rb') as f:
+                self.assertEqual(f.read(), str(i).encode())
+
+    def test_directory_sink_syncs_on_commit(self):
+        """Test that the files are synced once on close, not by the writer threads."""
+        directory = os.path.join(self.dir, 'job')
+        synced_by = []
+        def fsync(fd):
+            synced_by.append(threading.current_thread().name)
+        with mock.patch('src.core.output_sink.os.fsync', side_effect=fsync):
+            with DirectorySink(directory, max_workers=2) as sink:
+                for i in range(5):
+                    sink.write(f"{i}.xml", str(i).encode())
+        self.assertEqual(synced_by, [threading.current_thread().name] * 6)  # The files and the directory
+
+    def test_write_time_recorded(self):
+        """Test that the time spent writing and committing ends up in the xml_save stage."""
+        stats = ConversionStats()
+        with ZipSink(os.path.join(self.dir, 'job.zip'), stats=stats) as sink:
+            sink.write('panel.xml', b'data')
+            self.assertNotIn('xml_save', stats.stages)
+        self.assertGreater(stats.stages['xml_save'], 0)
+
+    def test_directory_sink_abort(self):
+        """Test that a failed conversion leaves the previous files in place and no temporary files."""
+        directory = os.path.join(self.dir, 'job')
+        with DirectorySink(directory) as sink:
+            sink.write('panel.xml', b'old')
+        with self.assertRaises(RuntimeError):
+            with DirectorySink(directory) as sink:
+                sink.write('panel.xml', b'new')
+                sink.write('other.xml', b'new')
+                raise RuntimeError("conversion failed")
+        self.assertEqual(os.listdir(directory), ['panel.xml'])
+        with open(os.path.join(directory, 'panel.xml'), 'rb') as f:
+            self.assertEqual(f.read(), b'old')
+
+    def test_empty_directory_sink(self):
+        """Test that a sink without files creates no directory."""
+        directory = os.path.join(self.dir, 'job')
+        DirectorySink(directory).close()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_write_error_raised_on_close(self):
+        """Test that a failed background write is reported when the sink closes."""
+        with self.assertRaises(OSError):
+            with DirectorySink(self.dir) as sink:
+                sink.write(os.path.join('missing', 'panel.xml'), b'data')
+
+    def test_zip_sink(self):
+        """Test that all files end up in one zip archive, in the order written."""
+        path = os.path.join(self.dir, 'job.zip')
+        with ZipSink(path, max_pending=1) as sink:
+            for i in range(5):
+                sink.write(f"{i}.xml", str(i).encode())
+            self.assertFalse(os.path.exists(path))
+        self.assertEqual(sink.location('0.xml'), path)
+        self.assertEqual(os.listdir(self.dir), ['job.zip'])
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(archive.namelist(), [f"{i}.xml" for i in range(5)])
+            self.assertEqual(archive.read('3.xml'), b'3')
+
+    def test_tar_sink(self):
+        """Test that all files end up in one tar archive, in the order written."""
+        path = os.path.join(self.dir, 'job.tar')
+        with TarSink(path) as sink:
+            for i in range(5):
+                sink.write(f"{i}.xml", str(i).encode())
+        with tarfile.open(path) as archive:
+            self.assertEqual(archive.getnames(), [f"{i}.xml" for i in range(5)])
+            self.assertEqual(archive.extractfile('3.xml').read(), b'3')
+
+    def test_archive_abort(self):
+        """Test that an aborted archive leaves nothing behind."""
+        with self.assertRaises(RuntimeError):
+            with ZipSink(os.path.join(self.dir, 'job.zip')) as sink:
+                sink.write('panel.xml', b'data')
+                raise RuntimeError("conversion failed")
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_incomplete_sink_rejected(self):
+        """Test that a sink missing part of the interface cannot be created."""
+        class NoCommitSink(OutputSink):
+            def location(self, name):
+                return name
+
+            def _store(self, name, data):
+                pass
+
+            def _discard(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoCommitSink()
+
+    def test_create_sink(self):
+        """Test that create_sink picks the sink and path for the archive format."""
+        sink = create_sink('job', directory=self.dir)
+        self.assertIsInstance(sink, DirectorySink)
+        self.assertEqual(sink.location('a.xml'), os.path.join(self.dir, 'job', 'a.xml'))
+        sink.abort()
+        sink = create_sink('job', 'tar', directory=self.dir)
+        self.assertIsInstance(sink, TarSink)
+        self.assertEqual(sink.path, os.path.join(self.dir, 'job.tar'))
+        sink.abort()
+        with self.assertRaises(ValueError):
+            create_sink('job', 'rar', directory=self.dir)
+
+if __name__ == '__main__':
+    unittest.main()
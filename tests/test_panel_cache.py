@@ -0,0 +1,106 @@
+"""Test suite for the panel result cache."""
+import os
+import unittest
+from unittest import mock
+import ezdxf
+from src.core.panel_cache import PanelCache
+from src.core.stats import ConversionStats
+from tests.conversion_case import ConversionTestCase
+
+class TestPanelCache(ConversionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = self.save_drawing(panels_per_sheet=3, holes_per_panel=6, seed=11)
+        self.cache = PanelCache(self.path('cache'))
+
+    def _convert(self, source, cache):
+        stats = ConversionStats()
+        output_files = self.session(cache=cache).convert(source, stats=stats)
+        return self.read_outputs(output_files), stats
+
+    def test_second_conversion_hits(self):
+        """Test that unchanged panels come from the cache and give the same files."""
+        expected, _ = self._convert(self.job, None)
+
+        first, stats = self._convert(self.job, self.cache)
+        self.assertEqual(first, expected)
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (0, 3))
+
+        second, stats = self._convert(self.job, self.cache)
+        self.assertEqual(second, expected)
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (3, 0))
+        self.assertEqual(stats.operations, {})
+
+    def test_changed_panel_misses(self):
+        """Test that moving one hole reprocesses only the panel it belongs to."""
+        self._convert(self.job, self.cache)
+
+        doc = ezdxf.readfile(self.job)
+        circle = next(iter(doc.modelspace().query('CIRCLE')))
+        center = circle.dxf.center
+        circle.dxf.center = (center[0] + 1.0, center[1])
+        _, stats = self._convert(doc, self.cache)
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (2, 1))
+
+    def test_evicts_least_recently_used(self):
+        """Test that the cache stays within max_bytes by dropping the oldest entries."""
+        cache = PanelCache(self.path('small'), max_bytes=200)
+        cache.put('a', [[['Type', '2']]])
+        os.utime(cache._path('a'), (1, 1))
+        cache.put('b', [[['Type', '2']]])
+        cache.put('c', [[['Type', '2']] * 10])
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertLessEqual(cache.size_bytes(), 200)
+
+    def test_limit_shared_between_instances(self):
+        """Test that a cache going over max_bytes counts and evicts the entries of other instances too."""
+        directory = self.path('shared')
+        first = PanelCache(directory, max_bytes=300)
+        second = PanelCache(directory, max_bytes=300)
+        for i in range(6):
+            first.put(f"a{i}", [[['Type', '2']]])
+        second.put('b', [[['Type', '2']]])
+        on_disk = sum(entry.stat().st_size for entry in os.scandir(directory))
+        self.assertLessEqual(on_disk, 300 * 0.9)
+        self.assertIsNone(first.get('a0'))  # The least recently used entry, written by the other instance
+        self.assertEqual(PanelCache(directory).size_bytes(), on_disk)
+
+    def test_directory_scanned_only_over_budget(self):
+        """Test that writes within the budget do not rescan the directory."""
+        cache = PanelCache(self.path('scans'), max_bytes=10 * 1024)
+        with mock.patch('src.core.panel_cache.os.scandir', wraps=os.scandir) as scandir:
+            for i in range(50):
+                cache.put(f"k{i}", [[['Type', '2']]])
+            self.assertEqual(scandir.call_count, 1)
+            for i in range(200):
+                cache.put(f"more{i}", [[['Type', '2']]])
+            self.assertLess(scandir.call_count, 30)
+        self.assertLessEqual(cache.size_bytes(), 10 * 1024)
+        self.assertEqual(cache.size_bytes(), PanelCache(cache.directory).size_bytes())
+
+    def test_stale_temp_files_removed(self):
+        """Test that temporary files count towards the limit and old ones are removed."""
+        cache = PanelCache(self.path('temp'), max_bytes=1000)
+        stale = os.path.join(cache.directory, 'stale.tmp')
+        fresh = os.path.join(cache.directory, 'fresh.tmp')
+        for path in (stale, fresh):
+            with open(path, 'wb') as f:
+                f.write(b'x' * 990)
+        os.utime(stale, (1, 1))
+        cache.put('a', [[['Type', '2']]])
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(fresh))
+        self.assertIsNone(cache.get('a'))  # Evicted to make room for the write in progress
+
+    def test_invalidate(self):
+        """Test that invalidate empties the cache, temporary files included, and a fresh instance sees it empty."""
+        self._convert(self.job, self.cache)
+        with open(os.path.join(self.cache.directory, 'left.tmp'), 'wb') as f:
+            f.write(b'x')
+        self.assertEqual(self.cache.invalidate(), 3)
+        self.assertEqual(os.listdir(self.cache.directory), [])
+        self.assertEqual(len(PanelCache(self.cache.directory)), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import pytest
+import ezdxf
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.panel_finder import find_and_group_panels
+from src.utils.config import DXF_LAYER_CONFIG
+
+def add_rect(msp, x, y, w, h, layer):
+    return msp.add_lwpolyline([(x, y), (x + w, y), (x + w, y + h), (x, y + h)], close=True,
+                              dxfattribs={'layer': layer})
+
+def create_test_drawing():
+    """Front sheet with three identical cutting lines, back sheet with mirrored part borders."""
+    doc = ezdxf.new('R2010')
+    msp = doc.modelspace()
+    add_rect(msp, 0, 0, 1000, 600, '_ABF_SHEET_BORDER')
+    add_rect(msp, 1200, 0, 1000, 600, '_ABF_SHEET_BORDER')
+
+    # Front sheet, left to right
+    cuts = [add_rect(msp, x, 100, 200, 300, '_ABF_CUTTING_LINES') for x in (50, 350, 650)]
+    # Back sheet, mirrored: listed in the same order, so list order would pair them wrongly
+    parts = [add_rect(msp, 2200 - x - 200, 100, 200.5, 300, '_ABF_PART_BORDER') for x in (650, 50, 350)]
+    # A cutting line without a part border stays front-only
+    front_only = add_rect(msp, 100, 450, 120, 80, '_ABF_CUTTING_LINES')
+    return doc, cuts, parts, front_only
+
+def test_dimension_matching_breaks_ties_by_position():
+    doc, cuts, parts, front_only = create_test_drawing()
+    groups = find_and_group_panels(doc, DXF_LAYER_CONFIG)
+
+    back_capable = [g for g in groups if g['type'] == 'back_capable']
+    assert [g['primary_border'] for g in back_capable] == parts
+    assert [g['secondary_border'] for g in back_capable] == [cuts[2], cuts[0], cuts[1]], \
+        "Identical panels should pair with the cutting line at the mirrored position"
+
+    remaining = [g for g in groups if g['type'] == 'front_only']
+    assert [g['primary_border'] for g in remaining] == [front_only]
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
@@ -7,9 +7,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.core.panel_mirroring import (
     find_right_sheet_border,
     get_entities_within_border,
+    index_entity_points,
     mirror_entities,
-    add_entities_to_doc
+    MirroredDrawing
 )
+from src.utils.helpers import group_entities_by_layer
 
 def create_test_drawing():
     """Create a test drawing with sheet borders, panels, and holes."""
@@ -46,17 +48,44 @@ def test_find_right_sheet_border():
 def test_get_entities_within_border():
     doc = create_test_drawing()
     right_border = find_right_sheet_border(doc, '_ABF_SHEET_BORDER')
-    entities = get_entities_within_border(doc, right_border)
+    entities = get_entities_within_border(doc, right_border, '_ABF_SHEET_BORDER')
     assert len(entities) == 3, "Should find 3 entities (1 panel border + 2 holes)"
     
     entity_types = set(e.dxftype() for e in entities)
     assert 'LWPOLYLINE' in entity_types, "Should find panel border"
     assert 'CIRCLE' in entity_types, "Should find holes"
 
+def test_get_entities_within_border_from_index():
+    doc = create_test_drawing()
+    msp = doc.modelspace()
+    straddling = msp.add_lwpolyline([(300, 100), (450, 100), (450, 150), (300, 150)])
+    straddling.dxf.layer = 'ABF_GROOVE8'
+    msp.add_circle((450, 300), radius=5).dxf.layer = 'ABF_D8'
+    right_border = find_right_sheet_border(doc, '_ABF_SHEET_BORDER')
+
+    entity_index = index_entity_points(doc.modelspace(), '_ABF_SHEET_BORDER')
+    entities = get_entities_within_border(doc, right_border, '_ABF_SHEET_BORDER', entity_index)
+    assert get_entities_within_border(doc, right_border, '_ABF_SHEET_BORDER') == entities
+    assert len(entities) == 3, "Only entities with a point in the right sheet should be found"
+    assert straddling not in entities, "A polyline without a vertex in the sheet is outside"
+
+def test_sheet_border_layer_from_config():
+    doc = create_test_drawing()
+    for e in doc.modelspace():
+        if e.dxf.layer == '_ABF_SHEET_BORDER':
+            e.dxf.layer = 'SHEETS'
+    inner_sheet = doc.modelspace().add_lwpolyline([(520, 20), (880, 20), (880, 580), (520, 580)])
+    inner_sheet.dxf.layer = 'SHEETS'
+    right_border = find_right_sheet_border(doc, 'SHEETS')
+
+    entities = get_entities_within_border(doc, right_border, 'SHEETS')
+    assert inner_sheet not in entities, "Sheet borders of the configured layer should be left out"
+    assert len(entities) == 3
+
 def test_mirror_entities():
     doc = create_test_drawing()
     right_border = find_right_sheet_border(doc, '_ABF_SHEET_BORDER')
-    entities = get_entities_within_border(doc, right_border)
+    entities = get_entities_within_border(doc, right_border, '_ABF_SHEET_BORDER')
     
     points = list(right_border.get_points())
     min_x = min(p[0] for p in points)
@@ -70,23 +99,41 @@ def test_mirror_entities():
     hole_layers = [e.dxf.layer for e in mirrored if e.dxftype() == 'CIRCLE']
     assert all(layer == 'ABF_D10' for layer in hole_layers), "Mirrored holes should keep their layer"
 
-def test_add_entities_to_doc():
+def test_mirror_entities_positions():
     doc = create_test_drawing()
-    initial_count = len(list(doc.modelspace()))
-    
     right_border = find_right_sheet_border(doc, '_ABF_SHEET_BORDER')
-    entities = get_entities_within_border(doc, right_border)
+    entities = get_entities_within_border(doc, right_border, '_ABF_SHEET_BORDER')
     
-    points = list(right_border.get_points())
-    min_x = min(p[0] for p in points)
-    max_x = max(p[0] for p in points)
-    axis_x = (min_x + max_x) / 2
+    mirrored = mirror_entities([right_border] + entities, (500, 900), 700)
+    centers = sorted((e.dxf.center.x, e.dxf.center.y) for e in mirrored if e.dxftype() == 'CIRCLE')
+    assert centers == [(650, 350), (750, 250)], "Holes should be mirrored around x=700"
+    assert all(e.source.dxf.center.x in (650, 750) for e in mirrored if e.dxftype() == 'CIRCLE'), \
+        "The source entities should not move"
+
+def test_mirror_entities_polyline_vertices():
+    doc = create_test_drawing()
+    groove = doc.modelspace().add_lwpolyline([(620, 220), (780, 240)])
+    groove.dxf.layer = 'ABF_GROOVE_D5'
     
-    mirrored = mirror_entities([right_border] + entities, (min_x, max_x), axis_x)
-    add_entities_to_doc(doc, mirrored)
+    mirrored = mirror_entities([groove], (500, 900), 700)
+    assert [tuple(v) for v in mirrored[0].vertices()] == [(780, 220), (620, 240)], \
+        "Polyline vertices should be mirrored around x=700"
+    assert [tuple(v)[:2] for v in groove.vertices()] == [(620, 220), (780, 240)], \
+        "The source polyline should not move"
+
+def test_mirrored_drawing():
+    doc = create_test_drawing()
+    initial_count = len(list(doc.modelspace()))
+    layer_map = group_entities_by_layer(doc)
+    
+    right_border = find_right_sheet_border(doc, '_ABF_SHEET_BORDER')
+    entities = get_entities_within_border(doc, right_border, '_ABF_SHEET_BORDER')
+    mirrored = mirror_entities([right_border] + entities, (500, 900), 700)
+    view = MirroredDrawing(doc, mirrored, layer_map)
     
-    final_count = len(list(doc.modelspace()))
-    assert final_count == initial_count + len(mirrored), "Should add all mirrored entities"
+    assert len(list(doc.modelspace())) == initial_count, "The document should not be modified"
+    assert list(view.modelspace())[initial_count:] == mirrored, "Mirrored entities should follow the document's"
+    assert len(layer_map['ABF_D10']) == 4, "The layer map should include the mirrored holes"
 
 if __name__ == '__main__':
     pytest.main(['-v', __file__])
@@ -0,0 +1,81 @@
+import pickle
+import pytest
+import xml.etree.ElementTree as ET
+import ezdxf
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.panel_finder import find_and_group_panels
+from src.core.panel_processor import index_machining_entities, process_machining_entities_for_panel
+from src.core.snapshot import snapshot_panel_group
+from src.core.spatial_index import index_borders
+from src.core.xml_generator import create_panel_xml_structure
+from src.utils.config import DXF_LAYER_CONFIG
+from src.utils.helpers import group_entities_by_layer
+
+def create_test_drawing():
+    """Create a drawing with one front sheet, two front-only panels and machining entities."""
+    doc = ezdxf.new('R2010')
+    msp = doc.modelspace()
+
+    msp.add_lwpolyline([(0, 0), (1000, 0), (1000, 600), (0, 600)], close=True,
+                       dxfattribs={'layer': '_ABF_SHEET_BORDER'})
+    msp.add_lwpolyline([(10, 10), (310, 10), (310, 510), (10, 510)], close=True,
+                       dxfattribs={'layer': '_ABF_CUTTING_LINES'})
+    msp.add_lwpolyline([(500, 10), (800, 10), (800, 410), (500, 410)], close=True,
+                       dxfattribs={'layer': '_ABF_CUTTING_LINES'})
+
+    msp.add_circle((100, 100), 4, dxfattribs={'layer': 'ABF_D8'})
+    msp.add_circle((600, 100), 4, dxfattribs={'layer': 'ABF_D8'})
+    msp.add_circle((650, 200), 4, dxfattribs={'layer': 'ABF_D5'})
+    msp.add_circle((900, 500), 4, dxfattribs={'layer': 'ABF_D8'})      # outside every panel
+    msp.add_circle((120, 120), 4, dxfattribs={'layer': 'OTHER'})       # not a machining layer
+    msp.add_lwpolyline([(500, 100), (512, 100), (512, 108), (500, 108)], close=True,
+                       dxfattribs={'layer': 'ABF_DSIDE_8'})
+    msp.add_lwpolyline([(20, 200), (300, 200), (300, 208), (20, 208)], close=True,
+                       dxfattribs={'layer': 'ABF_GROOVE8'})
+    return doc
+
+def test_index_machining_entities():
+    doc = create_test_drawing()
+    groups = find_and_group_panels(doc, DXF_LAYER_CONFIG)
+    buckets = index_machining_entities(doc, groups, DXF_LAYER_CONFIG)
+
+    assert len(buckets) == 2
+    kinds = [[kind for kind, _ in bucket] for bucket in buckets]
+    assert kinds[0] == ['drilling', 'groove']
+    assert kinds[1] == ['drilling', 'drilling', 'pocket'], "Entities should keep modelspace order"
+
+def test_index_reads_machining_layers_only():
+    doc = create_test_drawing()
+    groups = find_and_group_panels(doc, DXF_LAYER_CONFIG)
+    layer_map = group_entities_by_layer(doc)
+    expected = index_machining_entities(doc, groups, DXF_LAYER_CONFIG)
+
+    class NoModelspace:
+        def modelspace(self):
+            raise AssertionError("the modelspace should not be scanned")
+
+    assert index_machining_entities(NoModelspace(), groups, DXF_LAYER_CONFIG, layer_map=layer_map) == expected
+
+def test_snapshot_processing_matches_entities():
+    doc = create_test_drawing()
+    groups = find_and_group_panels(doc, DXF_LAYER_CONFIG)
+    buckets = index_machining_entities(doc, groups, DXF_LAYER_CONFIG)
+
+    for group, bucket in zip(groups, buckets):
+        snapshot = pickle.loads(pickle.dumps(snapshot_panel_group(group, bucket)))
+        group_snapshot, machining_snapshots = snapshot
+
+        outputs = []
+        for args in ((doc, group, bucket, None),
+                     (None, group_snapshot, machining_snapshots, index_borders(group_snapshot['borders']))):
+            root, panel_element = create_panel_xml_structure('p', 'p', 500, 300, 16)
+            process_machining_entities_for_panel(args[0], panel_element, args[1], 500, 300, 16,
+                                                 DXF_LAYER_CONFIG, args[2], args[3])
+            outputs.append(ET.tostring(root))
+        assert outputs[0] == outputs[1], "Snapshots should produce the same XML as the entities"
+
+if __name__ == '__main__':
+    pytest.main(['-v', __file__])
@@ -0,0 +1,124 @@
+"""Test suite for the conversion service."""
+import http.client
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+import zipfile
+from benchmarks.synthetic import build_nesting_drawing
+from src.service.server import ConversionService, create_server, _convert_job
+from src.utils.config import DXF_LAYER_CONFIG
+
+class TestConversionService(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.dxf_path = os.path.join(cls.temp_dir.name, 'job.dxf')
+        build_nesting_drawing(panels_per_sheet=2, holes_per_panel=4).saveas(cls.dxf_path)
+        with open(cls.dxf_path, 'rb') as f:
+            cls.dxf_bytes = f.read()
+
+        cls.service = ConversionService(DXF_LAYER_CONFIG, workers=1, queue_size=1)
+        cls.server = create_server(cls.service, port=0)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.service.shutdown()
+        cls.temp_dir.cleanup()
+
+    def _post(self, query, body, content_type='application/dxf'):
+        request = urllib.request.Request(f"{self.url}/convert{query}", data=body, method='POST',
+                                         headers={'Content-Type': content_type})
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+
+    def test_convert_bytes(self):
+        """Test that posted DXF bytes come back as XML documents."""
+        status, _, body = self._post('?name=job.dxf', self.dxf_bytes)
+        result = json.loads(body)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(result['outputs']), 2)
+        for file_name, xml_text in result['outputs'].items():
+            self.assertTrue(file_name.startswith('job.'))
+            self.assertIn('<Machining', xml_text)
+
+    def test_convert_path_as_zip(self):
+        """Test conversion by path with the outputs packed in a zip archive."""
+        status, headers, body = self._post('?format=zip', json.dumps({'path': self.dxf_path}).encode(),
+                                           'application/json')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertEqual(len(archive.namelist()), 2)
+
+    def test_archive_outputs(self):
+        """Test that a service writing archives still returns the XML documents one by one."""
+        for archive in ('zip', 'tar'):
+            with self.subTest(archive=archive):
+                result = _convert_job('job.dxf', None, self.dxf_path, DXF_LAYER_CONFIG, 16.0,
+                                      {'archive': archive})
+                self.assertEqual(len(result['outputs']), 2)
+                self.assertTrue(all(name.endswith('.xml') for name in result['outputs']))
+
+    def test_bad_requests(self):
+        """Test that empty bodies and broken drawings are rejected."""
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self._post('', b'')
+        self.assertEqual(context.exception.code, 400)
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self._post('?name=broken.dxf', b'not a drawing')
+        self.assertEqual(context.exception.code, 422)
+
+    def test_bad_names(self):
+        """Test that names that are not a DXF file name are rejected before conversion."""
+        for name in ('', '.', '..', 'dir/..', '.dxf', 'job.txt', 'job'):
+            with self.subTest(name=name):
+                with self.assertRaises(urllib.error.HTTPError) as context:
+                    self._post(f'?name={name}', self.dxf_bytes)
+                self.assertEqual(context.exception.code, 400)
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self._post('', json.dumps({'path': self.temp_dir.name}).encode(), 'application/json')
+        self.assertEqual(context.exception.code, 400)
+
+    def test_bad_content_length(self):
+        """Test that a malformed Content-Length gets a 400 instead of a dropped connection."""
+        for length in ('abc', '-5'):
+            with self.subTest(length=length):
+                connection = http.client.HTTPConnection('127.0.0.1', self.server.server_address[1])
+                try:
+                    connection.putrequest('POST', '/convert?name=job.dxf')
+                    connection.putheader('Content-Length', length)
+                    connection.endheaders()
+                    response = connection.getresponse()
+                    self.assertEqual(response.status, 400)
+                    self.assertIn('Content-Length', json.loads(response.read())['error'])
+                finally:
+                    connection.close()
+
+    def test_health_and_admission(self):
+        """Test the status endpoint and that the service refuses work beyond its slots."""
+        with urllib.request.urlopen(f"{self.url}/health") as response:
+            self.assertEqual(json.loads(response.read())['workers'], 1)
+
+        self.assertTrue(self.service.try_acquire())
+        self.assertTrue(self.service.try_acquire())
+        try:
+            self.assertFalse(self.service.try_acquire())
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                self._post('?name=job.dxf', self.dxf_bytes)
+            self.assertEqual(context.exception.code, 503)
+        finally:
+            self.service.release()
+            self.service.release()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Test suite for the converter session."""
+import copy
+import unittest
+import xml.etree.ElementTree as ET
+import ezdxf
+from src.core.converter import mirror_and_convert
+from src.core.session import ConverterSession
+from src.utils.config import DXF_LAYER_CONFIG
+from src.utils.log import LOGGER_NAME
+from tests.conversion_case import ConversionTestCase
+
+class TestConverterSession(ConversionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = self.save_drawing(panels_per_sheet=2, holes_per_panel=6, seed=5)
+
+    def test_matches_mirror_and_convert(self):
+        """Test that a session writes the same files for paths and loaded drawings."""
+        expected = self.read_outputs(mirror_and_convert(self.job, DXF_LAYER_CONFIG, output_dir=self.dir))
+
+        session = self.session()
+        self.assertEqual(self.read_outputs(session.convert(self.job)), expected)
+        self.assertEqual(self.read_outputs(session.convert(ezdxf.readfile(self.job))), expected)
+
+    def test_uses_its_own_config(self):
+        """Test that layer patterns and XML types come from the session's config."""
+        config = copy.deepcopy(DXF_LAYER_CONFIG)
+        config['machining']['drilling']['layer_pattern'] = 'HOLE_D{depth}'
+        config['machining']['drilling']['type'] = '9'
+
+        doc = ezdxf.readfile(self.job)
+        for entity in doc.modelspace().query('CIRCLE'):
+            entity.dxf.layer = entity.dxf.layer.replace('ABF_D', 'HOLE_D')
+        doc.filename = 'renamed.dxf'
+
+        output_files = ConverterSession(config, output_dir=self.dir).convert(doc)
+        types = {machining.get('Type') for path in output_files
+                 for machining in ET.parse(path).getroot().iter('Machining')}
+        self.assertIn('9', types)
+        self.assertNotIn('2', types)
+
+    def test_back_machining_not_duplicated(self):
+        """Test that back-face operations are written once per panel, not once per view."""
+        for path in self.session().convert(self.job):
+            machinings = [tuple(sorted(machining.attrib.items()))
+                          for machining in ET.parse(path).getroot().iter('Machining')]
+            self.assertEqual(len(machinings), len(set(machinings)), path)
+
+    def test_mirrored_sheet_not_a_third_sheet(self):
+        """Test that the mirrored copy of the back sheet does not warn of more sheets."""
+        with self.assertNoLogs(LOGGER_NAME, level='WARNING'):
+            self.assertEqual(len(self.session().convert(self.job)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Test suite for the spatial index."""
+import unittest
+from src.core.spatial_index import SpatialIndex
+
+class TestSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SpatialIndex([
+            ('sheet', (0, 0, 1000, 600)),
+            ('panel_a', (10, 10, 310, 510)),
+            ('panel_b', (500, 10, 800, 410)),
+        ], tolerance=1.0)
+
+    def test_query_point(self):
+        """Test which boxes contain a point, in insertion order."""
+        test_cases = [
+            ((100, 100), ['sheet', 'panel_a']),
+            ((600, 100), ['sheet', 'panel_b']),
+            ((900, 500), ['sheet']),
+            ((2000, 2000), []),
+            ((-5, 0), []),
+        ]
+
+        for point, expected in test_cases:
+            with self.subTest(point=point):
+                self.assertEqual(self.index.query_point(*point), expected)
+
+    def test_tolerance(self):
+        """Test that boxes are grown by the tolerance on every side."""
+        self.assertEqual(self.index.query_point(311, 100), ['sheet', 'panel_a'])
+        self.assertEqual(self.index.query_point(311.5, 100), ['sheet'])
+        self.assertEqual(self.index.query_point(-1, -1), ['sheet'])
+
+    def test_query_bbox(self):
+        """Test which boxes intersect a box, in insertion order."""
+        test_cases = [
+            ((0, 0, 9, 9), ['sheet', 'panel_a']),
+            ((0, 0, 8.5, 8.5), ['sheet']),
+            ((320, 420, 490, 590), ['sheet']),
+            ((300, 0, 520, 20), ['sheet', 'panel_a', 'panel_b']),
+            ((1002, 0, 1100, 100), []),
+        ]
+
+        for bbox, expected in test_cases:
+            with self.subTest(bbox=bbox):
+                self.assertEqual(self.index.query_bbox(*bbox), expected)
+
+    def test_query_bbox_of_points(self):
+        """Test that a box query over many cells finds the points inside it."""
+        points = [(f"p{i}", (i * 7.0, i * 3.0, i * 7.0, i * 3.0)) for i in range(1000)]
+        index = SpatialIndex(points)
+        self.assertEqual(index.query_bbox(70, 0, 700, 150), [f"p{i}" for i in range(10, 51)])
+
+    def test_skips_empty_bbox(self):
+        """Test that empty bounding boxes are not indexed."""
+        index = SpatialIndex([('empty', (float('inf'), float('inf'), -float('inf'), -float('inf')))])
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.query_point(0, 0), [])
+
+if __name__ == '__main__':
+    unittest.main()
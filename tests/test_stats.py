@@ -0,0 +1,60 @@
+"""Test suite for conversion stats."""
+import json
+import os
+import unittest
+from src.core.converter import mirror_and_convert
+from src.core.stats import ConversionStats, NULL_STATS
+from src.utils.config import DXF_LAYER_CONFIG
+from tests.conversion_case import ConversionTestCase
+
+class TestConversionStats(ConversionTestCase):
+    def test_counters_and_merge(self):
+        """Test stage timing, counters and merging of worker stats."""
+        stats = ConversionStats()
+        with stats.stage('grouping'):
+            pass
+        stats.count_operation('drilling', 3)
+        stats.skip('groove_rejected')
+        stats.add_output('a.xml', 100)
+
+        worker = ConversionStats()
+        worker.count_operation('drilling')
+        worker.skip('groove_rejected', 2)
+        worker.add_output('b.xml', 50)
+        stats.merge(worker)
+
+        result = stats.to_dict()
+        self.assertIn('grouping', result['stages'])
+        self.assertEqual(result['operations'], {'drilling': 4})
+        self.assertEqual(result['skipped'], {'groove_rejected': 3})
+        self.assertEqual(result['panels'], 2)
+        self.assertEqual(result['bytes_written'], 150)
+
+    def test_null_stats(self):
+        """Test that the disabled stats accept every call and keep nothing."""
+        with NULL_STATS.stage('readfile'):
+            NULL_STATS.count_operation('drilling')
+            NULL_STATS.skip('outside_panels')
+            NULL_STATS.add_output('a.xml', 1)
+        self.assertFalse(NULL_STATS.enabled)
+        self.assertFalse(hasattr(NULL_STATS, 'operations'))
+
+    def test_converter_fills_stats(self):
+        """Test that a conversion reports its stages, operations and output."""
+        job = self.save_drawing(panels_per_sheet=2, holes_per_panel=4)
+        stats = ConversionStats()
+        output_files = mirror_and_convert(job, DXF_LAYER_CONFIG, stats=stats, output_dir=self.dir)
+
+        self.assertEqual(stats.output_files, output_files)
+        self.assertEqual(stats.bytes_written, sum(os.path.getsize(f) for f in output_files))
+        for stage in ('readfile', 'mirroring', 'grouping', 'indexing',
+                      'coordinate_conversion', 'xml_build', 'xml_serialize', 'xml_save'):
+            self.assertIn(stage, stats.stages)
+        self.assertGreater(stats.operations['drilling'], 0)
+
+        stats.dump_json(self.path('stats.json'))
+        with open(self.path('stats.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['panels'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""Test suite for sheet-pair detection and conversion."""
+import os
+import subprocess
+import sys
+import unittest
+import zipfile
+import ezdxf
+from benchmarks.synthetic import build_nesting_drawing
+from src.core.stats import ConversionStats, peak_rss_bytes, reset_peak_rss
+from src.core.panel_finder import find_sheet_pairs, split_sheet_pairs
+from src.utils.config import DXF_LAYER_CONFIG
+from tests.conversion_case import ConversionTestCase
+
+class TestSheetPairs(unittest.TestCase):
+    def test_pairs_rows_left_to_right(self):
+        """Test that sheets pair left to right within rows, bottom row first."""
+        doc = ezdxf.new('R2010')
+        msp = doc.modelspace()
+        sheets = {}
+        for name, x, y in (('b2', 300, 0), ('top1', 0, 500), ('a1', 0, 0), ('c1', 600, 10),
+                           ('b1', 200, 0), ('top2', 200, 500)):
+            sheets[name] = msp.add_lwpolyline([(x, y), (x + 100, y), (x + 100, y + 400), (x, y + 400)],
+                                              close=True, dxfattribs={'layer': '_ABF_SHEET_BORDER'})
+        names = {id(border): name for name, border in sheets.items()}
+
+        pairs = find_sheet_pairs(list(sheets.values()))
+        self.assertEqual([[names[id(b)] for b in pair] for pair in pairs],
+                         [['a1', 'b1'], ['b2', 'c1'], ['top1', 'top2']])
+
+    def test_pairs_sheets_of_the_same_size(self):
+        """Test that a sheet pairs with the next sheet of its size, not just the next sheet."""
+        doc = ezdxf.new('R2010')
+        msp = doc.modelspace()
+        sheets = {}
+        for name, x, width in (('big1', 0, 300), ('small1', 400, 100), ('big2', 600, 300), ('small2', 1000, 100)):
+            sheets[name] = msp.add_lwpolyline([(x, 0), (x + width, 0), (x + width, 400), (x, 400)],
+                                              close=True, dxfattribs={'layer': '_ABF_SHEET_BORDER'})
+        names = {id(border): name for name, border in sheets.items()}
+
+        pairs = find_sheet_pairs(list(sheets.values()))
+        self.assertEqual([[names[id(b)] for b in pair] for pair in pairs],
+                         [['big1', 'big2'], ['small1', 'small2']])
+
+    def test_split_keeps_drawing_order(self):
+        """Test that each pair gets its own sheets and machining in drawing order."""
+        doc = build_nesting_drawing(panels_per_sheet=2, holes_per_panel=3, seed=4, sheet_pairs=2)
+        doc.modelspace().add_circle((-5000, 0), 4, dxfattribs={'layer': 'ABF_D8'})
+        entities = list(doc.modelspace())
+        stats = ConversionStats()
+
+        pairs = split_sheet_pairs(entities, DXF_LAYER_CONFIG, stats=stats)
+        self.assertEqual(len(pairs), 2)
+        self.assertEqual(sum(len(pair) for pair in pairs), len(entities) - 1)
+        for pair in pairs:
+            self.assertEqual(pair, sorted(pair, key=entities.index))
+            self.assertEqual(sum(e.dxf.layer == '_ABF_SHEET_BORDER' for e in pair), 2)
+        self.assertEqual(stats.skipped, {'outside_sheets': 1})
+
+class TestStreamingConversion(ConversionTestCase):
+    def test_single_pair_matches_whole_file(self):
+        """Test that streaming a one-pair drawing writes the same files."""
+        job = self.save_drawing(panels_per_sheet=3, holes_per_panel=6, seed=9)
+        expected = self.read_outputs(self.session().convert(job))
+        self.assertEqual(self.read_outputs(self.session(streaming=True).convert(job)), expected)
+
+    def test_pairs_numbered_consecutively(self):
+        """Test that every pair is converted and panel numbers continue across pairs."""
+        one = self.save_drawing('one.dxf', panels_per_sheet=2, holes_per_panel=4, seed=6)
+        multi = self.save_drawing('multi.dxf', panels_per_sheet=2, holes_per_panel=4, seed=6, sheet_pairs=3)
+
+        output_files = self.session(streaming=True).convert(multi)
+        self.assertEqual([int(os.path.basename(f).split('.')[-2]) for f in output_files], list(range(1, 7)))
+        # The first pair is the one-pair drawing for the same seed
+        self.assertEqual(self.read_outputs(output_files[:2], (b'multi', b'one')),
+                         self.read_outputs(self.session().convert(one)))
+
+    def test_pairs_in_workers_match_sequential(self):
+        """Test that processing the panels of all pairs in workers writes the same files."""
+        multi = self.save_drawing('multi.dxf', panels_per_sheet=2, holes_per_panel=4, seed=3, sheet_pairs=3)
+        expected = self.read_outputs(self.session().convert(multi))
+        self.assertEqual(len(expected), 6)
+        self.assertEqual(self.read_outputs(self.session(panel_workers=2).convert(multi)), expected)
+        self.assertEqual(self.read_outputs(self.session(streaming=True, panel_workers=2).convert(multi)),
+                         expected)
+
+    def test_pairs_into_one_archive(self):
+        """Test that all pairs of a drawing go into one zip archive with the files of the directory."""
+        multi = self.save_drawing('multi.dxf', panels_per_sheet=2, holes_per_panel=4, seed=5, sheet_pairs=2)
+        expected = self.read_outputs(self.session().convert(multi))
+        os.rename(self.path('multi'), self.path('expected'))
+
+        output_files = self.session(streaming=True, archive='zip').convert(multi)
+        self.assertEqual(sorted(os.listdir(self.dir)), ['expected', 'multi.dxf', 'multi.zip'])
+        with zipfile.ZipFile(self.path('multi.zip')) as archive:
+            self.assertEqual(len(archive.namelist()), 4)
+            self.assertEqual(output_files, [self.path('multi.zip')] * 4)
+            self.assertEqual([archive.read(name) for name in archive.namelist()], expected)
+
+    @unittest.skipIf(peak_rss_bytes() is None, "peak memory is not available on this platform")
+    def test_memory_limit_enforced(self):
+        """Test that a conversion fails without output once its peak memory exceeds the ceiling."""
+        job = self.save_drawing(panels_per_sheet=1, holes_per_panel=2, seed=1, sheet_pairs=2)
+        stats = ConversionStats()
+        with self.assertLogs('src.core.streaming', level='ERROR') as logs:
+            self.assertIsNone(self.session(streaming=True, memory_limit=1024).convert(job, stats=stats))
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(os.listdir(self.path('job')), [])
+        self.assertEqual(stats.to_dict()['memory_limit_bytes'], 1024)
+        self.assertGreater(stats.to_dict()['peak_rss_bytes'], 1024)
+
+    @unittest.skipUnless(reset_peak_rss(), "the peak memory cannot be reset on this platform")
+    def test_streaming_peak_memory_flat(self):
+        """Test that the peak memory of streaming does not grow with the number of sheet pairs."""
+        few = self.save_repeated_pairs('few.dxf', 2)
+        many = self.save_repeated_pairs('many.dxf', 16)
+        few_peak = _peak_memory(few, self.dir, streaming=True)
+        many_peak = _peak_memory(many, self.dir, streaming=True)
+        whole_peak = _peak_memory(many, self.dir, streaming=False)
+        # Loading the whole file makes the difference the streamed pairs must not
+        self.assertLess(many_peak - few_peak, (whole_peak - few_peak) / 4)
+
+    def save_repeated_pairs(self, name, sheet_pairs):
+        """Saves a drawing of sheet_pairs copies of one sheet pair side by side, so every pair is alike."""
+        pair = build_nesting_drawing(panels_per_sheet=2, holes_per_panel=100, seed=1)
+        width = max(x for e in pair.modelspace().query('LWPOLYLINE') for x, *_ in e.get_points()) + 500
+        doc = ezdxf.new('R2010')
+        for number in range(sheet_pairs):
+            for entity in pair.modelspace():
+                doc.modelspace().add_entity(entity.copy().translate(number * width, 0, 0))
+        path = self.path(name)
+        doc.saveas(path)
+        return path
+
+    @unittest.skipUnless(reset_peak_rss(), "the peak memory cannot be reset on this platform")
+    def test_peak_memory_per_conversion(self):
+        """Test that a conversion reports its own peak, not that of earlier work in the process."""
+        job = self.save_drawing(panels_per_sheet=1, holes_per_panel=2, seed=1)
+        earlier = bytearray(256 * 1024 * 1024)
+        earlier[::4096] = b'x' * len(earlier[::4096])  # Touch every page
+        del earlier
+        stats = ConversionStats()
+        self.session().convert(job, stats=stats)
+        self.assertLess(stats.peak_rss_bytes, 256 * 1024 * 1024)
+
+    @unittest.skipIf(peak_rss_bytes() is None, "peak memory is not available on this platform")
+    def test_worker_peak_memory_reported(self):
+        """Test that panel workers report their peak memory."""
+        job = self.save_drawing(panels_per_sheet=2, holes_per_panel=2, seed=1)
+        stats = ConversionStats()
+        self.session(panel_workers=2).convert(job, stats=stats)
+        self.assertGreater(stats.to_dict()['worker_peak_rss_bytes'], 0)
+
+# Converts argv[1] with fast_read into argv[2], streaming when argv[3] is set, and prints the peak memory
+_PEAK_MEMORY_SCRIPT = """
+import sys
+from src.core.session import ConverterSession
+from src.core.stats import ConversionStats
+stats = ConversionStats()
+session = ConverterSession(output_dir=sys.argv[2], fast_read=True, streaming=bool(sys.argv[3]))
+session.convert(sys.argv[1], stats=stats)
+print(stats.peak_rss_bytes)
+"""
+
+def _peak_memory(path, output_dir, streaming):
+    """
+    Returns the peak memory of converting path in a fresh interpreter, so no
+    conversion inherits the heap of another or of the test run.
+    """
+    streaming_arg = 'streaming' if streaming else ''
+    result = subprocess.run([sys.executable, '-c', _PEAK_MEMORY_SCRIPT, path, output_dir, streaming_arg],
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            capture_output=True, text=True, check=True)
+    return int(result.stdout)
+
+if __name__ == '__main__':
+    unittest.main()
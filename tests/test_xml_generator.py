@@ -0,0 +1,34 @@
+"""Test suite for XML generation."""
+import os
+import tempfile
+import unittest
+import xml.dom.minidom
+import xml.etree.ElementTree as ET
+from src.core.xml_generator import create_panel_xml_structure, save_xml_file
+
+def _minidom_pretty_xml(root):
+    """Reference output of the former ET -> minidom -> toprettyxml pipeline."""
+    xml_string = ET.tostring(root, encoding='utf-8').decode('utf-8')
+    return xml.dom.minidom.parseString(xml_string).toprettyxml(indent="  ", encoding='utf-8')
+
+class TestXmlGenerator(unittest.TestCase):
+    def setUp(self):
+        self.root, panel_element = create_panel_xml_structure(
+            'job&co.800x600.1', 'job <"front">', 800, 600, 16)
+        machines_element = panel_element.find('Machines')
+        ET.SubElement(machines_element, "Machining", Type="2", IsGenCode="2", Face="5",
+                      X="10.000", Y="20.000", Diameter="8.000", Depth="8")
+        ET.SubElement(machines_element, "Machining", Type="4", IsGenCode="2", Face="5",
+                      X="0.000", Y="0.000", ToolOffset="中")
+        ET.SubElement(panel_element, "Note").text = "a > b"
+
+    def test_save_xml_file_matches_minidom(self):
+        """Test that the streamed output is byte-identical to minidom pretty printing."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, 'panel.xml')
+            save_xml_file(self.root, output_file)
+            with open(output_file, 'rb') as f:
+                self.assertEqual(f.read(), _minidom_pretty_xml(self.root))
+
+if __name__ == '__main__':
+    unittest.main()